@@ -1,9 +1,15 @@
+from base.startup_profiler import startup_profiler
+from base.logging import configure_logging
 from services.config_handler import ConfigHandler
 from services.discord_handler import DiscordHandler
 from modules.objects.paths import Paths
 from services.session_handler import StateHandler
+from services.boss_handler import BossHandler
+from modules.logic.pool_sampler import PoolSampler
+from modules.state.pool_state import PoolState
 import os
 import asyncio
+startup_profiler.mark("imports")
 
 # get current working directory and assign folder paths
 cwd:str = os.path.dirname(os.path.abspath(__file__))
@@ -16,11 +22,22 @@ paths:Paths = Paths(
     filepath_boss_data = os.path.join(folder_path_data,"local_bosses.json"),
     filepath_session_data = os.path.join(folder_path_data,"session_data.json"),
     filepath_image_folder = os.path.join(folder_path_assets,"images"),
-    folder_path_generated_image = folder_path_assets
+    folder_path_image_cache = os.path.join(folder_path_assets,"cache"),
+    filepath_vote_journal = os.path.join(folder_path_data,"vote_journal.jsonl")
 )
 # create config and pass to discord handler
-config_handler:ConfigHandler = ConfigHandler(filepath_config,paths)
-state_handler:StateHandler = StateHandler(paths.filepath_session_data)
-dh:DiscordHandler = DiscordHandler(config_handler,state_handler)
+with startup_profiler.phase("config parse"):
+    config_handler:ConfigHandler = ConfigHandler(filepath_config,paths)
+    logging_state = config_handler.get_logging_state()
+    configure_logging(logging_state.level,logging_state.max_queued_lines,config_handler.get_log_filepath(),logging_state.max_file_kb,logging_state.backup_files,
+                      logging_state.repeat_window_seconds)
+# bosses are loaded first, the session resolves its boss ids through the boss registry
+with startup_profiler.phase("boss data"):
+    boss_handler:BossHandler = BossHandler(paths.filepath_boss_data)
+with startup_profiler.phase("session data"):
+    pool_state:PoolState = config_handler.get_pool_state()
+    pool_sampler:PoolSampler = PoolSampler(pool_state.cooldown_weeks,pool_state.level_band_size,pool_state.level_band_weights,pool_state.location_weights,pool_state.seed)
+    state_handler:StateHandler = StateHandler(paths.filepath_session_data,boss_handler.get_registry(),pool_sampler)
+dh:DiscordHandler = DiscordHandler(config_handler,state_handler,boss_handler)
 asyncio.run(dh.run())
 print("Bot has started.")
\ No newline at end of file
@@ -0,0 +1,38 @@
+import importlib
+import importlib.util
+import threading
+
+class LazyModule:
+    """Stands in for a module until one of its attributes is used, then imports it (once, thread safe) and forwards every attribute to it."""
+    def __init__(self,name:str):
+        self.__name:str = name
+        self.__module = None
+        self.__lock:threading.Lock = threading.Lock()
+
+    def load(self):
+        """Imports the module if it was not imported yet, and returns it."""
+        if self.__module is None:
+            with self.__lock:
+                if self.__module is None:
+                    self.__module = importlib.import_module(self.__name)
+        return self.__module
+
+    def is_loaded(self) -> bool:
+        """Returns True if the module was imported."""
+        return self.__module is not None
+
+    def __getattr__(self,attribute:str):
+        return getattr(self.load(),attribute)
+
+    def __repr__(self) -> str:
+        return f"<lazy module '{self.__name}' ({'loaded' if self.__module is not None else 'not loaded'})>"
+
+def lazy_import(name:str) -> LazyModule:
+    """Returns a LazyModule for name, so heavy dependencies (such as PIL or requests) are only imported when first used, not at startup.
+    Returns None if the module is not installed."""
+    try:
+        if importlib.util.find_spec(name) is None:
+            return None
+    except ImportError:
+        return None
+    return LazyModule(name)
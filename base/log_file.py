@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+
+class RotatingJsonLinesFile:
+    """Appends JSON objects, one per line, to a buffered log file.  When the file grows past max_bytes it is rotated:
+    log.jsonl becomes log.jsonl.1, log.jsonl.1 becomes log.jsonl.2 and so on, keeping backup_count old files.
+    Only used from the log writer thread, so it does not lock."""
+    def __init__(self,filepath:str,max_bytes:int = 5 * 1024 * 1024,backup_count:int = 3,buffer_bytes:int = 64 * 1024):
+        self.filepath:str = filepath
+        self.max_bytes:int = max_bytes
+        self.backup_count:int = backup_count
+        self.buffer_bytes:int = buffer_bytes
+        self.__file = None
+        self.__failed:bool = False
+        # bytes in the current file, counted as lines are written so the file can be rotated between lines of one batch
+        self.__size:int = 0
+        # statistics
+        self.written:int = 0
+        self.rotations:int = 0
+
+    def __open(self) -> bool:
+        if self.__file is not None:
+            return True
+        if self.__failed:
+            return False
+        try:
+            folder:str = os.path.dirname(self.filepath)
+            if folder:
+                os.makedirs(folder,exist_ok=True)
+            self.__file = open(self.filepath,"a",encoding="utf-8",buffering=self.buffer_bytes)
+            self.__size = self.__file.tell()
+            return True
+        except OSError as e:
+            # reported once, the console output keeps working
+            self.__failed = True
+            sys.stderr.write(f"[RotatingJsonLinesFile] Could not open log file {self.filepath}: {e}\n")
+            return False
+
+    def write(self,entries:list[dict]) -> bool:
+        """Writes the entries and flushes them, rotating the file whenever it is full.  Returns True if the entries were written."""
+        if not entries or not self.__open():
+            return False
+        try:
+            for entry in entries:
+                if self.max_bytes and self.__size >= self.max_bytes:
+                    self.rotate()
+                    if not self.__open():
+                        return False
+                line:str = json.dumps(entry,default=str) + "\n"
+                self.__file.write(line)
+                self.__size += len(line.encode("utf-8")) if not line.isascii() else len(line)
+                self.written += 1
+            self.__file.flush()
+            return True
+        except OSError as e:
+            sys.stderr.write(f"[RotatingJsonLinesFile] Could not write log file {self.filepath}: {e}\n")
+            return False
+
+    def rotate(self):
+        """Closes the current file and shifts it and the older files up by one, dropping the oldest."""
+        self.close()
+        try:
+            if self.backup_count <= 0:
+                os.remove(self.filepath)
+            else:
+                for index in range(self.backup_count - 1,0,-1):
+                    if os.path.exists(f"{self.filepath}.{index}"):
+                        os.replace(f"{self.filepath}.{index}",f"{self.filepath}.{index + 1}")
+                os.replace(self.filepath,f"{self.filepath}.1")
+            self.rotations += 1
+        except OSError as e:
+            sys.stderr.write(f"[RotatingJsonLinesFile] Could not rotate log file {self.filepath}: {e}\n")
+
+    def close(self):
+        """Flushes and closes the file.  The next write opens it again."""
+        if self.__file is not None:
+            try:
+                self.__file.close()
+            except OSError:
+                pass
+            self.__file = None
@@ -1,25 +1,288 @@
+from base.log_file import RotatingJsonLinesFile
+from datetime import datetime, timezone
+import atexit
+import hashlib
+import itertools
+import queue
+import sys
 import threading
+import time
 import colorama
 
+# log levels, lowest first
+LOG:int = 10
+WARN:int = 20
+ERROR:int = 30
+LEVEL_NAMES:dict[str,int] = {"log":LOG,"warn":WARN,"error":ERROR}
+
+class LogSink:
+    """The single output every Logger writes to.  Records are queued and formatted and printed by a background writer thread,
+    so logging never waits on the terminal.  Records below the level are dropped before any formatting.
+    If more than max_queued records are waiting, new log and warn records are dropped (and counted), errors always wait for room.
+    Records can also be written to a JSON-lines file (see set_file), with a timestamp, level, class, function and event id.
+    The same message logged again within repeat_window_seconds is held back, and written once as "repeated N times" when the window ends.
+    Messages with lazy arguments repeat if they have the same template, their summary is the template with the count of distinct arguments."""
+    def __init__(self,level:int = LOG,max_queued:int = 10000,stream = None,batch_size:int = 200,repeat_window_seconds:float = 60.0):
+        self.level:int = level
+        self.stream = stream
+        self.batch_size:int = batch_size
+        self.repeat_window_seconds:float = repeat_window_seconds
+        self.file:RotatingJsonLinesFile = None
+        self.__queue:queue.Queue = queue.Queue(max_queued)
+        self.__thread:threading.Thread = None
+        self.__start_lock:threading.Lock = threading.Lock()
+        self.__sequence = itertools.count(1)
+        # repeat key -> [start of the window, records held back, last record held back, distinct arguments held back (as a dict, kept in order)]
+        self.__repeats:dict[tuple,list] = {}
+        self.__event_ids:dict[tuple,str] = {}
+        # statistics
+        self.written:int = 0
+        self.dropped:int = 0
+        self.collapsed:int = 0
+        self.__unreported_drops:int = 0
+
+    def set_file(self,filepath:str,max_bytes:int = 5 * 1024 * 1024,backup_count:int = 3):
+        """Writes records to a JSON-lines file as well, rotated at max_bytes.  None stops writing to a file."""
+        self.__start()
+        self.__queue.put(("file",filepath,max_bytes,backup_count))
+
+    def set_max_queued(self,max_queued:int):
+        """Changes how many records may wait to be written."""
+        self.__queue.maxsize = max_queued
+
+    def enabled(self,level:int) -> bool:
+        """Returns True if records of the level are written."""
+        return level >= self.level
+
+    def post(self,level:int,color:str,instance,func,msg,args:tuple):
+        """Queues a record.  The message is formatted by the writer: msg % args if args are given, the 'instance' class name and func name are prefixed."""
+        if level < self.level:
+            return
+        self.__start()
+        record:tuple = (level,color,instance.__class__.__name__,func,msg,args,time.time())
+        if level >= ERROR:
+            self.__queue.put(record)
+            return
+        try:
+            self.__queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self.__unreported_drops += 1
+
+    def flush(self,timeout:float = 5.0):
+        """Waits until every queued record is written (or timeout seconds pass)."""
+        if self.__thread is None or not self.__thread.is_alive():
+            return
+        done:threading.Event = threading.Event()
+        self.__queue.put(done)
+        done.wait(timeout)
+
+    def __start(self):
+        if self.__thread is not None:
+            return
+        with self.__start_lock:
+            if self.__thread is None:
+                self.__thread = threading.Thread(target=self.__run,name="log_writer",daemon=True)
+                self.__thread.start()
+
+    def message(self,record:tuple) -> str:
+        """Returns the message of a queued record, with its lazy arguments applied."""
+        msg,args = record[4],record[5]
+        if not args:
+            return str(msg)
+        try:
+            return msg % args
+        except Exception as e:
+            return f"{msg} {args} (formatting failed: {e})"
+
+    def format(self,record:tuple,message:str = None) -> str:
+        """Formats a queued record as a colored console line."""
+        _,color,class_name,func = record[:4]
+        prefix:str = f"[{class_name}.{getattr(func,'__name__',func)}]" if func is not None else f"[{class_name}]"
+        return f"{color}{prefix} {self.message(record) if message is None else message}{colorama.Style.RESET_ALL}"
+
+    def event_id(self,record:tuple) -> str:
+        """Returns a short id for the log call that made the record: the same class, function and message template always get the same id."""
+        key:tuple = (record[2],getattr(record[3],"__name__",record[3]),str(record[4]))
+        event_id:str = self.__event_ids.get(key)
+        if event_id is None:
+            event_id = hashlib.blake2s(repr(key).encode(),digest_size=4).hexdigest()
+            if len(self.__event_ids) < 10000:
+                self.__event_ids[key] = event_id
+        return event_id
+
+    def entry(self,record:tuple,message:str,repeated:int = 0) -> dict:
+        """Returns the JSON-lines entry of a record."""
+        level:int = record[0]
+        entry:dict = {
+            "time":datetime.fromtimestamp(record[6],timezone.utc).isoformat(timespec="milliseconds"),
+            "seq":next(self.__sequence),
+            "level":next((name for name,value in LEVEL_NAMES.items() if value == level),str(level)),
+            "class":record[2],
+            "function":getattr(record[3],"__name__",record[3]) if record[3] is not None else None,
+            "event":self.event_id(record),
+            "message":message
+        }
+        if repeated:
+            entry["repeated"] = repeated
+        return entry
+
+    def __collapse(self,record:tuple,now:float) -> bool:
+        """Returns True if the record repeats a message written within the repeat window, and is held back.
+        Records with lazy arguments repeat if they have the same template (such as the same error for different players),
+        the distinct arguments are counted so the summary does not pass them off as one message repeated."""
+        if not self.repeat_window_seconds or self.repeat_window_seconds <= 0:
+            return False
+        key:tuple = (record[0],record[2],getattr(record[3],"__name__",record[3]),str(record[4]) if record[5] else self.message(record))
+        repeat:list = self.__repeats.get(key)
+        if repeat is not None and now - repeat[0] < self.repeat_window_seconds:
+            repeat[1] += 1
+            repeat[2] = record
+            if record[5] and len(repeat[3]) < 1000:
+                repeat[3][self.__arguments_text(record[5])] = None
+            self.collapsed += 1
+            return True
+        if repeat is not None or len(self.__repeats) < 10000:
+            self.__repeats[key] = [now,0,None,{}]
+        return False
+
+    def __arguments_text(self,args:tuple) -> str:
+        try:
+            return ", ".join(str(arg) for arg in args)
+        except Exception:
+            return repr(args)
+
+    def summary(self,record:tuple,repeated:int,distinct_args:list[str]) -> str:
+        """Returns the message written for 'repeated' records held back in a repeat window, the last of which is record.
+        A record without lazy arguments repeated one message.  A record with lazy arguments is summarized by its template,
+        with the count and the first few of the distinct arguments, since the held back records may each have had other arguments."""
+        window:str = f"{self.repeat_window_seconds:g} s"
+        if not record[5]:
+            return f"{self.message(record)} (repeated {repeated} {'time' if repeated == 1 else 'times'} in {window})"
+        examples:str = "; ".join(distinct_args[:5]) + ("; ..." if len(distinct_args) > 5 else "")
+        return (f"{record[4]} ({repeated} more in {window}, {len(distinct_args)} distinct "
+                f"{'argument' if len(distinct_args) == 1 else 'arguments'}: {examples})")
+
+    def __expired_repeats(self,now:float,every:bool = False) -> list[tuple[tuple,int,str]]:
+        """Removes the repeat windows that ended (or every window) and returns the (last record, count, summary) of those that held records back."""
+        summaries:list[tuple[tuple,int,str]] = []
+        for key in [key for key,repeat in self.__repeats.items() if every or now - repeat[0] >= self.repeat_window_seconds]:
+            _,count,last,distinct_args = self.__repeats.pop(key)
+            if count:
+                summaries.append((last,count,self.summary(last,count,list(distinct_args))))
+        return summaries
+
+    def __write(self,records:list[tuple[tuple,int,str]]):
+        """Writes (record, repeat count, message) to the console and the log file.  A message of None is the record's own message."""
+        lines:list[str] = []
+        entries:list[dict] = []
+        for record,repeated,message in records:
+            try:
+                if message is None:
+                    message = self.message(record)
+                lines.append(self.format(record,message))
+                if self.file:
+                    entries.append(self.entry(record,message,repeated))
+            except Exception as e:
+                lines.append(f"[LogSink] Could not format a log record: {e}")
+        if self.__unreported_drops:
+            lines.append(f"{colorama.Fore.YELLOW}[LogSink] Dropped {self.__unreported_drops} log lines, the log queue was full{colorama.Style.RESET_ALL}")
+            self.__unreported_drops = 0
+        if lines:
+            stream = self.stream or sys.stdout
+            try:
+                stream.write("\n".join(lines) + "\n")
+                stream.flush()
+            except Exception:
+                pass
+            self.written += len(lines)
+        if entries:
+            self.file.write(entries)
+
+    def __set_file(self,filepath:str,max_bytes:int,backup_count:int):
+        if self.file:
+            if self.file.filepath == filepath:
+                self.file.max_bytes,self.file.backup_count = max_bytes,backup_count
+                return
+            self.file.close()
+        self.file = RotatingJsonLinesFile(filepath,max_bytes,backup_count) if filepath else None
+
+    def get_stats(self) -> str:
+        """Returns a one line summary of the sink statistics."""
+        level_name:str = next((name for name,level in LEVEL_NAMES.items() if level == self.level),str(self.level))
+        file_stats:str = f"{self.file.filepath} ({self.file.written} entries, {self.file.rotations} rotations)" if self.file else "off"
+        return (f"level: {level_name} | written: {self.written} lines | queued: {self.__queue.qsize()} | dropped: {self.dropped} | "
+                f"repeats collapsed: {self.collapsed} | file: {file_stats}")
+
+    def __run(self):
+        while True:
+            try:
+                # while repeats are held back, wake up to write them when their window ends
+                batch:list = [self.__queue.get(timeout=1.0 if self.__repeats else None)]
+            except queue.Empty:
+                batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.__queue.get_nowait())
+                except queue.Empty:
+                    break
+            now:float = time.time()
+            records:list[tuple[tuple,int,str]] = self.__expired_repeats(now)
+            waiting:list[threading.Event] = []
+            for record in batch:
+                if isinstance(record,threading.Event):
+                    waiting.append(record)
+                elif record[0] == "file":
+                    self.__write(records)
+                    records = []
+                    self.__set_file(*record[1:])
+                elif record[0] == "close":
+                    records.extend(self.__expired_repeats(now,every=True))
+                    waiting.append(record[1])
+                elif not self.__collapse(record,now):
+                    records.append((record,0,None))
+            self.__write(records)
+            if self.file and any(isinstance(record,tuple) and record[0] == "close" for record in batch):
+                self.file.close()
+            for done in waiting:
+                done.set()
+
+    def close(self,timeout:float = 5.0):
+        """Writes every queued record and every held back repeat, and closes the log file.  Called at exit."""
+        if self.__thread is None or not self.__thread.is_alive():
+            return
+        done:threading.Event = threading.Event()
+        self.__queue.put(("close",done))
+        done.wait(timeout)
+
+# the sink shared by every Logger
+log_sink:LogSink = LogSink()
+atexit.register(log_sink.close)
+
+def configure_logging(level:str = "log",max_queued_lines:int = None,file_path:str = None,max_file_kb:int = 5120,backup_files:int = 3,
+                      repeat_window_seconds:float = None):
+    """Sets the lowest level written by every Logger ("log", "warn" or "error"), and optionally the size of the log queue,
+    the JSON-lines log file (None writes no file) and how long repeated messages are collapsed for (0 never collapses them)."""
+    log_sink.level = LEVEL_NAMES.get(level,LOG)
+    if max_queued_lines:
+        log_sink.set_max_queued(max_queued_lines)
+    if repeat_window_seconds is not None:
+        log_sink.repeat_window_seconds = repeat_window_seconds
+    log_sink.set_file(file_path,max_file_kb * 1024,backup_files)
+
 class Logger:
+    """Base class with log, warn and error methods.  Every Logger writes to the shared log_sink.
+    Messages may use lazy % formatting, self.log(self,"Loaded %d players",self.load,count), so they are only formatted if written."""
     def __init__(self,thread_lock:threading.Lock=None):
         self.log_color:str = colorama.Fore.WHITE
         self.warn_color:str = colorama.Fore.YELLOW
         self.error_color:str = colorama.Fore.RED
+        # kept for subclasses that use it, log output is serialized by the log sink
         self.lock = thread_lock or threading.Lock()
         self.__mute_logs:bool = False
         self.__mute_warns:bool = False
         self.__mute_errors:bool = False
 
-    def __print(self, instance, msg, color, func=None):
-        with self.lock:
-            class_name = instance.__class__.__name__
-            if func is not None:
-                msg = f"[{class_name}.{func.__name__}] {msg}"
-            else:
-                msg = f"[{class_name}] {msg}"
-            print(f"{color}{msg}{colorama.Style.RESET_ALL}")
-
     def mute(self) -> None:
         self.__mute_logs = True
         self.__mute_warns = True
@@ -48,11 +311,11 @@ class Logger:
     def unmute_errors(self) -> None:
         self.__mute_errors = False
 
-    def log(self, instance, msg,func=None):
-        if not self.__mute_logs: self.__print(instance, msg, self.log_color, func)
+    def log(self, instance, msg,func=None,*args):
+        if not self.__mute_logs and log_sink.level <= LOG: log_sink.post(LOG,self.log_color,instance,func,msg,args)
 
-    def warn(self, instance, msg,func=None):
-        if not self.__mute_warns: self.__print(instance, msg, self.warn_color, func)
+    def warn(self, instance, msg,func=None,*args):
+        if not self.__mute_warns and log_sink.level <= WARN: log_sink.post(WARN,self.warn_color,instance,func,msg,args)
 
-    def error(self, instance, msg,func=None):
-        if not self.__mute_errors: self.__print(instance, msg, self.error_color, func)
\ No newline at end of file
+    def error(self, instance, msg,func=None,*args):
+        if not self.__mute_errors and log_sink.level <= ERROR: log_sink.post(ERROR,self.error_color,instance,func,msg,args)
@@ -0,0 +1,52 @@
+from contextlib import contextmanager
+import time
+
+class StartupProfiler:
+    """Records how long each startup phase takes (imports, config parse, repository loads, scheduler setup, gateway connect, ...).
+    Phases are timed with 'with profiler.phase(name):', or with mark(name), which ends a phase at the current time."""
+    def __init__(self,start:float = None):
+        """start is the time.perf_counter() value startup began at, so time spent before the profiler existed is counted."""
+        self.start:float = time.perf_counter() if start is None else start
+        self.__last_mark:float = self.start
+        self.phases:list[tuple[str,float]] = []
+        self.finished:bool = False
+
+    @contextmanager
+    def phase(self,name:str):
+        """Times the code in the with block as a phase."""
+        start:float = time.perf_counter()
+        try:
+            yield
+        finally:
+            end:float = time.perf_counter()
+            self.phases.append((name,end - start))
+            self.__last_mark = end
+
+    def mark(self,name:str):
+        """Records the time since the previous phase ended (or startup began) as a phase."""
+        now:float = time.perf_counter()
+        self.phases.append((name,now - self.__last_mark))
+        self.__last_mark = now
+
+    def total_seconds(self) -> float:
+        """Returns the time since startup began, or until the last phase if finished."""
+        return (self.__last_mark if self.finished else time.perf_counter()) - self.start
+
+    def finish(self,name:str = None) -> list[str]:
+        """Ends startup, optionally recording the time since the previous phase as a last phase.  Returns the breakdown lines (see report)."""
+        if name:
+            self.mark(name)
+        self.finished = True
+        return self.report()
+
+    def report(self) -> list[str]:
+        """Returns one line per phase with its time and share of the startup, the time outside any phase, then the total."""
+        total:float = self.total_seconds() or 1e-9
+        lines:list[str] = []
+        for name,seconds in self.phases + [("other",max(0.0,total - sum(seconds for _,seconds in self.phases)))]:
+            lines.append(f"{name:<24}{seconds * 1000:>9.1f} ms {seconds / total:>6.1%}")
+        lines.append(f"{'total':<24}{total * 1000:>9.1f} ms")
+        return lines
+
+# the profiler of this run of the bot, shared by __main__ and the handlers it starts
+startup_profiler:StartupProfiler = StartupProfiler()
@@ -0,0 +1,72 @@
+"""Times every upload encoding against the real boss images and reports encode time against output size.  Run from the project root with:
+python -m benchmarks.image_encoding_benchmark [quality] [max upload kb]"""
+from modules.logic.image_gen import ImageEncoder, IMAGE_ENCODINGS, load_tile, compose_tiles, encode_image, image_extension
+from modules.logic.parser import LocalBossParser
+from modules.objects.boss import LocalBoss
+from modules.repositories.filesystem import LocalBossRepository
+from PIL import Image
+import os
+import random
+import sys
+import time
+
+def timed(func,repeat:int = 3) -> tuple[float,bytes]:
+    """Runs func 'repeat' times.  Returns the best wall time in seconds and the last result."""
+    best:float = float("inf")
+    result = None
+    for _ in range(repeat):
+        start:float = time.perf_counter()
+        result = func()
+        best = min(best,time.perf_counter() - start)
+    return best,result
+
+def vote_composites(bosses:list[LocalBoss],image_folder:str,count:int,seed:int = 0) -> list[Image.Image]:
+    """Builds 'count' reproducible random 4 boss vote composites from the real images."""
+    rng:random.Random = random.Random(seed)
+    composites:list[Image.Image] = []
+    for _ in range(count):
+        tiles:list[Image.Image] = [load_tile(os.path.join(image_folder,boss.image)) for boss in rng.sample(bosses,4)]
+        composites.append(compose_tiles([tile for tile in tiles if tile is not None]))
+    return composites
+
+def report(label:str,images:list[Image.Image],encode) -> int:
+    """Encodes every image, prints the total encode time and bytes, and returns the total bytes."""
+    seconds:float = 0.0
+    total:int = 0
+    largest:int = 0
+    for image in images:
+        elapsed,data = timed(lambda: encode(image))
+        if data is None:
+            print(f"{label:<28}{'not supported':>14}")
+            return 0
+        seconds += elapsed
+        total += len(data)
+        largest = max(largest,len(data))
+    print(f"{label:<28}{seconds * 1000 / len(images):>10.1f} ms{total / len(images) / 1024:>12.1f} KB{largest / 1024:>12.1f} KB")
+    return total
+
+def main(quality:int = 80,max_upload_kb:int = 256):
+    root:str = os.getcwd()
+    image_folder:str = os.path.join(root,"assets","images")
+    parser:LocalBossParser = LocalBossParser()
+    bosses:list[LocalBoss] = [parser.local_boss_json_to_object(data) for data in LocalBossRepository(os.path.join(root,"data","local_bosses.json")).load()]
+    bosses = [boss for boss in bosses if boss and os.path.isfile(os.path.join(image_folder,boss.image))]
+    sources:list[Image.Image] = [load_tile(os.path.join(image_folder,boss.image)) for boss in bosses]
+    composites:list[Image.Image] = vote_composites(bosses,image_folder,10)
+    for label,images in (("boss images",sources),("vote composites",composites)):
+        print(f"\n{label} ({len(images)}), quality {quality}")
+        print(f"{'encoding':<28}{'avg time':>13}{'avg size':>15}{'max size':>15}")
+        report("png (unoptimized)",images,encode_image)
+        for encoding in IMAGE_ENCODINGS:
+            encoder:ImageEncoder = ImageEncoder([encoding],quality)
+            report(encoding,images,lambda image: encoder.encode_as(image,encoding))
+        chooser:ImageEncoder = ImageEncoder(list(IMAGE_ENCODINGS),quality,max_upload_kb * 1024)
+        report(f"auto (budget {max_upload_kb} KB)",images,chooser.encode)
+        chosen:dict[str,int] = {}
+        for image in images:
+            extension:str = image_extension(chooser.encode(image))
+            chosen[extension] = chosen.get(extension,0) + 1
+        print(f"{'auto chose':<28}{', '.join(f'{extension}: {count}' for extension,count in chosen.items())}")
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,67 @@
+"""Times the clan-wide kill matrix against a synthetic clan.  Run from the project root with:
+python -m benchmarks.kill_matrix_benchmark [players] [bosses]"""
+from modules.logic.ranking_matrix import KillMatrix, numpy_available
+from modules.objects.player import Player
+from modules.objects.boss import Boss, LocalBoss
+import random
+import sys
+import time
+
+def generate_clan(player_count:int,boss_count:int,seed:int = 0) -> tuple[list[Player],list[LocalBoss]]:
+    """Generates a reproducible synthetic clan with random kill counts."""
+    rng:random.Random = random.Random(seed)
+    bosses:list[LocalBoss] = [LocalBoss(f"Boss {i}",f"boss_{i}",100 + i,"Nowhere",f"boss_{i}.png") for i in range(boss_count)]
+    players:list[Player] = []
+    for p in range(player_count):
+        boss_list:list[Boss] = []
+        for local_boss in bosses:
+            boss:Boss = Boss(local_boss.api_name,rng.randint(0,2000))
+            boss.kill_offset = max(0,boss.kills - rng.randint(0,50))
+            boss.tracked_kills = boss.kills - boss.kill_offset
+            boss_list.append(boss)
+        players.append(Player(f"discord_{p}",f"player_{p}",boss_list))
+    return players,bosses
+
+def timed(label:str,func,repeat:int = 5):
+    """Runs func 'repeat' times and prints the best wall time.  Returns the last result."""
+    best:float = float("inf")
+    result = None
+    for _ in range(repeat):
+        start:float = time.perf_counter()
+        result = func()
+        best = min(best,time.perf_counter() - start)
+    print(f"{label:<36}{best * 1000:>10.2f} ms")
+    return result
+
+def main(player_count:int = 5000,boss_count:int = 60):
+    if not numpy_available():
+        print("numpy is not installed, nothing to benchmark")
+        return
+    players,bosses = generate_clan(player_count,boss_count)
+    print(f"{player_count} players x {boss_count} bosses")
+    matrix:KillMatrix = timed("build matrix",lambda: KillMatrix(players,bosses))
+    previous:KillMatrix = KillMatrix(players,bosses)
+    # ranks are cached per matrix, so every repeat ranks a fresh copy
+    fresh:list[KillMatrix] = [KillMatrix(players,bosses) for _ in range(5)]
+    timed("ranks (all bosses)",lambda: fresh.pop().ranks(True))
+    timed("percentiles (all bosses)",lambda: matrix.percentiles(True))
+    timed("tracked deltas (all bosses)",lambda: matrix.tracked_deltas(previous))
+    timed("top 3 at each boss",lambda: matrix.top(3,True))
+    # the same ranking done the old way: one python sort per boss over every player's boss list
+    def python_ranks():
+        ranks:dict[str,dict[str,int]] = {}
+        for local_boss in bosses:
+            rows:list[tuple[str,int]] = []
+            for player in players:
+                for boss in player.boss_list:
+                    if boss.name == local_boss.api_name:
+                        rows.append((player.osrs_name,boss.tracked_kills))
+                        break
+            rows.sort(key=lambda x: x[1],reverse=True)
+            ranks[local_boss.api_name] = {name:i + 1 for i,(name,_) in enumerate(rows)}
+        return ranks
+    timed("nested python loops (reference)",python_ranks,repeat=1)
+
+if __name__ == "__main__":
+    args:list[int] = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
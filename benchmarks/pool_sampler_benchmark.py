@@ -0,0 +1,61 @@
+"""Times vote pool draws against large synthetic boss catalogs, and checks that weighted draws follow the weights.  Run from the project root with:
+python -m benchmarks.pool_sampler_benchmark [bosses ...]"""
+from modules.logic.pool_sampler import PoolSampler
+from modules.objects.boss import LocalBoss
+from datetime import datetime, timedelta
+import random
+import sys
+import time
+
+def generate_catalog(boss_count:int,seed:int = 0) -> list[LocalBoss]:
+    """Generates a reproducible synthetic boss catalog with random levels, locations and popularity weights."""
+    rng:random.Random = random.Random(seed)
+    locations:list[str] = [f"Location {i}" for i in range(max(1,boss_count // 10))]
+    return [LocalBoss(f"Boss {i}",f"boss_{i}",rng.randint(1,1000),rng.choice(locations),f"boss_{i}.png",rng.choice([0.5,1.0,1.0,2.0])) for i in range(boss_count)]
+
+def old_draw(bosses:list[LocalBoss],used_boss_list:list[LocalBoss]) -> list[LocalBoss]:
+    """The previous draw: filter the unused bosses with a list membership test, then sample uniformly."""
+    if len(bosses) - len(used_boss_list) < 4:
+        used_boss_list = []
+    valid_bosses:list[LocalBoss] = [boss for boss in bosses if boss not in used_boss_list]
+    return random.sample(valid_bosses,4)
+
+def timed(label:str,func,repeat:int = 5) -> float:
+    """Runs func 'repeat' times and prints the best wall time."""
+    best:float = float("inf")
+    for _ in range(repeat):
+        start:float = time.perf_counter()
+        func()
+        best = min(best,time.perf_counter() - start)
+    print(f"{label:<44}{best * 1000:>10.2f} ms")
+    return best
+
+def check_weights(draws:int = 20000):
+    """Draws single bosses from a small weighted catalog and compares how often each was drawn with its share of the weight."""
+    bosses:list[LocalBoss] = [LocalBoss(f"Boss {i}",f"boss_{i}",100,"Nowhere",f"boss_{i}.png",weight) for i,weight in enumerate([1.0,2.0,3.0,4.0])]
+    sampler:PoolSampler = PoolSampler(seed=1)
+    counts:dict[str,int] = {boss.api_name:0 for boss in bosses}
+    for _ in range(draws):
+        counts[sampler.sample(bosses,{},1)[0].api_name] += 1
+    total_weight:float = sum(boss.weight for boss in bosses)
+    print("\nweight check (single draws)")
+    for boss in bosses:
+        print(f"{boss.api_name:<12} weight {boss.weight:<5} expected {boss.weight / total_weight:>6.1%}  drawn {counts[boss.api_name] / draws:>6.1%}")
+
+def main(sizes:list[int]):
+    now:datetime = datetime.now()
+    for boss_count in sizes:
+        bosses:list[LocalBoss] = generate_catalog(boss_count)
+        rng:random.Random = random.Random(1)
+        used:list[LocalBoss] = rng.sample(bosses,boss_count // 2)
+        used_times:dict[str,datetime] = {boss.api_name:now - timedelta(days=rng.randint(0,365)) for boss in used}
+        print(f"\n{boss_count} bosses, {len(used)} used")
+        timed("old: list filter + uniform sample",lambda: old_draw(bosses,used),3 if boss_count > 10000 else 5)
+        timed("sampler: weighted, no cooldown",lambda: PoolSampler(seed=1).sample(bosses,used_times))
+        timed("sampler: weighted, 12 week cooldown",lambda: PoolSampler(12,seed=1).sample(bosses,used_times,now=now))
+        banded:PoolSampler = PoolSampler(12,100,{"0":0.5,"900":2.0},{"Location 0":0.0},seed=1)
+        timed("sampler: + level band and location weights",lambda: banded.sample(bosses,used_times,now=now))
+    check_weights()
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100,1000,10000,50000])
@@ -0,0 +1,20 @@
+import asyncio
+
+class OutboundRequest:
+    def __init__(self,
+                channel_id:int,
+                request_func,
+                priority:int,
+                sequence:int,
+                merge_key:tuple,
+                droppable:bool,
+                future:asyncio.Future,
+                queued_at:float):
+        self.channel_id:int = channel_id
+        self.request_func = request_func
+        self.priority:int = priority
+        self.sequence:int = sequence
+        self.merge_key:tuple = merge_key
+        self.droppable:bool = droppable
+        self.future:asyncio.Future = future
+        self.queued_at:float = queued_at
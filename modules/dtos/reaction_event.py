@@ -0,0 +1,12 @@
+class ReactionEvent:
+    def __init__(self,
+                message,
+                emoji:str,
+                user,
+                added:bool,
+                received:float):
+        self.message = message
+        self.emoji:str = emoji
+        self.user = user
+        self.added:bool = added
+        self.received:float = received
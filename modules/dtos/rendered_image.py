@@ -0,0 +1,10 @@
+class RenderedImage:
+    def __init__(self,
+                data:bytes,
+                filename:str,
+                fallback:bool,
+                seconds:float):
+        self.data:bytes = data
+        self.filename:str = filename
+        self.fallback:bool = fallback
+        self.seconds:float = seconds
@@ -0,0 +1,145 @@
+from __future__ import annotations
+from modules.objects.boss import LocalBoss
+from modules.logic.image_gen import load_tile, compose_tiles, encode_image, save_bytes, ImageEncoder
+from base.lazy_import import lazy_import
+import json
+import mmap
+import os
+import struct
+
+Image = lazy_import("PIL.Image")
+
+ATLAS_MAGIC:bytes = b"OSRSATL1"
+
+def tile_key(image:str,height:int) -> str:
+    """Returns the index key for an image at a height."""
+    return f"{image}|{height}"
+
+def source_mtimes(bosses:list[LocalBoss],image_folder:str) -> dict[str,float]:
+    """Returns the modification time of every boss image that exists."""
+    mtimes:dict[str,float] = {}
+    for boss in bosses:
+        path:str = os.path.join(image_folder,boss.image)
+        if os.path.isfile(path):
+            mtimes[boss.image] = os.path.getmtime(path)
+    return mtimes
+
+def build_atlas(bosses:list[LocalBoss],image_folder:str,atlas_path:str,heights:list[int]) -> bool:
+    """Decodes every boss image once, scales it to each height (keeping its aspect ratio) and packs the tiles into a single atlas file:
+    magic, 4 byte index length, JSON index {"sources": {image: mtime}, "heights": [...], "tiles": {"image|height": [offset, width, height]}},
+    then the raw RGBA pixels of every tile (offsets are relative to the end of the index).
+    The file is written to a temporary path and swapped in, so a running loader never sees a partial atlas.  Returns True if successful.
+    Build it by hand from the project root with:  python -m modules.logic.atlas [height ...]"""
+    tiles:dict[str,list[int]] = {}
+    chunks:list[bytes] = []
+    offset:int = 0
+    mtimes:dict[str,float] = source_mtimes(bosses,image_folder)
+    for image in sorted(mtimes):
+        source:Image.Image = load_tile(os.path.join(image_folder,image))
+        if source is None:
+            continue
+        for height in heights:
+            width:int = max(1,round(source.width * height / source.height))
+            tile:Image.Image = source.resize((width,height),Image.LANCZOS)
+            data:bytes = tile.tobytes()
+            tiles[tile_key(image,height)] = [offset,width,height]
+            chunks.append(data)
+            offset += len(data)
+    index:bytes = json.dumps({"sources":mtimes,"heights":list(heights),"tiles":tiles}).encode()
+    temp_path:str = f"{atlas_path}.tmp"
+    try:
+        os.makedirs(os.path.dirname(atlas_path) or ".",exist_ok=True)
+        with open(temp_path,"wb") as file:
+            file.write(ATLAS_MAGIC)
+            file.write(struct.pack("<I",len(index)))
+            file.write(index)
+            for chunk in chunks:
+                file.write(chunk)
+        os.replace(temp_path,atlas_path)
+        return True
+    except OSError as e:
+        print(f"Error writing thumbnail atlas: {e}")
+        return False
+
+class ThumbnailAtlas:
+    """Read-only view of a packed thumbnail atlas.  The file is memory mapped where possible (read fully into memory otherwise),
+    and tiles are created directly over the mapped pixel data."""
+    def __init__(self,atlas_path:str):
+        self.atlas_path:str = atlas_path
+        with open(atlas_path,"rb") as file:
+            try:
+                self.__buffer = mmap.mmap(file.fileno(),0,access=mmap.ACCESS_READ)
+            except (OSError,ValueError):
+                self.__buffer = file.read()
+        view:memoryview = memoryview(self.__buffer)
+        if bytes(view[:len(ATLAS_MAGIC)]) != ATLAS_MAGIC:
+            raise ValueError(f"{atlas_path} is not a thumbnail atlas")
+        index_length:int = struct.unpack_from("<I",view,len(ATLAS_MAGIC))[0]
+        index_start:int = len(ATLAS_MAGIC) + 4
+        index:dict = json.loads(bytes(view[index_start:index_start + index_length]))
+        self.sources:dict[str,float] = index["sources"]
+        self.heights:list[int] = index["heights"]
+        self.__tiles:dict[str,list[int]] = index["tiles"]
+        self.__data:memoryview = view[index_start + index_length:]
+        self.__images:dict[str,Image.Image] = {}
+
+    @classmethod
+    def load(cls,atlas_path:str) -> "ThumbnailAtlas":
+        """Loads an atlas file.  Returns None if it does not exist or is invalid."""
+        if not os.path.isfile(atlas_path):
+            return None
+        try:
+            return cls(atlas_path)
+        except Exception as e:
+            print(f"Error loading thumbnail atlas: {e}")
+            return None
+
+    def is_current(self,bosses:list[LocalBoss],image_folder:str,heights:list[int]) -> bool:
+        """Returns True if the atlas holds every boss image, unchanged, at every height."""
+        return self.sources == source_mtimes(bosses,image_folder) and all(height in self.heights for height in heights)
+
+    def has_tile(self,image:str,height:int) -> bool:
+        return tile_key(image,height) in self.__tiles
+
+    def get_tile(self,image:str,height:int) -> Image.Image:
+        """Returns the RGBA tile for an image at a height, backed by the atlas data.  Returns None if the atlas does not hold it.
+        The returned tile is shared, callers must not modify it."""
+        key:str = tile_key(image,height)
+        tile:Image.Image = self.__images.get(key)
+        if tile is not None:
+            return tile
+        entry:list[int] = self.__tiles.get(key)
+        if not entry:
+            return None
+        offset,width,tile_height = entry
+        tile = Image.frombuffer("RGBA",(width,tile_height),self.__data[offset:offset + width * tile_height * 4],"raw","RGBA",0,1)
+        self.__images[key] = tile
+        return tile
+
+def combine_atlas_tiles(atlas_path:str,images:list[str],height:int,save_path:str = None,encoder:ImageEncoder = None) -> bytes:
+    """Composes the tiles for the images from an atlas file and returns the encoded bytes (PNG unless an encoder is set), or None if an error occurs.
+    Module level so it can run in a worker process, which maps the atlas itself."""
+    atlas:ThumbnailAtlas = ThumbnailAtlas.load(atlas_path)
+    if not atlas:
+        return None
+    tiles:list[Image.Image] = [atlas.get_tile(image,height) for image in images]
+    if any(tile is None for tile in tiles):
+        return None
+    composite:Image.Image = compose_tiles(tiles)
+    data:bytes = encoder.encode(composite) if encoder else encode_image(composite)
+    composite.close()
+    if save_path:
+        save_bytes(data,save_path)
+    return data
+
+if __name__ == "__main__":
+    import sys
+    from modules.repositories.filesystem import LocalBossRepository
+    from modules.logic.parser import LocalBossParser
+    root:str = os.getcwd()
+    requested_heights:list[int] = [int(arg) for arg in sys.argv[1:]] or [150]
+    parser:LocalBossParser = LocalBossParser()
+    boss_list:list[LocalBoss] = [parser.local_boss_json_to_object(data) for data in LocalBossRepository(os.path.join(root,"data","local_bosses.json")).load()]
+    output_path:str = os.path.join(root,"assets","cache","thumbnails.atlas")
+    if build_atlas(boss_list,os.path.join(root,"assets","images"),output_path,requested_heights):
+        print(f"Built {output_path} for {len(boss_list)} bosses at heights {requested_heights} ({os.path.getsize(output_path)} bytes)")
@@ -0,0 +1,141 @@
+from base.logging import Logger
+from modules.objects.boss import LocalBoss
+from collections import Counter
+
+def normalize_boss_name(name:str) -> str:
+    """Folds a boss name, api_name or alias to its lookup key: case-folded, underscores as spaces, single spaces."""
+    return " ".join(str(name).replace("_"," ").casefold().split())
+
+def edit_distance(a:str,b:str,limit:int) -> int:
+    """Returns the Levenshtein distance between a and b (with adjacent swaps counting as one edit), or limit + 1 as soon as it must exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous:list[int] = []
+    previous:list[int] = list(range(len(b) + 1))
+    for i in range(1,len(a) + 1):
+        current:list[int] = [i] + [0] * len(b)
+        for j in range(1,len(b) + 1):
+            cost:int = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1,current[j - 1] + 1,previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j],previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous,previous = previous,current
+    return previous[-1]
+
+def letter_distance(a:Counter,b:Counter) -> int:
+    """Returns a lower bound of the edit distance between two strings from their letter counts: every edit changes at most one letter on each side."""
+    return max(sum((a - b).values()),sum((b - a).values()))
+
+class _TrieNode:
+    __slots__ = ("children","api_names")
+    def __init__(self):
+        self.children:dict[str,_TrieNode] = {}
+        # every boss with a key (or a word of a key) starting with the prefix of this node
+        self.api_names:set[str] = set()
+
+class BossCatalog(Logger):
+    """Looks bosses up by name, api_name or alias.  Exact lookups are a dict lookup on the normalized key.
+    Every key, and every word within a key, is also indexed in a prefix trie, so "mole" or "giant m" find Giant Mole,
+    and misspellings fall back to a bounded edit distance search over the keys."""
+    def __init__(self,bosses:list[LocalBoss] = None):
+        super().__init__()
+        self.__by_key:dict[str,LocalBoss] = {}
+        self.__bosses:dict[str,LocalBoss] = {}
+        # key -> letter counts of the key, to skip keys that cannot be close misspellings without running the edit distance
+        self.__key_letters:dict[str,Counter] = {}
+        self.__trie:_TrieNode = _TrieNode()
+        if bosses:
+            self.build(bosses)
+
+    def build(self,bosses:list[LocalBoss]):
+        """Rebuilds the index from the bosses.  A key shared by two bosses (such as a duplicated alias) keeps the first boss."""
+        self.__by_key = {}
+        self.__bosses = {}
+        self.__key_letters = {}
+        self.__trie = _TrieNode()
+        for boss in bosses:
+            if not boss:
+                continue
+            self.__bosses[boss.api_name] = boss
+            for key in self.keys(boss):
+                existing:LocalBoss = self.__by_key.get(key)
+                if existing is not None and existing is not boss:
+                    self.warn(self,f"'{key}' names both {existing.api_name} and {boss.api_name}, keeping {existing.api_name}",self.build)
+                    continue
+                self.__by_key[key] = boss
+                self.__key_letters[key] = Counter(key)
+                self.__insert(key,boss.api_name)
+
+    def keys(self,boss:LocalBoss) -> list[str]:
+        """Returns the normalized lookup keys of a boss: its name, api_name and aliases."""
+        keys:list[str] = []
+        for name in [boss.name,boss.api_name] + list(getattr(boss,"aliases",[]) or []):
+            key:str = normalize_boss_name(name)
+            if key and key not in keys:
+                keys.append(key)
+        return keys
+
+    def __insert(self,key:str,api_name:str):
+        words:list[str] = key.split(" ")
+        for start in range(len(words)):
+            node:_TrieNode = self.__trie
+            for character in " ".join(words[start:]):
+                node = node.children.setdefault(character,_TrieNode())
+                node.api_names.add(api_name)
+
+    def find(self,name:str) -> LocalBoss:
+        """Returns the boss with the exact name, api_name or alias (case and underscores ignored), or None if there is none."""
+        return self.__by_key.get(normalize_boss_name(name))
+
+    def prefix_matches(self,prefix:str) -> list[LocalBoss]:
+        """Returns the bosses with a name, api_name, alias or word in one of those starting with prefix, by name."""
+        node:_TrieNode = self.__trie
+        for character in normalize_boss_name(prefix):
+            node = node.children.get(character)
+            if node is None:
+                return []
+        return sorted((self.__bosses[api_name] for api_name in node.api_names),key=lambda boss: boss.name)
+
+    def resolve(self,name:str) -> LocalBoss:
+        """Returns the boss for an exact name, api_name or alias, or the only boss matching it as a prefix.  Returns None if there is no single match."""
+        if not normalize_boss_name(name):
+            return None
+        boss:LocalBoss = self.find(name)
+        if boss is not None:
+            return boss
+        matches:list[LocalBoss] = self.prefix_matches(name)
+        return matches[0] if len(matches) == 1 else None
+
+    def suggest(self,name:str,limit:int = 5) -> list[LocalBoss]:
+        """Returns up to 'limit' bosses the name may refer to, best first: an exact match, then prefix matches, then the closest misspellings
+        (within one edit per three characters, so names shorter than three characters get no misspelling suggestions)."""
+        query:str = normalize_boss_name(name)
+        if not query:
+            return []
+        exact:LocalBoss = self.find(query)
+        ranked:dict[str,LocalBoss] = {exact.api_name:exact} if exact is not None else {}
+        for boss in self.prefix_matches(query):
+            ranked.setdefault(boss.api_name,boss)
+        # misspellings are only searched when the name did not match anything as typed
+        max_distance:int = len(query) // 3
+        if not ranked and max_distance > 0:
+            query_letters:Counter = Counter(query)
+            distances:dict[str,tuple[int,LocalBoss]] = {}
+            for key,boss in self.__by_key.items():
+                # compare with the whole key and with its start, so a misspelled prefix still matches
+                start:str = key[:len(query)]
+                distance:int = max_distance + 1
+                if letter_distance(query_letters,self.__key_letters[key]) <= max_distance:
+                    distance = edit_distance(query,key,max_distance)
+                if distance > max_distance and start != key and letter_distance(query_letters,Counter(start)) <= max_distance:
+                    distance = edit_distance(query,start,max_distance)
+                if distance <= max_distance and distance < distances.get(boss.api_name,(max_distance + 1,None))[0]:
+                    distances[boss.api_name] = (distance,boss)
+            for _,boss in sorted(distances.values(),key=lambda item: (item[0],item[1].name)):
+                ranked[boss.api_name] = boss
+        return list(ranked.values())[:limit]
+
+    def __len__(self) -> int:
+        return len(self.__bosses)
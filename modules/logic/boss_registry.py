@@ -0,0 +1,59 @@
+from base.logging import Logger
+from modules.objects.boss import LocalBoss
+
+class BossRegistry(Logger):
+    """The canonical LocalBoss objects, keyed by api_name.  Every part of the bot resolves boss ids through the same registry,
+    so a boss is always the same object and can be compared (or stored) by its api_name."""
+    def __init__(self,bosses:list[LocalBoss] = None):
+        super().__init__()
+        self.__bosses:dict[str,LocalBoss] = {}
+        if bosses:
+            self.register(bosses)
+
+    def register(self,bosses:list[LocalBoss],keep_ids:set[str] = None):
+        """Replaces the registered bosses.  Bosses that are still present keep their existing object, updated in place.
+        Bosses in keep_ids stay registered even if they are not in bosses (such as the bosses of the current session)."""
+        registered:dict[str,LocalBoss] = {}
+        for boss in bosses:
+            if not boss:
+                continue
+            existing:LocalBoss = self.__bosses.get(boss.api_name)
+            if existing is not None and existing is not boss:
+                existing.name,existing.level,existing.location,existing.image,existing.weight,existing.aliases = boss.name,boss.level,boss.location,boss.image,boss.weight,boss.aliases
+                boss = existing
+            registered[boss.api_name] = boss
+        for api_name in keep_ids or ():
+            if api_name not in registered and api_name in self.__bosses:
+                registered[api_name] = self.__bosses[api_name]
+        self.__bosses = registered
+
+    def intern(self,boss:LocalBoss) -> LocalBoss:
+        """Returns the registered boss with the same api_name, registering this one if there is none (such as a boss loaded from old session data)."""
+        if not boss:
+            return None
+        existing:LocalBoss = self.__bosses.get(boss.api_name)
+        if existing is not None:
+            return existing
+        self.warn(self,f"Registering unknown boss {boss.api_name}, it is not in the boss data",self.intern)
+        self.__bosses[boss.api_name] = boss
+        return boss
+
+    def get(self,api_name:str) -> LocalBoss:
+        """Returns the boss with the api_name, or None if there is none."""
+        if api_name is None:
+            return None
+        return self.__bosses.get(api_name)
+
+    def resolve(self,api_names:list[str]) -> list[LocalBoss]:
+        """Returns the bosses for the api_names, in order.  Unknown api_names are skipped."""
+        return [self.__bosses[api_name] for api_name in api_names if api_name in self.__bosses]
+
+    def all(self) -> list[LocalBoss]:
+        """Returns every registered boss."""
+        return list(self.__bosses.values())
+
+    def __contains__(self,api_name:str) -> bool:
+        return api_name in self.__bosses
+
+    def __len__(self) -> int:
+        return len(self.__bosses)
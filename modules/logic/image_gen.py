@@ -1,44 +1,257 @@
-from PIL import Image
+from __future__ import annotations
+from base.lazy_import import lazy_import
 import os
+import io
+import threading
 
-def combine_images(image_paths:list[str],save_folder:str,scale:float = 1.0) -> str:
-    """generates and saves an image from a list of image paths.  Returns the path to the generated image, or None if an error occurs."""
-    paths:list[str] = image_paths
-    images:list = []
-    for path in paths:
-        if os.path.isfile(path):
-            try:
-                with Image.open(path) as img:
-                    copied_img = img.copy()
-                    images.append(copied_img)
-                    img.close()
-            except Exception as e:
-                print(f"Error loading image: {e}")
-                return None
+# PIL is imported on the first image render, not at startup
+Image = lazy_import("PIL.Image")
+ImageDraw = lazy_import("PIL.ImageDraw")
+ImageFont = lazy_import("PIL.ImageFont")
+
+def load_tile(path:str,scale:float = 1.0) -> Image.Image:
+    """Decodes an image file into an RGBA tile, scaled by 'scale'.  Returns None if the file does not exist or can not be decoded."""
+    if not os.path.isfile(path):
+        return None
     try:
-        total_width:int = 0
-        total_height:int = 0
-        for image in images:
-            image = image.convert("RGBA")
-            total_width += image.width
-            total_height = max(total_height,image.height)
-        new_image:Image = Image.new("RGBA", (total_width,total_height))
-        image_x:int = 0
-        for i in range(len(images)):
-            image:Image = images[i]
-            new_image.paste(image, (image_x,0))
-            image_x += image.width
-            image.close()
-        #scale the image
-        new_image = new_image.resize((int(new_image.width*scale),int(new_image.height*scale)))
-        new_image_path:str = os.path.join(save_folder,"combined_image.png")
-        #remove old image if it exists
-        if os.path.isfile(new_image_path):
-            os.remove(new_image_path)
-        new_image.save(new_image_path)
+        with Image.open(path) as img:
+            tile:Image.Image = img.convert("RGBA")
+    except Exception as e:
+        print(f"Error loading image: {e}")
+        return None
+    if scale != 1.0:
+        tile = tile.resize((max(1,int(tile.width*scale)),max(1,int(tile.height*scale))))
+    return tile
+
+def compose_tiles(tiles:list[Image.Image]) -> Image.Image:
+    """Pastes tiles side by side, top aligned, into a new RGBA image.  The tiles are not modified."""
+    total_width:int = sum(tile.width for tile in tiles)
+    total_height:int = max((tile.height for tile in tiles),default=0)
+    new_image:Image.Image = Image.new("RGBA", (max(1,total_width),max(1,total_height)))
+    image_x:int = 0
+    for tile in tiles:
+        new_image.paste(tile, (image_x,0))
+        image_x += tile.width
+    return new_image
+
+def encode_image(image:Image.Image,image_format:str = "PNG") -> bytes:
+    """Encodes an image in memory and returns the encoded bytes."""
+    buffer:io.BytesIO = io.BytesIO()
+    image.save(buffer,format=image_format)
+    return buffer.getvalue()
+
+# upload encodings and the file extension each produces
+IMAGE_ENCODINGS:dict[str,str] = {"png":"png","png8":"png","webp":"webp"}
+
+def image_extension(data:bytes) -> str:
+    """Returns the file extension for encoded image bytes, from their signature."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    if data[:3] == b"\xff\xd8\xff":
+        return "jpg"
+    if data[:6] in (b"GIF87a",b"GIF89a"):
+        return "gif"
+    return "png"
+
+class ImageEncoder:
+    """Encodes images for upload, choosing between optimized PNG ('png'), palette quantized PNG ('png8') and WebP ('webp').
+    Every format is encoded and the smallest output within max_bytes is used (the earlier format wins a tie).
+    Without a budget, or if no output fits it, the smallest output overall is used.  quality (1-100) applies to WebP, and colors to 'png8'."""
+    def __init__(self,formats:list[str] = None,quality:int = 80,max_bytes:int = None,colors:int = 256):
+        self.formats:list[str] = [encoding for encoding in (formats or ["png"]) if encoding in IMAGE_ENCODINGS] or ["png"]
+        self.quality:int = quality
+        self.max_bytes:int = max_bytes
+        self.colors:int = colors
+
+    def encode_as(self,image:Image.Image,encoding:str) -> bytes:
+        """Encodes the image in a single format.  Returns None if the format is not supported by this Pillow build."""
+        buffer:io.BytesIO = io.BytesIO()
+        try:
+            if encoding == "png8":
+                # fast octree is the built-in method that keeps the alpha channel
+                quantized:Image.Image = image.quantize(colors=self.colors,method=Image.Quantize.FASTOCTREE)
+                quantized.save(buffer,format="PNG",optimize=True)
+                quantized.close()
+            elif encoding == "webp":
+                image.save(buffer,format="WEBP",quality=self.quality,method=4)
+            else:
+                image.save(buffer,format="PNG",optimize=True)
+        except (OSError,KeyError,ValueError) as e:
+            print(f"Error encoding image as {encoding}: {e}")
+            return None
+        return buffer.getvalue()
+
+    def encode(self,image:Image.Image) -> bytes:
+        """Encodes the image for upload and returns the chosen bytes (see image_extension for the file type), or None if every format failed."""
+        smallest:bytes = None
+        smallest_fitting:bytes = None
+        for encoding in self.formats:
+            data:bytes = self.encode_as(image,encoding)
+            if data is None:
+                continue
+            if smallest is None or len(data) < len(smallest):
+                smallest = data
+            if self.max_bytes and len(data) <= self.max_bytes and (smallest_fitting is None or len(data) < len(smallest_fitting)):
+                smallest_fitting = data
+        return smallest_fitting or smallest
+
+    def key(self) -> str:
+        """Returns a string identifying the encoder settings, for cache fingerprints."""
+        return f"{','.join(self.formats)}|{self.quality}|{self.max_bytes}|{self.colors}"
+
+def save_bytes(data:bytes,save_path:str) -> bool:
+    """Writes encoded image bytes to save_path through a temporary file, so readers never see a partially written image.  Returns True if successful."""
+    temp_path:str = f"{save_path}.{os.getpid()}.{id(data)}.tmp"
+    try:
+        with open(temp_path,"wb") as file:
+            file.write(data)
+        os.replace(temp_path,save_path)
+        return True
+    except OSError as e:
+        print(f"Error saving image: {e}")
+        if os.path.isfile(temp_path):
+            os.remove(temp_path)
+        return False
+
+def combine_images(image_paths:list[str],scale:float = 1.0,tile_loader = None,save_path:str = None,encoder:ImageEncoder = None) -> bytes:
+    """generates an image from a list of image paths, side by side, and returns it as encoded bytes, or None if an error occurs.
+    tile_loader is an optional function (path, scale) -> tile used instead of decoding every image from disk (such as a cache lookup).
+    If save_path is set, a copy of the encoded image is also written to that path.  encoder chooses the output format (plain PNG if not set)."""
+    tile_loader = tile_loader or load_tile
+    tiles:list[Image.Image] = []
+    for path in image_paths:
+        if not os.path.isfile(path):
+            continue
+        tile:Image.Image = tile_loader(path,scale)
+        if tile is None:
+            return None
+        tiles.append(tile)
+    try:
+        # tiles are scaled before compositing, so the full size composite is never built
+        new_image:Image.Image = compose_tiles(tiles)
+        data:bytes = encoder.encode(new_image) if encoder else encode_image(new_image)
         # release memory
         new_image.close()
-        return new_image_path
+        if save_path:
+            save_bytes(data,save_path)
+        return data
     except Exception as e:
         print(f"Error combining images: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+class LeaderboardImageRenderer:
+    """Renders the leaderboard (boss art header, rank rows and kill counts) into a single PNG image held in memory.
+    Fonts, backgrounds and the per-boss header are cached across refreshes, only the rows area is redrawn when the rankings change,
+    and the encoded image is reused as-is while the rankings hash is unchanged.  render is thread safe: renders run one at a time, since the caches are shared."""
+    def __init__(self,width:int = 600,header_height:int = 160,row_height:int = 28,max_rows:int = 15,font_name:str = "DejaVuSans.ttf",encoder:ImageEncoder = None):
+        self.width:int = width
+        self.header_height:int = header_height
+        self.row_height:int = row_height
+        self.max_rows:int = max_rows
+        self.font_name:str = font_name
+        self.encoder:ImageEncoder = encoder
+        self.background_color:tuple = (32,34,37,255)
+        self.row_colors:list[tuple] = [(47,49,54,255),(54,57,63,255)]
+        self.text_color:tuple = (220,221,222,255)
+        self.podium_colors:list[tuple] = [(255,215,0,255),(192,192,192,255),(205,127,50,255)]
+        self.__fonts:dict[int,object] = {}
+        self.__backgrounds:dict[tuple[int,int],Image.Image] = {}
+        self.__headers:dict[tuple,Image.Image] = {}
+        self.__last_hash:int = None
+        self.__last_image:bytes = None
+        # renders run in worker threads (asyncio.to_thread), overlapping leaderboard updates must not race on the caches
+        self.__render_lock:threading.Lock = threading.Lock()
+
+    def __font(self,size:int):
+        """Returns a cached font of the given size, falling back to the default bitmap font if the truetype font is not available."""
+        if size not in self.__fonts:
+            try:
+                self.__fonts[size] = ImageFont.truetype(self.font_name,size)
+            except OSError:
+                self.__fonts[size] = ImageFont.load_default()
+        return self.__fonts[size]
+
+    def __background(self,width:int,height:int) -> Image.Image:
+        """Returns a cached, striped background for a rows area of the given size.  Callers must copy it before drawing."""
+        key:tuple[int,int] = (width,height)
+        if key not in self.__backgrounds:
+            background:Image.Image = Image.new("RGBA",key,self.background_color)
+            draw:ImageDraw.ImageDraw = ImageDraw.Draw(background)
+            for row in range(height // self.row_height):
+                top:int = row * self.row_height
+                draw.rectangle((0,top,width,top + self.row_height - 1),fill=self.row_colors[row % 2])
+            self.__backgrounds[key] = background
+        return self.__backgrounds[key]
+
+    def __header(self,boss_image_path:str,title:str,art:Image.Image = None) -> Image.Image:
+        """Returns the cached header (boss art and title) for a boss, rendering it if the image file or title changed.
+        art is an optional ready-made tile used instead of decoding boss_image_path."""
+        mtime:float = os.path.getmtime(boss_image_path) if os.path.isfile(boss_image_path) else 0.0
+        key:tuple = (boss_image_path,mtime,title)
+        if key not in self.__headers:
+            header:Image.Image = Image.new("RGBA",(self.width,self.header_height),self.background_color)
+            art_width:int = 0
+            if art is None and mtime:
+                with Image.open(boss_image_path) as img:
+                    art = img.convert("RGBA")
+            if art is not None:
+                art_height:int = self.header_height - 10
+                art_width = max(1,int(art.width * art_height / art.height))
+                if art_width > self.width // 2:
+                    art_height = max(1,int(art_height * (self.width // 2) / art_width))
+                    art_width = self.width // 2
+                art = art.resize((art_width,art_height))
+                header.paste(art,(5,(self.header_height - art_height) // 2),art)
+            draw:ImageDraw.ImageDraw = ImageDraw.Draw(header)
+            # shrink the title font until it fits beside the boss art
+            title = title.replace(" | ","\n")
+            size:int = 22
+            while size > 10 and draw.multiline_textbbox((0,0),title,font=self.__font(size),spacing=6)[2] > self.width - art_width - 30:
+                size -= 2
+            draw.multiline_text((art_width + 20,10),title,font=self.__font(size),fill=self.text_color,spacing=6)
+            self.__headers[key] = header
+        return self.__headers[key]
+
+    def __rows(self,rows:list[tuple[int,str,int]]) -> Image.Image:
+        """Draws the rank rows onto a copy of the cached background."""
+        count:int = max(1,len(rows))
+        rows_area:Image.Image = self.__background(self.width,count * self.row_height).copy()
+        draw:ImageDraw.ImageDraw = ImageDraw.Draw(rows_area)
+        font = self.__font(16)
+        if not rows:
+            draw.text((10,6),"No data to display",font=font,fill=self.text_color)
+        for i,(rank,name,kills) in enumerate(rows):
+            top:int = i * self.row_height + 6
+            color:tuple = self.podium_colors[rank - 1] if 0 < rank <= len(self.podium_colors) else self.text_color
+            draw.text((10,top),f"#{rank}",font=font,fill=color)
+            draw.text((70,top),name,font=font,fill=self.text_color)
+            draw.text((self.width - 90,top),f"{kills}",font=font,fill=color)
+        return rows_area
+
+    def render(self,boss_image_path:str,title:str,rows:list[tuple[int,str,int]],art:Image.Image = None) -> bytes:
+        """Renders the leaderboard image and returns the encoded bytes (PNG unless an encoder is set).  rows is a list of (rank, name, kills), already sorted;
+        only the first max_rows rows are drawn.  art is an optional ready-made boss tile (such as from the thumbnail atlas).
+        Returns the previously rendered bytes if nothing changed, or None if an error occurs.  Waits for a render in another thread to finish first."""
+        with self.__render_lock:
+            return self.__render(boss_image_path,title,rows,art)
+
+    def __render(self,boss_image_path:str,title:str,rows:list[tuple[int,str,int]],art:Image.Image = None) -> bytes:
+        rows = [(int(rank),str(name),int(kills)) for rank,name,kills in rows[:self.max_rows]]
+        rankings_hash:int = hash((boss_image_path,title,tuple(rows)))
+        if rankings_hash == self.__last_hash and self.__last_image:
+            return self.__last_image
+        try:
+            header:Image.Image = self.__header(boss_image_path,title,art)
+            rows_area:Image.Image = self.__rows(rows)
+            image:Image.Image = Image.new("RGBA",(self.width,header.height + rows_area.height),self.background_color)
+            image.paste(header,(0,0))
+            image.paste(rows_area,(0,header.height))
+            data:bytes = self.encoder.encode(image) if self.encoder else encode_image(image)
+            image.close()
+            self.__last_hash = rankings_hash
+            self.__last_image = data
+            return self.__last_image
+        except Exception as e:
+            print(f"Error rendering leaderboard image: {e}")
+            return None
@@ -0,0 +1,76 @@
+from typing import Iterable, Iterator
+
+# discord size limits
+MESSAGE_LIMIT:int = 2000
+EMBED_TITLE_LIMIT:int = 256
+EMBED_DESCRIPTION_LIMIT:int = 4096
+
+class PageBuilder:
+    """Incrementally builds a single page of newline separated lines without exceeding a character limit.
+    Lines are collected in a list and joined once, instead of re-concatenating the page string for every line."""
+    def __init__(self,limit:int,header:str = ""):
+        self.limit:int = limit
+        self.header:str = header
+        self.__lines:list[str] = [header] if header else []
+        self.__length:int = len(header)
+        self.__line_count:int = 0
+
+    def fits(self,line:str) -> bool:
+        """Returns True if the line can be added to the page without exceeding the limit."""
+        separator:int = 1 if self.__lines else 0
+        return self.__length + separator + len(line) <= self.limit
+
+    def add(self,line:str) -> bool:
+        """Adds a line to the page.  Returns False if the line does not fit, in which case the page is unchanged."""
+        if not self.fits(line):
+            return False
+        self.__length += len(line) + (1 if self.__lines else 0)
+        self.__lines.append(line)
+        self.__line_count += 1
+        return True
+
+    def is_empty(self) -> bool:
+        """Returns True if no lines (other than the header) have been added."""
+        return self.__line_count == 0
+
+    def build(self) -> str:
+        """Returns the page text."""
+        return "\n".join(self.__lines)
+
+def _split_line(line:str,limit:int) -> list[str]:
+    """Hard splits a single line that is longer than the limit."""
+    return [line[i:i + limit] for i in range(0,len(line),limit)] or [""]
+
+def paginate_lines(lines:Iterable[str],limit:int = MESSAGE_LIMIT,header:str = "") -> Iterator[str]:
+    """Streams lines into pages of at most 'limit' characters.  The header (if any) is repeated at the top of every page.
+    Lines that are too long to fit on a page on their own are split.  Yields nothing if there are no lines."""
+    # a header that leaves no room for the body is cut, so at least one character of every line fits under it
+    if header and len(header) + 2 > limit:
+        header = header[:(limit - 1) // 2]
+    builder:PageBuilder = PageBuilder(limit,header)
+    for line in lines:
+        if builder.add(line):
+            continue
+        if not builder.is_empty():
+            yield builder.build()
+            builder = PageBuilder(limit,header)
+            if builder.add(line):
+                continue
+        # the line does not fit on an empty page, split it
+        for part in _split_line(line,limit - len(header) - 1 if header else limit):
+            if not builder.add(part):
+                yield builder.build()
+                builder = PageBuilder(limit,header)
+                builder.add(part)
+    if not builder.is_empty():
+        yield builder.build()
+
+def select_rows(rows:list,top:int = None,include_index:int = -1) -> list[tuple[int,object]]:
+    """Selects the rows to display from an already sorted list.  Returns (position, row) pairs for the first 'top' rows,
+    plus the row at include_index (such as the caller's own row) if it falls outside the top rows.  If top is None, every row is returned."""
+    if top is None or top >= len(rows):
+        return list(enumerate(rows))
+    selected:list[tuple[int,object]] = list(enumerate(rows[:max(0,top)]))
+    if include_index >= max(0,top) and include_index < len(rows):
+        selected.append((include_index,rows[include_index]))
+    return selected
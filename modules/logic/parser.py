@@ -3,9 +3,14 @@ from modules.dtos.wise_old_man_data import WiseOldManPlayerData, WiseOldManBossD
 from modules.objects.player import Player
 from modules.objects.boss import Boss, LocalBoss
 from modules.state.session import Session
+from modules.logic.boss_registry import BossRegistry
 from modules.state.discord_state import DiscordState
 from modules.state.event_state import EventState
 from modules.state.api_state import ApiState
+from modules.state.image_state import ImageState
+from modules.state.pool_state import PoolState
+from modules.state.logging_state import LoggingState
+from modules.state.cadence_state import CadenceState
 import datetime
 import json
 
@@ -18,7 +23,7 @@ class TimeParser(Logger):
         if not time:
             self.warn(self,"No time to convert to string",self.datetime_to_str)
             return ""
-        self.log(self,f"Converting datetime to string",self.datetime_to_str)
+        self.log(self,"Converting datetime to string",self.datetime_to_str)
         return time.strftime("%Y-%m-%d %H:%M:%S")
     
     def str_to_datetime(self,time_str:str) -> datetime.datetime:
@@ -26,7 +31,7 @@ class TimeParser(Logger):
         if not time_str:
             self.warn(self,"No time string to convert to datetime",self.str_to_datetime)
             return None
-        self.log(self,f"Converting string to datetime",self.str_to_datetime)
+        self.log(self,"Converting string to datetime",self.str_to_datetime)
         return datetime.datetime.strptime(time_str,"%Y-%m-%d %H:%M:%S")
 
 class WiseOldManParser(Logger):
@@ -49,7 +54,7 @@ class WiseOldManParser(Logger):
                 kills = boss["kills"]
                 if kills < 0: kills = 0
                 boss_data.append(WiseOldManBossData(boss["metric"],kills,boss["rank"],boss["ehb"]))
-            self.log(self,f"Parsed player data for {username}",self.json_to_object)
+            self.log(self,"Parsed player data for %s",self.json_to_object,username)
             return WiseOldManPlayerData(username,display_name,snapshot_creation,boss_data)
         except Exception as e:
             self.error(self,f"Error parsing player data: {e}",self.json_to_object)
@@ -87,7 +92,7 @@ class PlayerParser(Logger):
         if not player:
             self.warn(self,"No player to convert to JSON",self.player_to_json)
             return {}
-        self.log(self,f"Converting player {player.discord_name} to JSON",self.player_to_json)
+        self.log(self,"Converting player %s to JSON",self.player_to_json,player.discord_name)
         player_data:dict = {
             "discord_name":player.discord_name,
             "osrs_name":player.osrs_name,
@@ -108,7 +113,7 @@ class PlayerParser(Logger):
         if not player or not player_data:
             self.warn(self,"No player or player data to combine",self.combine_player_data)
             return None
-        self.log(self,f"Combining player data for {player.osrs_name}",self.combine_player_data)
+        self.log(self,"Combining player data for %s",self.combine_player_data,player.osrs_name)
         for boss in player.boss_list:
             for wise_boss in player_data.boss_data:
                 if boss.name == wise_boss.name:
@@ -134,7 +139,9 @@ class LocalBossParser(Logger):
             "api_name":boss.api_name,
             "level":boss.level,
             "location":boss.location,
-            "image":boss.image
+            "image":boss.image,
+            "weight":boss.weight,
+            "aliases":boss.aliases
         }
     
     def local_boss_json_to_object(self,boss_data:dict) -> LocalBoss:
@@ -143,46 +150,74 @@ class LocalBossParser(Logger):
             self.warn(self,"No boss data to convert to object",self.local_boss_json_to_object)
             return None
         #self.log(self,f"Converting boss data to object",self.local_boss_json_to_object)
-        return LocalBoss(boss_data["name"],boss_data["api_name"],boss_data["level"],boss_data["location"],boss_data["image"])
+        return LocalBoss(boss_data["name"],boss_data["api_name"],boss_data["level"],boss_data["location"],boss_data["image"],boss_data.get("weight",1.0),boss_data.get("aliases",[]))
     
 class SessionParser(Logger):
-    def __init__(self):
+    def __init__(self,registry:BossRegistry = None):
+        """registry is the boss registry sessions resolve their boss ids through."""
         super().__init__()
         self.__boss_parser:LocalBossParser = LocalBossParser()
         self.__time_parser:TimeParser = TimeParser()
+        self.__registry:BossRegistry = registry or BossRegistry()
 
     def session_to_json(self,session:Session) -> dict:
-        """Converts a session object to a dictionary for JSON serialization.  Returns a dict, or an empty dict if the session is None."""
+        """Converts a session object to a dictionary for JSON serialization.  Bosses are stored by api_name.  Returns a dict, or an empty dict if the session is None."""
         if not session:
             self.warn(self,"No session to convert to JSON",self.session_to_json)
             return {}
-        self.log(self,f"Converting session {session.session_name} to JSON",self.session_to_json)
+        self.log(self,"Converting session %s to JSON",self.session_to_json,session.session_name)
         return {
             "session_name":session.session_name,
             "tracking_active":session.tracking_active,
             "voting_active":session.voting_active,
-            "last_boss":self.__boss_parser.local_boss_to_json(session.last_boss) if session.last_boss else None,
-            "current_boss": self.__boss_parser.local_boss_to_json(session.current_boss) if session.current_boss else None,
-            "boss_pool":[self.__boss_parser.local_boss_to_json(boss) for boss in session.boss_pool] if session.boss_pool else [],
+            "last_boss":session.last_boss_id,
+            "current_boss":session.current_boss_id,
+            "boss_pool":list(session.boss_pool_ids),
             "start_time":self.__time_parser.datetime_to_str(session.start_time),
-            "used_boss_list":[self.__boss_parser.local_boss_to_json(boss) for boss in session.used_boss_list] if session.used_boss_list else []
+            "used_boss_list":sorted(session.used_boss_ids),
+            "used_boss_times":{api_name:self.__time_parser.datetime_to_str(used) for api_name,used in session.used_boss_times.items()},
+            "next_boss_pool":list(session.next_boss_pool_ids),
+            "next_pool_fingerprint":session.next_pool_fingerprint,
+            "next_pool_image":session.next_pool_image,
+            "voting_message_id":session.voting_message_id
         }
-    
+
+    def __boss_id(self,boss_data) -> str:
+        """Returns the api_name of a stored boss.  Older session files stored the full boss, which is interned into the registry."""
+        if not boss_data:
+            return None
+        if isinstance(boss_data,dict):
+            boss:LocalBoss = self.__registry.intern(self.__boss_parser.local_boss_json_to_object(boss_data))
+            return boss.api_name if boss else None
+        if boss_data not in self.__registry:
+            self.warn(self,f"Session refers to unknown boss {boss_data}",self.json_to_session)
+        return boss_data
+
+    def __boss_ids(self,boss_list:list) -> list[str]:
+        return [boss_id for boss_id in (self.__boss_id(boss_data) for boss_data in boss_list or []) if boss_id]
+
     def json_to_session(self,session_data:dict) -> Session:
         """Converts a dictionary to a session object.  Returns a Session object, or None if the session_data is invalid."""
         if not session_data:
             self.warn(self,"No session data to convert to object",self.json_to_session)
             return None
         self.log(self,f"Converting session data to object",self.json_to_session)
-        session:Session = Session()
+        session:Session = Session(self.__registry)
         session.session_name = session_data["session_name"]
         session.tracking_active = session_data["tracking_active"]
         session.voting_active = session_data["voting_active"]
-        session.last_boss = self.__boss_parser.local_boss_json_to_object(session_data["last_boss"])
-        session.current_boss = self.__boss_parser.local_boss_json_to_object(session_data["current_boss"])
-        session.boss_pool = [self.__boss_parser.local_boss_json_to_object(boss_data) for boss_data in session_data["boss_pool"]] if session_data["boss_pool"] else []
+        session.last_boss_id = self.__boss_id(session_data["last_boss"])
+        session.current_boss_id = self.__boss_id(session_data["current_boss"])
+        session.boss_pool_ids = self.__boss_ids(session_data["boss_pool"])
         session.start_time = self.__time_parser.str_to_datetime(session_data["start_time"])
-        session.used_boss_list = [self.__boss_parser.local_boss_json_to_object(boss_data) for boss_data in session_data["used_boss_list"]] if session_data["used_boss_list"] else []
+        # older session files only list the used bosses, they count as used when the session last changed
+        used_times:dict = session_data.get("used_boss_times",{})
+        session.used_boss_times = {api_name:self.__time_parser.str_to_datetime(used_times[api_name]) if used_times.get(api_name) else session.start_time
+                                   for api_name in self.__boss_ids(session_data["used_boss_list"])}
+        session.next_boss_pool_ids = self.__boss_ids(session_data.get("next_boss_pool",[]))
+        session.next_pool_fingerprint = session_data.get("next_pool_fingerprint","")
+        session.next_pool_image = session_data.get("next_pool_image","")
+        session.voting_message_id = session_data.get("voting_message_id")
         return session
     
 class DiscordParser(Logger):
@@ -202,6 +237,9 @@ class DiscordParser(Logger):
         discord_state.set_name_channel_id = discord_data["set name channel id"]
         discord_state.console_channel_id = discord_data["console channel id"]
         discord_state.discord_admin_list = discord_data["admin list"]
+        discord_state.console_flush_seconds = discord_data.get("console flush seconds",discord_state.console_flush_seconds)
+        discord_state.vote_update_seconds = discord_data.get("vote update seconds",discord_state.vote_update_seconds)
+        discord_state.reload_poll_seconds = discord_data.get("reload poll seconds",discord_state.reload_poll_seconds)
         return discord_state
     
     def discord_to_json(self,discord_state:DiscordState) -> dict:
@@ -215,7 +253,10 @@ class DiscordParser(Logger):
             "leaderboard channel id":discord_state.leaderboard_channel_id,
             "set name channel id":discord_state.set_name_channel_id,
             "console channel id":discord_state.console_channel_id,
-            "admin list":discord_state.discord_admin_list
+            "admin list":discord_state.discord_admin_list,
+            "console flush seconds":discord_state.console_flush_seconds,
+            "vote update seconds":discord_state.vote_update_seconds,
+            "reload poll seconds":discord_state.reload_poll_seconds
         }
         return discord_data
     
@@ -322,7 +363,9 @@ class ApiParser(Logger):
             url = api_data["url"],
             discord_contact_name = api_data["discord contact name"],
             bulk_update_frequency_minutes = api_data["bulk update frequency minutes"],
-            update_ratelimit_seconds = api_data["update ratelimit seconds"]
+            update_ratelimit_seconds = api_data["update ratelimit seconds"],
+            update_overlap = api_data.get("update overlap","skip"),
+            update_jitter_seconds = api_data.get("update jitter seconds",0.0)
         )
     
     def api_to_json(self,api_state:ApiState) -> dict:
@@ -333,7 +376,10 @@ class ApiParser(Logger):
         api_data:dict = {
             "url":api_state.url,
             "discord contact name":api_state.discord_contact_name,
-            "bulk update frequency":api_state.update_frequency
+            "bulk update frequency minutes":api_state.bulk_update_frequency_minutes,
+            "update ratelimit seconds":api_state.update_ratelimit_seconds,
+            "update overlap":api_state.update_overlap,
+            "update jitter seconds":api_state.update_jitter_seconds
         }
         return api_data
     
@@ -343,4 +389,177 @@ class ApiParser(Logger):
             self.warn(self,"No config JSON or ApiState to combine",self.update_config)
             return {}
         config_json["api"] = self.api_to_json(api_state)
-        return config_json
\ No newline at end of file
+        return config_json
+    
+class ImageParser(Logger):
+    def __init__(self):
+        super().__init__()
+
+    def json_to_image(self,config_json:dict) -> ImageState:
+        """Converts the optional 'images' section of the config dictionary to an ImageState object.  Missing values use the ImageState defaults.
+        Returns None if the config_json is invalid."""
+        if not config_json:
+            self.warn(self,"No config JSON to convert to ImageState",self.json_to_image)
+            return None
+        image_data:dict = config_json.get("images",{})
+        defaults:ImageState = ImageState()
+        return ImageState(
+            worker_pool = image_data.get("worker pool",defaults.worker_pool),
+            workers = image_data.get("workers",defaults.workers),
+            render_timeout_seconds = image_data.get("render timeout seconds",defaults.render_timeout_seconds),
+            atlas_heights = image_data.get("atlas heights",defaults.atlas_heights),
+            formats = image_data.get("formats",defaults.formats),
+            quality = image_data.get("quality",defaults.quality),
+            max_upload_kb = image_data.get("max upload kb",defaults.max_upload_kb)
+        )
+
+    def image_to_json(self,image_state:ImageState) -> dict:
+        """Convert the ImageState object to a dictionary for JSON serialization. Returns an empty dictionary if the ImageState is invalid."""
+        if not image_state:
+            self.warn(self,"No ImageState to convert to JSON",self.image_to_json)
+            return {}
+        return {
+            "worker pool":image_state.worker_pool,
+            "workers":image_state.workers,
+            "render timeout seconds":image_state.render_timeout_seconds,
+            "atlas heights":image_state.atlas_heights,
+            "formats":image_state.formats,
+            "quality":image_state.quality,
+            "max upload kb":image_state.max_upload_kb
+        }
+
+    def update_config(self,config_json:dict,image_state:ImageState) -> dict:
+        """Combines the ImageState object with the config dictionary. Returns the updated config file (dictionary), or an empty dictionary if the ImageState is invalid."""
+        if not config_json or not image_state:
+            self.warn(self,"No config JSON or ImageState to combine",self.update_config)
+            return {}
+        config_json["images"] = self.image_to_json(image_state)
+        return config_json
+
+class PoolParser(Logger):
+    def __init__(self):
+        super().__init__()
+
+    def json_to_pool(self,config_json:dict) -> PoolState:
+        """Converts the optional 'pool' section of the config dictionary to a PoolState object.  Missing values use the PoolState defaults.
+        Returns None if the config_json is invalid."""
+        if not config_json:
+            self.warn(self,"No config JSON to convert to PoolState",self.json_to_pool)
+            return None
+        pool_data:dict = config_json.get("pool",{})
+        defaults:PoolState = PoolState()
+        return PoolState(
+            cooldown_weeks = pool_data.get("cooldown weeks",defaults.cooldown_weeks),
+            level_band_size = pool_data.get("level band size",defaults.level_band_size),
+            level_band_weights = pool_data.get("level band weights",defaults.level_band_weights),
+            location_weights = pool_data.get("location weights",defaults.location_weights),
+            seed = pool_data.get("seed",defaults.seed)
+        )
+
+    def pool_to_json(self,pool_state:PoolState) -> dict:
+        """Convert the PoolState object to a dictionary for JSON serialization. Returns an empty dictionary if the PoolState is invalid."""
+        if not pool_state:
+            self.warn(self,"No PoolState to convert to JSON",self.pool_to_json)
+            return {}
+        return {
+            "cooldown weeks":pool_state.cooldown_weeks,
+            "level band size":pool_state.level_band_size,
+            "level band weights":pool_state.level_band_weights,
+            "location weights":pool_state.location_weights,
+            "seed":pool_state.seed
+        }
+
+    def update_config(self,config_json:dict,pool_state:PoolState) -> dict:
+        """Combines the PoolState object with the config dictionary. Returns the updated config file (dictionary), or an empty dictionary if the PoolState is invalid."""
+        if not config_json or not pool_state:
+            self.warn(self,"No config JSON or PoolState to combine",self.update_config)
+            return {}
+        config_json["pool"] = self.pool_to_json(pool_state)
+        return config_json
+
+
+class LoggingParser(Logger):
+    def __init__(self):
+        super().__init__()
+
+    def json_to_logging(self,config_json:dict) -> LoggingState:
+        """Converts the optional 'logging' section of the config dictionary to a LoggingState object.  Missing values use the LoggingState defaults.
+        Returns None if the config_json is invalid."""
+        if not config_json:
+            self.warn(self,"No config JSON to convert to LoggingState",self.json_to_logging)
+            return None
+        logging_data:dict = config_json.get("logging",{})
+        defaults:LoggingState = LoggingState()
+        return LoggingState(
+            level = logging_data.get("level",defaults.level),
+            max_queued_lines = logging_data.get("max queued lines",defaults.max_queued_lines),
+            file = logging_data.get("file",defaults.file),
+            max_file_kb = logging_data.get("max file kb",defaults.max_file_kb),
+            backup_files = logging_data.get("backup files",defaults.backup_files),
+            repeat_window_seconds = logging_data.get("repeat window seconds",defaults.repeat_window_seconds)
+        )
+
+    def logging_to_json(self,logging_state:LoggingState) -> dict:
+        """Convert the LoggingState object to a dictionary for JSON serialization. Returns an empty dictionary if the LoggingState is invalid."""
+        if not logging_state:
+            self.warn(self,"No LoggingState to convert to JSON",self.logging_to_json)
+            return {}
+        return {
+            "level":logging_state.level,
+            "max queued lines":logging_state.max_queued_lines,
+            "file":logging_state.file,
+            "max file kb":logging_state.max_file_kb,
+            "backup files":logging_state.backup_files,
+            "repeat window seconds":logging_state.repeat_window_seconds
+        }
+
+    def update_config(self,config_json:dict,logging_state:LoggingState) -> dict:
+        """Combines the LoggingState object with the config dictionary. Returns the updated config file (dictionary), or an empty dictionary if the LoggingState is invalid."""
+        if not config_json or not logging_state:
+            self.warn(self,"No config JSON or LoggingState to combine",self.update_config)
+            return {}
+        config_json["logging"] = self.logging_to_json(logging_state)
+        return config_json
+
+class CadenceParser(Logger):
+    def __init__(self):
+        super().__init__()
+
+    def json_to_cadence(self,config_json:dict) -> CadenceState:
+        """Converts the optional 'cadence' section of the config dictionary to a CadenceState object.  Missing values use the CadenceState defaults.
+        Returns None if the config_json is invalid."""
+        if not config_json:
+            self.warn(self,"No config JSON to convert to CadenceState",self.json_to_cadence)
+            return None
+        cadence_data:dict = config_json.get("cadence",{})
+        defaults:CadenceState = CadenceState()
+        return CadenceState(
+            adaptive = cadence_data.get("adaptive",defaults.adaptive),
+            min_update_minutes = cadence_data.get("min update minutes",defaults.min_update_minutes),
+            max_update_minutes = cadence_data.get("max update minutes",defaults.max_update_minutes),
+            finish_window_hours = cadence_data.get("finish window hours",defaults.finish_window_hours),
+            idle_backoff = cadence_data.get("idle backoff",defaults.idle_backoff),
+            max_requests_per_hour = cadence_data.get("max requests per hour",defaults.max_requests_per_hour)
+        )
+
+    def cadence_to_json(self,cadence_state:CadenceState) -> dict:
+        """Convert the CadenceState object to a dictionary for JSON serialization. Returns an empty dictionary if the CadenceState is invalid."""
+        if not cadence_state:
+            self.warn(self,"No CadenceState to convert to JSON",self.cadence_to_json)
+            return {}
+        return {
+            "adaptive":cadence_state.adaptive,
+            "min update minutes":cadence_state.min_update_minutes,
+            "max update minutes":cadence_state.max_update_minutes,
+            "finish window hours":cadence_state.finish_window_hours,
+            "idle backoff":cadence_state.idle_backoff,
+            "max requests per hour":cadence_state.max_requests_per_hour
+        }
+
+    def update_config(self,config_json:dict,cadence_state:CadenceState) -> dict:
+        """Combines the CadenceState object with the config dictionary. Returns the updated config file (dictionary), or an empty dictionary if the CadenceState is invalid."""
+        if not config_json or not cadence_state:
+            self.warn(self,"No config JSON or CadenceState to combine",self.update_config)
+            return {}
+        config_json["cadence"] = self.cadence_to_json(cadence_state)
+        return config_json
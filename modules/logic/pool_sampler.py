@@ -0,0 +1,77 @@
+from base.logging import Logger
+from modules.objects.boss import LocalBoss
+from datetime import datetime, timedelta
+import heapq
+import math
+import random
+
+class PoolSampler(Logger):
+    """Draws vote pools by weighted sampling without replacement.  A boss's weight is its popularity weight (from the boss data),
+    times the weight of its level band and of its location.  Bosses used within the last cooldown_weeks weeks are on cooldown.
+    If cooldown_weeks is None, used bosses stay on cooldown until fewer than 'count' bosses are left, and then every boss is eligible again."""
+    def __init__(self,cooldown_weeks:float = None,level_band_size:int = 100,level_band_weights:dict[str,float] = None,location_weights:dict[str,float] = None,seed:int = None):
+        """level_band_weights maps the lowest level of a band (as a string, such as "300" for levels 300 to 399 with a band size of 100) to a weight.
+        location_weights maps a location to a weight.  Missing bands and locations weigh 1.  seed makes the draws reproducible."""
+        super().__init__()
+        self.cooldown_weeks:float = cooldown_weeks
+        self.level_band_size:int = max(1,level_band_size)
+        self.level_band_weights:dict[str,float] = level_band_weights or {}
+        self.location_weights:dict[str,float] = location_weights or {}
+        self.random:random.Random = random.Random(seed)
+
+    def level_band(self,boss:LocalBoss) -> str:
+        """Returns the level band of a boss, as the lowest level in the band."""
+        level:int = boss.level if isinstance(boss.level,int) else 0
+        return str(level // self.level_band_size * self.level_band_size)
+
+    def weight(self,boss:LocalBoss) -> float:
+        """Returns the sampling weight of a boss.  0 (or less) means the boss is never drawn."""
+        return (getattr(boss,"weight",1.0)
+                * self.level_band_weights.get(self.level_band(boss),1.0)
+                * self.location_weights.get(boss.location,1.0))
+
+    def on_cooldown(self,used_times:dict[str,datetime],now:datetime = None) -> set[str]:
+        """Returns the api_names of the bosses that are on cooldown at 'now'."""
+        if self.cooldown_weeks is None:
+            return set(used_times)
+        cutoff:datetime = (now or datetime.now()) - timedelta(weeks=self.cooldown_weeks)
+        return {api_name for api_name,used in used_times.items() if used is None or used > cutoff}
+
+    def expired(self,used_times:dict[str,datetime],now:datetime = None) -> list[str]:
+        """Returns the api_names in used_times whose cooldown is over, so they can be forgotten."""
+        cooling:set[str] = self.on_cooldown(used_times,now)
+        return [api_name for api_name in used_times if api_name not in cooling]
+
+    def needs_reset(self,bosses:list[LocalBoss],used_times:dict[str,datetime],count:int = 4,now:datetime = None) -> bool:
+        """Returns True if there is no cooldown and fewer than 'count' drawable bosses are unused, so the used bosses must be cleared."""
+        if self.cooldown_weeks is not None:
+            return False
+        return len(self.__eligible(bosses,set(used_times))) < count
+
+    def __eligible(self,bosses:list[LocalBoss],cooling:set[str]) -> list[LocalBoss]:
+        return [boss for boss in bosses if boss.api_name not in cooling and self.weight(boss) > 0]
+
+    def __weighted_sample(self,bosses:list[LocalBoss],count:int) -> list[LocalBoss]:
+        """Weighted sampling without replacement (Efraimidis-Spirakis): every boss gets the key log(u) / weight and the 'count' largest keys win.
+        One pass over the bosses and a heap of 'count' entries."""
+        keyed = ((math.log(1.0 - self.random.random()) / self.weight(boss),index,boss) for index,boss in enumerate(bosses))
+        return [boss for _,_,boss in heapq.nlargest(count,keyed)]
+
+    def sample(self,bosses:list[LocalBoss],used_times:dict[str,datetime],count:int = 4,now:datetime = None) -> list[LocalBoss]:
+        """Draws 'count' different bosses, weighted, from those not on cooldown.  If too few are off cooldown, the pool is topped up with the bosses
+        that have been on cooldown the longest (a soft reset), or, without a cooldown, every boss is eligible again.
+        Returns an empty list if there are not enough drawable bosses."""
+        cooling:set[str] = self.on_cooldown(used_times,now)
+        if self.needs_reset(bosses,used_times,count,now):
+            cooling = set()
+        eligible:list[LocalBoss] = self.__eligible(bosses,cooling)
+        pool:list[LocalBoss] = self.__weighted_sample(eligible,count)
+        if len(pool) < count:
+            # soft reset: the bosses whose cooldown ends soonest come back first
+            waiting:list[LocalBoss] = [boss for boss in bosses if boss.api_name in cooling and self.weight(boss) > 0]
+            waiting.sort(key=lambda boss: used_times.get(boss.api_name) or datetime.min)
+            pool.extend(waiting[:count - len(pool)])
+        if len(pool) < count:
+            self.error(self,"Not enough bosses to generate a pool",self.sample)
+            return []
+        return pool
@@ -0,0 +1,152 @@
+from base.logging import Logger
+from modules.objects.player import Player
+from modules.objects.boss import LocalBoss
+from base.lazy_import import lazy_import
+
+# numpy is optional, clan-wide stats are unavailable without it.  It is imported when the first matrix is built
+np = lazy_import("numpy")
+
+def numpy_available() -> bool:
+    """Returns True if numpy is installed and the ranking matrix can be built."""
+    return np is not None
+
+class KillMatrix(Logger):
+    """A players x bosses matrix of kill counts built from the player store.  Ranks, percentiles and tracked kill deltas
+    are computed for every boss at once with vectorized numpy operations instead of nested loops over Player.boss_list."""
+    def __init__(self,players:list[Player],bosses:list[LocalBoss]):
+        super().__init__()
+        self.player_names:list[str] = [player.osrs_name for player in players]
+        self.discord_names:list[str] = [player.discord_name for player in players]
+        self.boss_names:list[str] = [boss.api_name for boss in bosses]
+        self.boss_display_names:list[str] = [boss.name for boss in bosses]
+        self.__player_index:dict[str,int] = {name:i for i,name in enumerate(self.player_names)}
+        self.__boss_index:dict[str,int] = {name:i for i,name in enumerate(self.boss_names)}
+        shape:tuple[int,int] = (len(self.player_names),len(self.boss_names))
+        self.kills = np.zeros(shape,dtype=np.int64)
+        self.tracked_kills = np.zeros(shape,dtype=np.int64)
+        # single pass over the player store, every other calculation is vectorized
+        for row,player in enumerate(players):
+            for boss in player.boss_list:
+                if boss is None: continue
+                column:int = self.__boss_index.get(boss.name,-1)
+                if column < 0: continue
+                self.kills[row,column] = boss.kills
+                self.tracked_kills[row,column] = boss.tracked_kills
+        self.__rank_cache:dict[bool,object] = {}
+        self.log(self,f"Built kill matrix for {shape[0]} players and {shape[1]} bosses",self.__init__)
+
+    @classmethod
+    def build(cls,players:list[Player],bosses:list[LocalBoss]) -> "KillMatrix":
+        """Builds a kill matrix from the player and boss lists.  Returns None if numpy is not installed."""
+        if not numpy_available():
+            return None
+        return cls(players,bosses)
+
+    @property
+    def player_count(self) -> int:
+        return len(self.player_names)
+
+    @property
+    def boss_count(self) -> int:
+        return len(self.boss_names)
+
+    def player_row(self,osrs_name:str) -> int:
+        """Returns the matrix row for the osrs name, or -1 if the player is not in the matrix."""
+        return self.__player_index.get(osrs_name.lower().strip(),-1)
+
+    def boss_column(self,api_name:str) -> int:
+        """Returns the matrix column for the boss api name, or -1 if the boss is not in the matrix."""
+        return self.__boss_index.get(api_name,-1)
+
+    def __values(self,tracked:bool):
+        return self.tracked_kills if tracked else self.kills
+
+    def ranks(self,tracked:bool=False):
+        """Returns a players x bosses matrix of competition ranks (1 = most kills, ties share the best rank) for every boss at once."""
+        if tracked in self.__rank_cache:
+            return self.__rank_cache[tracked]
+        values = self.__values(tracked)
+        rows,columns = values.shape
+        ranks = np.zeros(values.shape,dtype=np.int64)
+        if rows == 0 or columns == 0:
+            return ranks
+        # sort every column descending, then give each run of equal values the position of its first element
+        order = np.argsort(-values,axis=0,kind="stable")
+        sorted_values = np.take_along_axis(values,order,axis=0)
+        positions = np.broadcast_to(np.arange(rows)[:,None],values.shape)
+        run_starts = np.ones(values.shape,dtype=bool)
+        run_starts[1:] = sorted_values[1:] != sorted_values[:-1]
+        first_positions = np.maximum.accumulate(np.where(run_starts,positions,0),axis=0)
+        np.put_along_axis(ranks,order,first_positions + 1,axis=0)
+        self.__rank_cache[tracked] = ranks
+        return ranks
+
+    def percentiles(self,tracked:bool=False):
+        """Returns a players x bosses matrix of percentiles (100 = top of the clan, 0 = bottom) for every boss at once."""
+        rows:int = self.player_count
+        if rows <= 1:
+            return np.full((rows,self.boss_count),100.0)
+        return (rows - self.ranks(tracked)) * (100.0 / (rows - 1))
+
+    def tracked_deltas(self,previous:"KillMatrix"):
+        """Returns a players x bosses matrix of tracked kills gained since the previous matrix.
+        Players or bosses missing from the previous matrix are treated as having 0 tracked kills."""
+        deltas = self.tracked_kills.copy()
+        if previous is None or previous.player_count == 0 or previous.boss_count == 0 or deltas.size == 0:
+            return deltas
+        row_map = np.array([previous.player_row(name) for name in self.player_names],dtype=np.int64)
+        column_map = np.array([previous.boss_column(name) for name in self.boss_names],dtype=np.int64)
+        aligned = previous.tracked_kills[np.ix_(np.maximum(row_map,0),np.maximum(column_map,0))]
+        mask = (row_map >= 0)[:,None] & (column_map >= 0)[None,:]
+        deltas -= np.where(mask,aligned,0)
+        return deltas
+
+    def top(self,count:int,tracked:bool=False) -> dict[str,list[tuple[str,int]]]:
+        """Returns the top 'count' (osrs name, kills) pairs at every boss, skipping players with 0 kills."""
+        values = self.__values(tracked)
+        results:dict[str,list[tuple[str,int]]] = {}
+        if self.player_count == 0:
+            return {name:[] for name in self.boss_names}
+        count = max(0,min(count,self.player_count))
+        # argpartition finds the top rows of every column at once, only those rows are then sorted
+        if count < self.player_count:
+            candidates = np.argpartition(-values,count - 1,axis=0)[:count] if count > 0 else np.zeros((0,self.boss_count),dtype=np.int64)
+        else:
+            candidates = np.broadcast_to(np.arange(self.player_count)[:,None],values.shape)
+        candidate_values = np.take_along_axis(values,candidates,axis=0)
+        order = np.argsort(-candidate_values,axis=0,kind="stable")
+        candidates = np.take_along_axis(candidates,order,axis=0)
+        candidate_values = np.take_along_axis(candidate_values,order,axis=0)
+        for column,boss_name in enumerate(self.boss_names):
+            results[boss_name] = [(self.player_names[row],int(kills)) for row,kills in zip(candidates[:,column],candidate_values[:,column]) if kills > 0]
+        return results
+
+    def boss_totals(self,tracked:bool=False) -> dict[str,tuple[int,int]]:
+        """Returns a dictionary of boss api name -> (total kills, number of players with at least one kill)."""
+        values = self.__values(tracked)
+        totals = values.sum(axis=0)
+        participants = (values > 0).sum(axis=0)
+        return {name:(int(totals[i]),int(participants[i])) for i,name in enumerate(self.boss_names)}
+
+    def boss_gains(self,previous:"KillMatrix") -> dict[str,tuple[int,str,int]]:
+        """Returns a dictionary of boss api name -> (tracked kills gained since the previous matrix, osrs name of the top gainer or None, their gain)."""
+        deltas = self.tracked_deltas(previous)
+        gains:dict[str,tuple[int,str,int]] = {}
+        if self.player_count == 0:
+            return {name:(0,None,0) for name in self.boss_names}
+        totals = deltas.sum(axis=0)
+        best_rows = deltas.argmax(axis=0)
+        for column,boss_name in enumerate(self.boss_names):
+            best:int = int(deltas[best_rows[column],column])
+            gains[boss_name] = (int(totals[column]),self.player_names[best_rows[column]] if best > 0 else None,best)
+        return gains
+
+    def player_summary(self,osrs_name:str,tracked:bool=False) -> list[tuple[str,int,int,float]]:
+        """Returns a list of (boss display name, kills, rank, percentile) for every boss for a single player.  Returns an empty list if the player does not exist."""
+        row:int = self.player_row(osrs_name)
+        if row < 0:
+            return []
+        values = self.__values(tracked)[row]
+        ranks = self.ranks(tracked)[row]
+        percentiles = self.percentiles(tracked)[row]
+        return [(self.boss_display_names[i],int(values[i]),int(ranks[i]),float(percentiles[i])) for i in range(self.boss_count)]
@@ -1,12 +1,14 @@
 from base.logging import Logger
 from modules.state.session import Session
 from modules.objects.boss import LocalBoss
+from modules.logic.pool_sampler import PoolSampler
 from datetime import datetime
-import random
+import hashlib
 
 class SessionChanger(Logger):
-    def __init__(self):
+    def __init__(self,sampler:PoolSampler = None):
         super().__init__()
+        self.sampler:PoolSampler = sampler or PoolSampler()
         #session names
         self.__no_session:str = "No Session"
         self.__open_voting_session:str = "Open Voting"
@@ -14,27 +16,61 @@ class SessionChanger(Logger):
         self.__open_tracking_session:str = "Open Tracking"
         self.__close_tracking_session:str = "Close Tracking"
 
-    def open_voting(self,session:Session,boss_list:list[LocalBoss]) -> bool:
-        """Opens voting for the session.  Generates 4 random bosses for the boss pool. Resets used_boss list if they have all been used. Returns True if successful, False otherwise"""
+    def draw_boss_pool(self,boss_list:list[LocalBoss],used_boss_times:dict[str,datetime]) -> list[LocalBoss]:
+        """Draws 4 bosses with the pool sampler, skipping bosses on cooldown (see PoolSampler.sample).  Does not modify the session.
+        Returns an empty list if there are not enough bosses."""
+        return self.sampler.sample(boss_list,used_boss_times,4)
+
+    def pool_fingerprint(self,boss_list:list[LocalBoss],used_boss_times:dict[str,datetime]) -> str:
+        """Returns a fingerprint of the boss list and the bosses on cooldown.  A pool drawn ahead of time is only valid while this is unchanged."""
+        digest = hashlib.sha1()
+        for boss in boss_list:
+            digest.update(f"{boss.api_name}|{boss.name}|{boss.level}|{boss.location}|{boss.image}|{boss.weight};".encode())
+        digest.update(b"used:")
+        for api_name in sorted(self.sampler.on_cooldown(used_boss_times)):
+            digest.update(f"{api_name};".encode())
+        return digest.hexdigest()
+
+    def open_voting(self,session:Session,boss_list:list[LocalBoss],boss_pool:list[LocalBoss] = None) -> bool:
+        """Opens voting for the session.  Uses boss_pool if one was drawn ahead of time, otherwise draws 4 bosses for the boss pool.
+        Forgets used bosses whose cooldown is over (or all of them, without a cooldown, once they have all been used). Returns True if successful, False otherwise"""
         if not session:
             self.warn(self,"No session to open voting",self.open_voting)
             return False
+        pool:list[LocalBoss] = boss_pool or self.draw_boss_pool(boss_list,session.used_boss_times)
+        if len(pool) != 4:
+            return False
         session.session_name = self.__open_voting_session
         session.tracking_active = False
         session.voting_active = True
         session.last_boss = session.current_boss
         session.current_boss = None
-        #generate 4 random bosses from the boss list
-        if len(boss_list) - len(session.used_boss_list) < 4:
-            session.used_boss_list.clear()
-        valid_bosses:list[LocalBoss] = [boss for boss in boss_list if boss not in session.used_boss_list]
-        if len(valid_bosses) < 4:
-            self.error(self,"Not enough bosses to generate a pool",self.open_voting)
-            return False
-        session.boss_pool = random.sample(valid_bosses,4)
+        if self.sampler.needs_reset(boss_list,session.used_boss_times):
+            session.used_boss_times.clear()
+        for api_name in self.sampler.expired(session.used_boss_times):
+            del session.used_boss_times[api_name]
+        session.boss_pool = pool
+        session.voting_message_id = None
         session.start_time = datetime.now()
+        self.clear_next_pool(session)
         return True
-    
+
+    def set_next_pool(self,session:Session,boss_pool:list[LocalBoss],fingerprint:str) -> bool:
+        """Stores a pool drawn ahead of time for the next vote, with the fingerprint it was drawn from.  Returns True if successful, False otherwise"""
+        if not session:
+            self.warn(self,"No session to set the next pool",self.set_next_pool)
+            return False
+        session.next_boss_pool = boss_pool
+        session.next_pool_fingerprint = fingerprint
+        session.next_pool_image = ""
+        return True
+
+    def clear_next_pool(self,session:Session):
+        """Discards the pool drawn ahead of time, and its image."""
+        session.next_boss_pool_ids = []
+        session.next_pool_fingerprint = ""
+        session.next_pool_image = ""
+
     def close_voting(self,session:Session,selected_boss:LocalBoss) -> bool:
         """Closes voting for the session.  Returns True if successful, False otherwise"""
         if not session:
@@ -46,9 +82,10 @@ class SessionChanger(Logger):
         session.session_name = self.__close_voting_session
         session.tracking_active = False
         session.voting_active = False
+        session.voting_message_id = None
         session.last_boss = session.current_boss or session.last_boss
         session.current_boss = selected_boss
-        session.boss_pool.clear()
+        session.boss_pool_ids = []
         session.start_time = datetime.now()
         return True
     
@@ -66,9 +103,9 @@ class SessionChanger(Logger):
         session.voting_active = False
         if selected_boss:
             session.current_boss = selected_boss
-        session.used_boss_list.append(session.current_boss)
-        session.last_boss = session.current_boss
-        session.boss_pool.clear()
+        session.used_boss_times[session.current_boss_id] = datetime.now()
+        session.last_boss_id = session.current_boss_id
+        session.boss_pool_ids = []
         session.start_time = datetime.now()
         return True
     
@@ -83,9 +120,9 @@ class SessionChanger(Logger):
         session.session_name = self.__close_tracking_session
         session.tracking_active = False
         session.voting_active = False
-        session.last_boss = session.current_boss
-        session.current_boss = None
-        session.boss_pool.clear()
+        session.last_boss_id = session.current_boss_id
+        session.current_boss_id = None
+        session.boss_pool_ids = []
         session.start_time = datetime.now()
         return True
     
@@ -97,7 +134,7 @@ class SessionChanger(Logger):
         session.session_name = self.__no_session
         session.tracking_active = False
         session.voting_active = False
-        session.boss_pool.clear()
+        session.boss_pool_ids = []
         session.start_time = datetime.now()
         return True
 
@@ -0,0 +1,122 @@
+from base.logging import Logger
+from collections import deque
+import time
+
+class CadenceObservation:
+    """What changed on the leaderboard between two periodic updates."""
+    def __init__(self,time:float,kills_gained:int,rank_changes:int,active_players:int):
+        self.time:float = time
+        self.kills_gained:int = kills_gained
+        self.rank_changes:int = rank_changes
+        self.active_players:int = active_players
+
+class CadencePlan:
+    """The interval until the next periodic update, and the reasons it was chosen (for the admin schedule view)."""
+    def __init__(self,interval_seconds:float,reasons:list[str]):
+        self.interval_seconds:float = interval_seconds
+        self.reasons:list[str] = reasons
+
+class UpdateCadence(Logger):
+    """Picks the interval between periodic leaderboard updates during tracking.
+    The interval starts at base_seconds, halves while ranks are changing, and grows by idle_backoff for every update in a row
+    that gained no kills.  Within finish_window_seconds of the end of tracking it shrinks towards min_seconds as the end gets closer.
+    It is kept within min_seconds and max_seconds, and never shorter than the API budget allows for the number of players."""
+    def __init__(self,base_seconds:float,min_seconds:float,max_seconds:float,finish_window_seconds:float,idle_backoff:float = 2.0,history:int = 12):
+        super().__init__()
+        self.configure(base_seconds,min_seconds,max_seconds,finish_window_seconds,idle_backoff)
+        self.observations:deque[CadenceObservation] = deque(maxlen=history)
+        self.last_plan:CadencePlan = None
+        # osrs name -> tracked kills at the current boss, at the last update
+        self.__last_kills:dict[str,int] = None
+
+    def configure(self,base_seconds:float,min_seconds:float,max_seconds:float,finish_window_seconds:float,idle_backoff:float = 2.0):
+        """Changes the settings (when the config is reloaded), keeping the observations."""
+        self.base_seconds:float = base_seconds
+        self.min_seconds:float = min_seconds
+        self.max_seconds:float = max_seconds
+        self.finish_window_seconds:float = finish_window_seconds
+        self.idle_backoff:float = idle_backoff
+
+    def reset(self,kills:dict[str,int] = None):
+        """Forgets the observations, for a new tracking session.  kills is the baseline the first observation is compared with."""
+        self.observations.clear()
+        self.__last_kills = dict(kills) if kills is not None else None
+        self.last_plan = None
+
+    @staticmethod
+    def ranks(kills:dict[str,int]) -> dict[str,int]:
+        """Returns the competition rank (1 = most kills, ties share a rank) of every player with kills."""
+        ranks:dict[str,int] = {}
+        previous_count:int = None
+        rank:int = 0
+        for position,(name,count) in enumerate(sorted(((name,count) for name,count in kills.items() if count > 0),key=lambda item: -item[1]),start=1):
+            if count != previous_count:
+                rank,previous_count = position,count
+            ranks[name] = rank
+        return ranks
+
+    def observe(self,kills:dict[str,int],now:float = None) -> CadenceObservation:
+        """Records the tracked kills of every player after an update, compared with the previous update.
+        Returns None for the first update of a session, which only sets the baseline."""
+        previous:dict[str,int] = self.__last_kills
+        self.__last_kills = dict(kills)
+        if previous is None:
+            return None
+        kills_gained:int = sum(max(0,count - previous.get(name,0)) for name,count in kills.items())
+        active_players:int = sum(1 for name,count in kills.items() if count > previous.get(name,0))
+        old_ranks:dict[str,int] = self.ranks(previous)
+        new_ranks:dict[str,int] = self.ranks(kills)
+        rank_changes:int = sum(1 for name,rank in new_ranks.items() if old_ranks.get(name) != rank)
+        observation:CadenceObservation = CadenceObservation(time.time() if now is None else now,kills_gained,rank_changes,active_players)
+        self.observations.append(observation)
+        return observation
+
+    def idle_streak(self) -> int:
+        """Returns how many of the latest updates in a row gained no kills."""
+        streak:int = 0
+        for observation in reversed(self.observations):
+            if observation.kills_gained:
+                break
+            streak += 1
+        return streak
+
+    def plan(self,seconds_to_finish:float = None,player_count:int = 0,seconds_per_request:float = 0,max_requests_per_hour:int = None) -> CadencePlan:
+        """Returns the interval until the next update.  seconds_to_finish is the time left until tracking stops (None if unknown).
+        A bulk update makes one request per player, seconds_per_request apart."""
+        reasons:list[str] = []
+        interval:float = self.base_seconds
+        last:CadenceObservation = self.observations[-1] if self.observations else None
+        idle:int = self.idle_streak()
+        if last is None:
+            reasons.append(f"no activity measured yet: base interval {self.base_seconds / 60:g} min")
+        elif last.rank_changes:
+            interval /= 2
+            reasons.append(f"ranks changing ({last.rank_changes} players moved, +{last.kills_gained} kills): half the base interval")
+        elif idle:
+            interval *= self.idle_backoff ** idle
+            reasons.append(f"no kills in the last {idle} updates: base interval x{self.idle_backoff ** idle:g}")
+        else:
+            reasons.append(f"+{last.kills_gained} kills by {last.active_players} players, ranks unchanged: base interval")
+        if seconds_to_finish is not None and 0 <= seconds_to_finish < self.finish_window_seconds:
+            finish_interval:float = self.min_seconds + (self.base_seconds - self.min_seconds) * seconds_to_finish / self.finish_window_seconds
+            if finish_interval < interval:
+                interval = finish_interval
+                reasons.append(f"tracking ends in {seconds_to_finish / 60:.0f} min: at most {finish_interval / 60:.1f} min")
+        clamped:float = min(max(interval,self.min_seconds),self.max_seconds)
+        if clamped != interval:
+            reasons.append(f"kept within {self.min_seconds / 60:g} to {self.max_seconds / 60:g} min")
+            interval = clamped
+        # a bulk update takes player_count requests: it cannot run more often than it takes, or than the hourly budget allows
+        budget_floor:float = player_count * seconds_per_request
+        if max_requests_per_hour:
+            budget_floor = max(budget_floor,player_count * 3600 / max_requests_per_hour)
+        if budget_floor > interval:
+            interval = budget_floor
+            reasons.append(f"API budget for {player_count} players: at least {budget_floor / 60:.1f} min")
+        self.last_plan = CadencePlan(interval,reasons)
+        return self.last_plan
+
+    def history_lines(self) -> list[str]:
+        """Returns one line per recorded observation, oldest first."""
+        return [f"{time.strftime('%a %H:%M',time.localtime(observation.time))}: +{observation.kills_gained} kills, "
+                f"{observation.active_players} players active, {observation.rank_changes} rank changes" for observation in self.observations]
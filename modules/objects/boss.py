@@ -8,9 +8,13 @@ class Boss:
         self.kill_offset:int = 0
 
 class LocalBoss:
-    def __init__(self,name:str,api_name:str,level:int,location:str,image:str):
+    def __init__(self,name:str,api_name:str,level:int,location:str,image:str,weight:float = 1.0,aliases:list[str] = None):
         self.name:str = name
         self.api_name:str = api_name
         self.level:int = level
         self.location:str = location
-        self.image:str = image
\ No newline at end of file
+        self.image:str = image
+        # popularity weight when drawing vote pools
+        self.weight:float = weight
+        # other names admins can use for the boss in commands
+        self.aliases:list[str] = aliases or []
\ No newline at end of file
@@ -4,9 +4,11 @@ class Paths:
                 filepath_player_data:str,
                 filepath_boss_data:str,
                 filepath_session_data:str,filepath_image_folder:str,
-                folder_path_generated_image:str):
+                folder_path_image_cache:str,
+                filepath_vote_journal:str):
         self.filepath_player_data:str = filepath_player_data
         self.filepath_boss_data:str = filepath_boss_data
         self.filepath_session_data:str = filepath_session_data
         self.filepath_image_folder:str = filepath_image_folder
-        self.folder_path_generated_image:str = folder_path_generated_image
+        self.folder_path_image_cache:str = folder_path_image_cache
+        self.filepath_vote_journal:str = filepath_vote_journal
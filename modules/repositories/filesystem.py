@@ -1,5 +1,6 @@
 from base.logging import Logger
 import json
+import os
 
 class Filesystem(Logger):
     def __init__(self):
@@ -87,17 +88,98 @@ class ConfigRepository(Filesystem):
         return self._load_json_dict(self.__filepath)
     
 class SessionRepository(Filesystem):
+    """The session file is replaced atomically, and the previous version is kept as a backup (session file + ".bak"),
+    so a crash while saving never leaves the session without a readable copy."""
     def __init__(self,filepath_session:str):
         super().__init__()
         self.__filepath:str = filepath_session
+        self.__filepath_backup:str = f"{filepath_session}.bak"
+        # False after the session file failed to load, so a corrupt file never replaces the backup
+        self.__current_readable:bool = True
 
     def write(self,session:dict) -> bool:
-        """Writes the session dict to the session file.  Returns True if the write was successful, False otherwise."""
-        return self._write_json_dict(self.__filepath,session)
+        """Writes the session dict to a temporary file, flushes it to disk, moves the current session file to the backup, then moves the
+        temporary file in its place.  Returns True if the write was successful, False otherwise."""
+        temp_path:str = f"{self.__filepath}.tmp"
+        try:
+            with open(temp_path,"w") as file:
+                json.dump(session,file,indent=4)
+                file.flush()
+                os.fsync(file.fileno())
+            if self.__current_readable and os.path.isfile(self.__filepath):
+                os.replace(self.__filepath,self.__filepath_backup)
+            os.replace(temp_path,self.__filepath)
+            self.__current_readable = True
+            self.log(self,f"Wrote JSON file: {self.__filepath}",self.write)
+            return True
+        except Exception as e:
+            self.error(self,f"Error writing session file: {e}",self.write)
+            return False
     
     def load(self) -> dict:
         """Loads the session from the session file.  Returns an empty dictionary if an error occurs."""
-        return self._load_json_dict(self.__filepath)
+        session:dict = self._load_json_dict(self.__filepath)
+        self.__current_readable = bool(session)
+        return session
+
+    def mark_unreadable(self):
+        """Flags the loaded session file as unusable (it parsed as JSON but is not a valid session), so the next write does not back it up."""
+        self.__current_readable = False
+
+    def load_backup(self) -> dict:
+        """Loads the session from the backup of the previous session file.  Returns an empty dictionary if there is none or an error occurs."""
+        if not os.path.isfile(self.__filepath_backup):
+            return {}
+        return self._load_json_dict(self.__filepath_backup)
+
+
+    
+
+class VoteJournalRepository(Filesystem):
+    """Append-only journal of vote events, one JSON object per line.  Each append is flushed, so votes survive a restart or crash."""
+    def __init__(self,filepath_vote_journal:str):
+        super().__init__()
+        self.__filepath:str = filepath_vote_journal
 
+    def append(self,entry:dict) -> bool:
+        """Appends an entry to the journal.  Returns True if the write was successful, False otherwise."""
+        try:
+            with open(self.__filepath,"a") as file:
+                file.write(json.dumps(entry) + "\n")
+                file.flush()
+            return True
+        except Exception as e:
+            self.error(self,f"Error appending to vote journal: {e}",self.append)
+            return False
+
+    def write(self,entries:list[dict]) -> bool:
+        """Replaces the journal with the entries (used to start a new vote, or compact the journal).  Returns True if the write was successful, False otherwise."""
+        temp_path:str = f"{self.__filepath}.tmp"
+        try:
+            with open(temp_path,"w") as file:
+                for entry in entries:
+                    file.write(json.dumps(entry) + "\n")
+            os.replace(temp_path,self.__filepath)
+            self.log(self,f"Wrote vote journal: {self.__filepath} ({len(entries)} entries)",self.write)
+            return True
+        except Exception as e:
+            self.error(self,f"Error writing vote journal: {e}",self.write)
+            return False
+
+    def load(self) -> list[dict]:
+        """Loads every journal entry.  A partially written last line (from a crash) is skipped.  Returns an empty list if the journal does not exist."""
+        if not os.path.isfile(self.__filepath):
+            return []
+        entries:list[dict] = []
+        try:
+            with open(self.__filepath,"r") as file:
+                for line in file:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        self.warn(self,f"Skipping unreadable vote journal line: {line.strip()}",self.load)
+        except Exception as e:
+            self.error(self,f"Error loading vote journal: {e}",self.load)
+        self.log(self,f"Loaded vote journal: {self.__filepath} ({len(entries)} entries)",self.load)
+        return entries
 
-    
\ No newline at end of file
@@ -1,5 +1,8 @@
-import requests
 from base.logging import Logger
+from base.lazy_import import lazy_import
+
+# the HTTP stack is imported on the first fetch, not at startup
+requests = lazy_import("requests")
 
 class WiseOldManFetcher(Logger):
     def __init__(self,fetch_player_url:str,api_discord_username:str = "") -> None:
@@ -17,11 +20,11 @@ class WiseOldManFetcher(Logger):
         try:
             response = requests.get(f"{url}")
             if not response:
-                self.warn(self,f"No response from {url}",self.fetch_player)
+                self.warn(self,"No response from %s",self.fetch_player,url)
                 return {}
             json_data:dict = response.json()
             if not json_data or json_data == {}:
-                self.warn(self,f"No data returned from {url}",self.fetch_player)
+                self.warn(self,"No data returned from %s",self.fetch_player,url)
                 return {}
             api_username:str = json_data.get("username","")
             if username.lower() != api_username.lower():
@@ -30,5 +33,5 @@ class WiseOldManFetcher(Logger):
             self.log(self,f"Successfully fetched player {username} from {url}",self.fetch_player)
             return response.json()
         except requests.RequestException as e:
-            self.error(self,f"Error fetching player {username} from {url}: {e}",self.fetch_player)
+            self.error(self,"Error fetching player %s from %s: %s",self.fetch_player,username,url,e)
             return {}
\ No newline at end of file
@@ -3,8 +3,14 @@ class ApiState:
                 url:str,
                 discord_contact_name:str,
                 bulk_update_frequency_minutes:int,
-                update_ratelimit_seconds:int):
+                update_ratelimit_seconds:int,
+                update_overlap:str = "skip",
+                update_jitter_seconds:float = 0.0):
         self.url:str = url
         self.discord_contact_name:str = discord_contact_name
         self.bulk_update_frequency_minutes:int = bulk_update_frequency_minutes
-        self.update_ratelimit_seconds:int = update_ratelimit_seconds
\ No newline at end of file
+        self.update_ratelimit_seconds:int = update_ratelimit_seconds
+        # "skip" or "queue", what a bulk update that is due while the previous one is still running does
+        self.update_overlap:str = update_overlap
+        # each bulk update is delayed by a random 0 to update_jitter_seconds
+        self.update_jitter_seconds:float = update_jitter_seconds
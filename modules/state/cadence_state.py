@@ -0,0 +1,18 @@
+class CadenceState:
+    def __init__(self,
+                adaptive:bool = True,
+                min_update_minutes:float = 10,
+                max_update_minutes:float = 120,
+                finish_window_hours:float = 6,
+                idle_backoff:float = 2.0,
+                max_requests_per_hour:int = None):
+        # False updates every api["bulk update frequency minutes"] for the whole tracking phase
+        self.adaptive:bool = adaptive
+        self.min_update_minutes:float = min_update_minutes
+        self.max_update_minutes:float = max_update_minutes
+        # updates speed up towards min_update_minutes during the last finish_window_hours of tracking
+        self.finish_window_hours:float = finish_window_hours
+        # the interval grows by this factor for every update in a row without kills
+        self.idle_backoff:float = idle_backoff
+        # None only limits updates by api["update ratelimit seconds"]
+        self.max_requests_per_hour:int = max_requests_per_hour
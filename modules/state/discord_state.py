@@ -7,4 +7,7 @@ class DiscordState:
         self.set_name_channel_id:int = -1
         self.console_channel_id:int = -1
         self.bot_token:str = ""
-        self.discord_admin_list:list[str] = []
\ No newline at end of file
+        self.discord_admin_list:list[str] = []
+        self.console_flush_seconds:float = 2.0
+        self.vote_update_seconds:float = 5.0
+        self.reload_poll_seconds:float = 5.0
\ No newline at end of file
@@ -0,0 +1,17 @@
+class ImageState:
+    def __init__(self,
+                worker_pool:str = "thread",
+                workers:int = 2,
+                render_timeout_seconds:float = 10,
+                atlas_heights:list[int] = None,
+                formats:list[str] = None,
+                quality:int = 80,
+                max_upload_kb:int = 64):
+        self.worker_pool:str = worker_pool
+        self.workers:int = workers
+        self.render_timeout_seconds:float = render_timeout_seconds
+        self.atlas_heights:list[int] = atlas_heights or [150]
+        # upload encodings, tried in order (see ImageEncoder)
+        self.formats:list[str] = formats or ["png8","webp","png"]
+        self.quality:int = quality
+        self.max_upload_kb:int = max_upload_kb
@@ -0,0 +1,17 @@
+class LoggingState:
+    def __init__(self,
+                level:str = "log",
+                max_queued_lines:int = 10000,
+                file:str = None,
+                max_file_kb:int = 5120,
+                backup_files:int = 3,
+                repeat_window_seconds:float = 60.0):
+        # "log", "warn" or "error", the lowest level printed
+        self.level:str = level
+        self.max_queued_lines:int = max_queued_lines
+        # JSON-lines log file, relative to the bot folder, None writes no file
+        self.file:str = file
+        self.max_file_kb:int = max_file_kb
+        self.backup_files:int = backup_files
+        # the same message logged again within this many seconds is collapsed into one "repeated N times" line, 0 never collapses
+        self.repeat_window_seconds:float = repeat_window_seconds
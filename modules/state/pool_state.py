@@ -0,0 +1,13 @@
+class PoolState:
+    def __init__(self,
+                cooldown_weeks:float = None,
+                level_band_size:int = 100,
+                level_band_weights:dict[str,float] = None,
+                location_weights:dict[str,float] = None,
+                seed:int = None):
+        # None keeps every used boss out of the pool until all have been used
+        self.cooldown_weeks:float = cooldown_weeks
+        self.level_band_size:int = level_band_size
+        self.level_band_weights:dict[str,float] = level_band_weights or {}
+        self.location_weights:dict[str,float] = location_weights or {}
+        self.seed:int = seed
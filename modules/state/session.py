@@ -1,13 +1,65 @@
 from modules.objects.boss import LocalBoss
+from modules.logic.boss_registry import BossRegistry
 from datetime import datetime
 
 class Session:
-    def __init__(self):
+    def __init__(self,registry:BossRegistry = None):
+        # bosses are stored by api_name, and resolved through the boss registry
+        self.registry:BossRegistry = registry or BossRegistry()
         self.session_name:str = ""
         self.tracking_active:bool = False
         self.voting_active:bool = False
-        self.last_boss:LocalBoss = None
-        self.current_boss:LocalBoss = None
-        self.boss_pool:list[LocalBoss] = []
+        self.last_boss_id:str = None
+        self.current_boss_id:str = None
+        self.boss_pool_ids:list[str] = []
         self.start_time:datetime = None
-        self.used_boss_list:list[LocalBoss] = []
+        # api_name -> when the boss was last used, bosses stay on cooldown for a while (see PoolSampler)
+        self.used_boss_times:dict[str,datetime] = {}
+        # the next vote pool, drawn and rendered ahead of time when tracking closes
+        self.next_boss_pool_ids:list[str] = []
+        self.next_pool_fingerprint:str = ""
+        self.next_pool_image:str = ""
+        # the open voting message, so votes can be rebuilt from its reactions after a restart
+        self.voting_message_id:int = None
+
+    @property
+    def last_boss(self) -> LocalBoss:
+        return self.registry.get(self.last_boss_id)
+
+    @last_boss.setter
+    def last_boss(self,boss:LocalBoss):
+        self.last_boss_id = boss.api_name if boss else None
+
+    @property
+    def current_boss(self) -> LocalBoss:
+        return self.registry.get(self.current_boss_id)
+
+    @current_boss.setter
+    def current_boss(self,boss:LocalBoss):
+        self.current_boss_id = boss.api_name if boss else None
+
+    @property
+    def boss_pool(self) -> list[LocalBoss]:
+        return self.registry.resolve(self.boss_pool_ids)
+
+    @boss_pool.setter
+    def boss_pool(self,bosses:list[LocalBoss]):
+        self.boss_pool_ids = [boss.api_name for boss in bosses]
+
+    @property
+    def next_boss_pool(self) -> list[LocalBoss]:
+        return self.registry.resolve(self.next_boss_pool_ids)
+
+    @next_boss_pool.setter
+    def next_boss_pool(self,bosses:list[LocalBoss]):
+        self.next_boss_pool_ids = [boss.api_name for boss in bosses]
+
+    @property
+    def used_boss_ids(self) -> set[str]:
+        """The api_names of the used bosses.  Read only, change used_boss_times instead."""
+        return set(self.used_boss_times)
+
+    @property
+    def used_bosses(self) -> list[LocalBoss]:
+        """The used bosses, by name.  Read only, change used_boss_times instead."""
+        return sorted(self.registry.resolve(self.used_boss_ids),key=lambda boss: boss.name)
@@ -1,16 +1,131 @@
+from base.logging import Logger
 import asyncio
+import random
 
-class AsyncTimer:
-    """This creates an async timer that can be used to schedule periodic tasks.  It will begin running on creation."""
-    def __init__(self,interval_seconds:int,async_func):
-        self.interval = interval_seconds
+# what to do when a run is due while the previous run is still going
+OVERLAP_SKIP:str = "skip"
+OVERLAP_QUEUE:str = "queue"
+OVERLAP_POLICIES:tuple[str,...] = (OVERLAP_SKIP,OVERLAP_QUEUE)
+
+class AsyncTimer(Logger):
+    """Runs an async function periodically, on a fixed cadence of the event loop's monotonic clock.
+    Runs are due at start + interval, start + 2 * interval, ... no matter how long each run takes, so the period does not drift.
+    If a run is due while the previous run is still going (an overrun), the "skip" policy drops it and the "queue" policy
+    runs it once as soon as the previous run ends (at most one run is queued).  jitter_seconds delays each run by a random 0 to jitter_seconds.
+    An exception raised by the function is logged and counted, and does not stop the timer."""
+    def __init__(self,interval_seconds:float,async_func,overlap:str = OVERLAP_SKIP,jitter_seconds:float = 0.0,name:str = None):
+        super().__init__()
+        self.interval:float = interval_seconds
         self.callback = async_func
+        self.overlap:str = overlap if overlap in OVERLAP_POLICIES else OVERLAP_SKIP
+        self.jitter_seconds:float = jitter_seconds
+        self.name:str = name or getattr(async_func,"__name__","timer")
+        self._task:asyncio.Task = None
+        self.__run_task:asyncio.Task = None
+        self.__queued:bool = False
+        # event loop time the last run started at
+        self.__last_run_start:float = None
+        # event loop time the next run is due at (without jitter)
+        self.__next_run:float = None
+        # statistics
+        self.runs:int = 0
+        self.failures:int = 0
+        self.overruns:int = 0
+        self.skipped:int = 0
+        self.queued_runs:int = 0
+        self.missed_ticks:int = 0
+        self.last_duration:float = None
+        self.max_duration:float = 0.0
+
+    def start(self):
+        """Starts the timer, the first run is due one interval from now.  Must be called from within the running event loop.  Does nothing if already running."""
+        if self._task and not self._task.done():
+            return
         self._task = asyncio.create_task(self._run())
 
-    async def _run(self):
-        while True:
-            await asyncio.sleep(self.interval)
-            await self.callback()
+    def set_interval(self,interval_seconds:float):
+        """Changes the interval.  The next run is due one new interval after the last run started (or after now, if it never ran),
+        and the cadence continues from there."""
+        self.interval = interval_seconds
+        if not self._task or self._task.done():
+            return
+        self._task.cancel()
+        loop:asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._run((self.__last_run_start if self.__last_run_start is not None else loop.time()) + interval_seconds))
 
     def stop(self):
-        self._task.cancel()
\ No newline at end of file
+        """Stops the timer.  A run that is going is not cancelled (see join), a queued run is dropped."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self.__queued = False
+        self.__next_run = None
+
+    async def join(self):
+        """Waits for the run that is going, if any, to end."""
+        if self.__run_task and not self.__run_task.done():
+            await asyncio.shield(self.__run_task)
+
+    def is_running(self) -> bool:
+        """Returns True if the function is running right now."""
+        return self.__run_task is not None and not self.__run_task.done()
+
+    def next_run_in(self) -> float:
+        """Returns the seconds until the next run is due (without jitter), or None if the timer is stopped."""
+        if self.__next_run is None:
+            return None
+        return max(0.0,self.__next_run - asyncio.get_running_loop().time())
+
+    async def _run(self,first_run:float = None):
+        loop:asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        self.__next_run = loop.time() + self.interval if first_run is None else first_run
+        while True:
+            jitter:float = random.uniform(0,self.jitter_seconds) if self.jitter_seconds and self.jitter_seconds > 0 else 0.0
+            await asyncio.sleep(max(0.0,self.__next_run - loop.time() + jitter))
+            self.__tick()
+            # the next run is due one interval after this one was, ticks that already passed (the loop was blocked) are counted and skipped
+            self.__next_run += self.interval
+            now:float = loop.time()
+            if self.__next_run <= now:
+                missed:int = int((now - self.__next_run) // self.interval) + 1
+                self.missed_ticks += missed
+                self.__next_run += missed * self.interval
+
+    def __tick(self):
+        if self.is_running():
+            self.overruns += 1
+            if self.overlap == OVERLAP_QUEUE and not self.__queued:
+                self.__queued = True
+            else:
+                self.skipped += 1
+            self.warn(self,"%s is still running from the previous run (%s)",self.__tick,self.name,"queued" if self.__queued else "skipped")
+            return
+        self.__run_task = asyncio.create_task(self.__execute())
+
+    async def __execute(self):
+        loop:asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        while True:
+            start:float = loop.time()
+            self.__last_run_start = start
+            try:
+                await self.callback()
+            except Exception as e:
+                self.failures += 1
+                self.error(self,"%s failed: %s",self.__execute,self.name,e)
+            finally:
+                self.runs += 1
+                self.last_duration = loop.time() - start
+                self.max_duration = max(self.max_duration,self.last_duration)
+            if not self.__queued:
+                return
+            self.__queued = False
+            self.queued_runs += 1
+
+    def get_stats(self) -> str:
+        """Returns a one line summary of the timer statistics."""
+        next_run:float = self.next_run_in() if self._task else None
+        next_text:str = "stopped" if next_run is None else f"next run in {next_run:.0f} s"
+        last_text:str = "never ran" if self.last_duration is None else f"last run {self.last_duration:.1f} s (max {self.max_duration:.1f} s)"
+        return (f"{self.name} every {self.interval:g} s ({self.overlap} overlaps, jitter {self.jitter_seconds:g} s) | {next_text} | "
+                f"{'running' if self.is_running() else 'idle'} | {last_text} | runs: {self.runs} | failed: {self.failures} | "
+                f"overruns: {self.overruns} (skipped {self.skipped}, queued {self.queued_runs}) | missed ticks: {self.missed_ticks}")
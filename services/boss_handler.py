@@ -2,6 +2,8 @@ from modules.repositories.filesystem import LocalBossRepository
 from modules.logic.parser import LocalBossParser
 from base.logging import Logger
 from modules.objects.boss import LocalBoss
+from modules.logic.boss_registry import BossRegistry
+from modules.logic.boss_catalog import BossCatalog
 
 class BossHandler(Logger):
     def __init__(self,filepath_boss_data:str):
@@ -9,6 +11,8 @@ class BossHandler(Logger):
         self.__repository:LocalBossRepository = LocalBossRepository(filepath_boss_data)
         self.__parser:LocalBossParser = LocalBossParser()
         self.__bosses:list[LocalBoss] = []
+        self.__registry:BossRegistry = BossRegistry()
+        self.__catalog:BossCatalog = BossCatalog()
         #load the boss data
         success:bool = self.__load()
         #log on init
@@ -18,13 +22,64 @@ class BossHandler(Logger):
     def __load(self) -> bool:
         """Loads the boss data from the file system.  Returns True if the load was successful."""
         self.log(self,"Loading boss data")
-        self.__bosses = [self.__parser.local_boss_json_to_object(boss_data) for boss_data in self.__repository.load()]
+        self.__apply([self.__parser.local_boss_json_to_object(boss_data) for boss_data in self.__repository.load()])
         if not self.__bosses or len(self.__bosses) == 0:
             self.warn(self,"No boss data found",self.__load)
             return False
         self.log(self,f"Loaded {len(self.__bosses)} bosses",self.__load)
         return True
     
+    def __apply(self,bosses:list[LocalBoss],keep_ids:set[str] = None):
+        """Registers the bosses and rebuilds the boss catalog.  keep_ids are passed to BossRegistry.register."""
+        self.__registry.register(bosses,keep_ids)
+        # use the registered objects, so a boss is the same object everywhere
+        self.__bosses = self.__registry.resolve([boss.api_name for boss in bosses if boss])
+        self.__catalog.build(self.__bosses)
+
+    def reload(self,keep_ids:set[str] = None) -> tuple[list[str],list[str],list[str]]:
+        """Reloads the boss data from the file system and applies the difference: bosses still present are updated in place.
+        Bosses in keep_ids stay resolvable even if they were removed, but are no longer listed or drawn.
+        Returns the api_names of the added, removed and changed bosses, or None if the boss data is invalid (the current bosses are kept)."""
+        boss_data:list[dict] = self.__repository.load()
+        if not boss_data or not isinstance(boss_data,list):
+            self.error(self,"Boss data is empty or unreadable, keeping the current bosses.",self.reload)
+            return None
+        try:
+            bosses:list[LocalBoss] = [self.__parser.local_boss_json_to_object(data) for data in boss_data]
+        except Exception as e:
+            self.error(self,f"Boss data is invalid ({type(e).__name__}: {e}), keeping the current bosses.",self.reload)
+            return None
+        api_names:list[str] = [boss.api_name for boss in bosses if boss]
+        if len(api_names) != len(boss_data) or not all(isinstance(api_name,str) and api_name for api_name in api_names) or len(set(api_names)) != len(api_names):
+            self.error(self,"Boss data has a missing or duplicated api_name, keeping the current bosses.",self.reload)
+            return None
+        old:dict[str,dict] = {boss.api_name:self.__parser.local_boss_to_json(boss) for boss in self.__bosses}
+        new:dict[str,dict] = {boss.api_name:self.__parser.local_boss_to_json(boss) for boss in bosses}
+        added:list[str] = [api_name for api_name in new if api_name not in old]
+        removed:list[str] = [api_name for api_name in old if api_name not in new]
+        changed:list[str] = [api_name for api_name in new if api_name in old and new[api_name] != old[api_name]]
+        if added or removed or changed or list(old) != list(new):
+            self.__apply(bosses,keep_ids)
+            self.log(self,f"Reloaded boss data: {len(added)} added, {len(removed)} removed, {len(changed)} changed",self.reload)
+        return added,removed,changed
+
     def get_bosses(self) -> list[LocalBoss]:
         """Returns the list of bosses."""
-        return self.__bosses
\ No newline at end of file
+        return self.__bosses
+
+    def get_boss(self,api_name:str) -> LocalBoss:
+        """Returns the boss with the api_name, or None if there is none."""
+        return self.__registry.get(api_name)
+
+    def find_boss(self,name:str) -> LocalBoss:
+        """Returns the boss for a name, api_name or alias typed by a user (case and underscores ignored), or the only boss starting with it.
+        Returns None if there is no single match, see suggest_bosses."""
+        return self.__catalog.resolve(name)
+
+    def suggest_bosses(self,name:str,limit:int = 5) -> list[LocalBoss]:
+        """Returns up to 'limit' bosses a user may have meant by name, best match first."""
+        return self.__catalog.suggest(name,limit)
+
+    def get_registry(self) -> BossRegistry:
+        """Returns the boss registry, which the session resolves its boss ids through."""
+        return self.__registry
\ No newline at end of file
@@ -1,25 +1,40 @@
 from modules.repositories.filesystem import ConfigRepository
-from modules.logic.parser import ApiParser, EventParser, DiscordParser
+from modules.logic.parser import ApiParser, EventParser, DiscordParser, ImageParser, PoolParser, LoggingParser, CadenceParser
 from modules.state.api_state import ApiState
 from modules.state.discord_state import DiscordState
 from modules.state.event_state import EventState
-from base.logging import Logger
+from modules.state.image_state import ImageState
+from modules.state.pool_state import PoolState
+from modules.state.logging_state import LoggingState
+from modules.state.cadence_state import CadenceState
+from base.logging import Logger, LEVEL_NAMES
+from services.async_timer import OVERLAP_POLICIES
 from modules.objects.paths import Paths
+import os
 from datetime import datetime
 
 class ConfigHandler(Logger):
     def __init__(self,filepath_config:str,paths:Paths):
         super().__init__()
         self.paths:Paths = paths
+        self.filepath_config:str = filepath_config
         self.__repository:ConfigRepository = ConfigRepository(filepath_config)
         self.__parser_api:ApiParser = ApiParser()
         self.__parser_event:EventParser = EventParser()
         self.__parser_discord:DiscordParser = DiscordParser()
+        self.__parser_image:ImageParser = ImageParser()
+        self.__parser_pool:PoolParser = PoolParser()
+        self.__parser_logging:LoggingParser = LoggingParser()
+        self.__parser_cadence:CadenceParser = CadenceParser()
         self.config:dict = self.__repository.load()
 
         self.api_state:ApiState = None
         self.event_state:EventState = None
         self.discord_state:DiscordState = None
+        self.image_state:ImageState = None
+        self.pool_state:PoolState = None
+        self.logging_state:LoggingState = None
+        self.cadence_state:CadenceState = None
 
         self.load()
 
@@ -28,6 +43,22 @@ class ConfigHandler(Logger):
         self.api_state:ApiState = self.__parser_api.json_to_api(self.config)
         self.event_state:EventState = self.__parser_event.json_to_event(self.config)
         self.discord_state:DiscordState = self.__parser_discord.json_to_discord(self.config)
+        self.image_state:ImageState = self.__parser_image.json_to_image(self.config)
+        if not self._check_image_state(self.image_state):
+            self.warn(self,"image_state object is invalid, using defaults.",self.load)
+            self.image_state = ImageState()
+        self.pool_state:PoolState = self.__parser_pool.json_to_pool(self.config)
+        if not self._check_pool_state(self.pool_state):
+            self.warn(self,"pool_state object is invalid, using defaults.",self.load)
+            self.pool_state = PoolState()
+        self.logging_state:LoggingState = self.__parser_logging.json_to_logging(self.config)
+        if not self._check_logging_state(self.logging_state):
+            self.warn(self,"logging_state object is invalid, using defaults.",self.load)
+            self.logging_state = LoggingState()
+        self.cadence_state:CadenceState = self.__parser_cadence.json_to_cadence(self.config)
+        if not self._check_cadence_state(self.cadence_state):
+            self.warn(self,"cadence_state object is invalid, using defaults.",self.load)
+            self.cadence_state = CadenceState()
         if self.api_state is None or self.event_state is None or self.discord_state is None:
             self.error(self,"Error loading config.",self.load)
             return False
@@ -68,8 +99,67 @@ class ConfigHandler(Logger):
             self.error(self,"Error updating config with Discord data.",self.save)
         else:
             self.config = updated_config
+        updated_config = self.__parser_image.update_config(self.config,self.image_state)
+        if not updated_config:
+            self.error(self,"Error updating config with Image data.",self.save)
+        else:
+            self.config = updated_config
+        updated_config = self.__parser_pool.update_config(self.config,self.pool_state)
+        if not updated_config:
+            self.error(self,"Error updating config with Pool data.",self.save)
+        else:
+            self.config = updated_config
+        updated_config = self.__parser_logging.update_config(self.config,self.logging_state)
+        if not updated_config:
+            self.error(self,"Error updating config with Logging data.",self.save)
+        else:
+            self.config = updated_config
+        updated_config = self.__parser_cadence.update_config(self.config,self.cadence_state)
+        if not updated_config:
+            self.error(self,"Error updating config with Cadence data.",self.save)
+        else:
+            self.config = updated_config
         return self.__repository.write(self.config)
     
+    def reload(self) -> list[str]:
+        """Reloads the config from the file system.  The new config must be valid as a whole, otherwise the current config is kept.
+        The state objects are updated in place, so everything holding them sees the new values.
+        Returns the names of the changed config sections (an empty list if nothing changed), or None if the new config was rejected."""
+        config:dict = self.__repository.load()
+        if not config:
+            self.error(self,"Config file is empty or unreadable, keeping the current config.",self.reload)
+            return None
+        changed:list[str] = [section for section in sorted(set(self.config) | set(config)) if self.config.get(section) != config.get(section)]
+        if not changed:
+            return []
+        try:
+            states:dict = {
+                "api_state":self.__parser_api.json_to_api(config),
+                "event_state":self.__parser_event.json_to_event(config),
+                "discord_state":self.__parser_discord.json_to_discord(config),
+                "image_state":self.__parser_image.json_to_image(config),
+                "pool_state":self.__parser_pool.json_to_pool(config),
+                "logging_state":self.__parser_logging.json_to_logging(config),
+                "cadence_state":self.__parser_cadence.json_to_cadence(config)
+            }
+        except Exception as e:
+            self.error(self,f"Config file is invalid ({type(e).__name__}: {e}), keeping the current config.",self.reload)
+            return None
+        if not (self._check_api_state(states["api_state"]) and self._check_event_state(states["event_state"]) and self._check_discord_state(states["discord_state"])
+                and self._check_image_state(states["image_state"]) and self._check_pool_state(states["pool_state"])
+                and self._check_logging_state(states["logging_state"]) and self._check_cadence_state(states["cadence_state"])):
+            self.error(self,"Config file is invalid, keeping the current config.",self.reload)
+            return None
+        for name,state in states.items():
+            current = getattr(self,name)
+            if current is None:
+                setattr(self,name,state)
+            else:
+                vars(current).update(vars(state))
+        self.config = config
+        self.log(self,f"Reloaded config, changed sections: {', '.join(changed)}",self.reload)
+        return changed
+
     def get_discord_state(self) -> DiscordState:
         """Returns the discord state object."""
         return self.discord_state
@@ -81,6 +171,28 @@ class ConfigHandler(Logger):
     def get_event_state(self) -> EventState:
         """Returns the event state object."""
         return self.event_state
+
+    def get_image_state(self) -> ImageState:
+        """Returns the image state object."""
+        return self.image_state
+
+    def get_pool_state(self) -> PoolState:
+        """Returns the pool state object."""
+        return self.pool_state
+
+    def get_logging_state(self) -> LoggingState:
+        """Returns the logging state object."""
+        return self.logging_state
+
+    def get_cadence_state(self) -> CadenceState:
+        """Returns the update cadence state object."""
+        return self.cadence_state
+
+    def get_log_filepath(self) -> str:
+        """Returns the path of the JSON-lines log file (a relative logging['file'] is relative to the config file folder), or None if no file is written."""
+        if not self.logging_state or not self.logging_state.file:
+            return None
+        return os.path.join(os.path.dirname(os.path.abspath(self.filepath_config)),self.logging_state.file)
     
     # Internal helper functions ----------------------------------------------
     def _check_event_state(self,event_state:EventState) -> bool:
@@ -174,6 +286,15 @@ class ConfigHandler(Logger):
         if not ratelimit_valid:
             self.error(self,"Invalid provided in config file for api['update_ratelimit'].",self._check_api_state)
             return False
+        # check update overlap and jitter
+        if api_state.update_overlap not in OVERLAP_POLICIES:
+            self.error(self,f"Invalid provided in config file for api['update overlap'], must be one of {', '.join(OVERLAP_POLICIES)}.",self._check_api_state)
+            return False
+        jitter:float = api_state.update_jitter_seconds
+        if (not isinstance(jitter,(int,float)) or isinstance(jitter,bool) or jitter < 0
+                or (self._is_int(bulk_update_frequency) and jitter >= bulk_update_frequency * 60)):
+            self.error(self,"Invalid provided in config file for api['update jitter seconds'], must be at least 0 and less than the update frequency.",self._check_api_state)
+            return False
         self.log(self,"api_state object is valid.",self._check_api_state)
         return True
     
@@ -232,9 +353,102 @@ class ConfigHandler(Logger):
         if not admin_list_valid:
             self.error(self,"Invalid provided in config file for discord['discord_admin_list'].",self._check_discord_state)
             return False
+        # check reload_poll_seconds
+        if not isinstance(discord_state.reload_poll_seconds,(int,float)) or discord_state.reload_poll_seconds < 0:
+            self.error(self,"Invalid provided in config file for discord['reload poll seconds'].",self._check_discord_state)
+            return False
         self.log(self,"discord_state object is valid.",self._check_discord_state)
         return True
     
+    def _check_image_state(self,image_state:ImageState) -> bool:
+        """Returns True if the image state object is valid."""
+        if not image_state: return False
+        if image_state.worker_pool not in ["thread","process"]:
+            self.error(self,"Invalid provided in config file for images['worker pool'], must be 'thread' or 'process'.",self._check_image_state)
+            return False
+        if not self._is_int(image_state.workers) or image_state.workers < 1:
+            self.error(self,"Invalid provided in config file for images['workers'].",self._check_image_state)
+            return False
+        if not isinstance(image_state.render_timeout_seconds,(int,float)) or image_state.render_timeout_seconds <= 0:
+            self.error(self,"Invalid provided in config file for images['render timeout seconds'].",self._check_image_state)
+            return False
+        if not isinstance(image_state.atlas_heights,list) or not image_state.atlas_heights or not all(self._is_int(height) and height > 0 for height in image_state.atlas_heights):
+            self.error(self,"Invalid provided in config file for images['atlas heights'].",self._check_image_state)
+            return False
+        if not isinstance(image_state.formats,list) or not image_state.formats or not all(encoding in ["png","png8","webp"] for encoding in image_state.formats):
+            self.error(self,"Invalid provided in config file for images['formats'], must be a list of 'png', 'png8' or 'webp'.",self._check_image_state)
+            return False
+        if not self._is_int(image_state.quality) or not 1 <= image_state.quality <= 100:
+            self.error(self,"Invalid provided in config file for images['quality'], must be between 1 and 100.",self._check_image_state)
+            return False
+        if image_state.max_upload_kb is not None and (not self._is_int(image_state.max_upload_kb) or image_state.max_upload_kb < 1):
+            self.error(self,"Invalid provided in config file for images['max upload kb'].",self._check_image_state)
+            return False
+        return True
+
+    def _check_pool_state(self,pool_state:PoolState) -> bool:
+        """Returns True if the pool state object is valid."""
+        if not pool_state: return False
+        if pool_state.cooldown_weeks is not None and (not isinstance(pool_state.cooldown_weeks,(int,float)) or pool_state.cooldown_weeks < 0):
+            self.error(self,"Invalid provided in config file for pool['cooldown weeks'].",self._check_pool_state)
+            return False
+        if not self._is_int(pool_state.level_band_size) or pool_state.level_band_size < 1:
+            self.error(self,"Invalid provided in config file for pool['level band size'].",self._check_pool_state)
+            return False
+        for key,weights in (("level band weights",pool_state.level_band_weights),("location weights",pool_state.location_weights)):
+            if not isinstance(weights,dict) or not all(isinstance(weight,(int,float)) and weight >= 0 for weight in weights.values()):
+                self.error(self,f"Invalid provided in config file for pool['{key}'], weights must be numbers of 0 or more.",self._check_pool_state)
+                return False
+        if pool_state.seed is not None and not self._is_int(pool_state.seed):
+            self.error(self,"Invalid provided in config file for pool['seed'].",self._check_pool_state)
+            return False
+        return True
+
+    def _check_logging_state(self,logging_state:LoggingState) -> bool:
+        """Returns True if the logging state object is valid."""
+        if not logging_state: return False
+        if logging_state.level not in LEVEL_NAMES:
+            self.error(self,f"Invalid provided in config file for logging['level'], must be one of {', '.join(LEVEL_NAMES)}.",self._check_logging_state)
+            return False
+        if not self._is_int(logging_state.max_queued_lines) or logging_state.max_queued_lines < 1:
+            self.error(self,"Invalid provided in config file for logging['max queued lines'].",self._check_logging_state)
+            return False
+        if logging_state.file is not None and (not self._is_str(logging_state.file) or not logging_state.file):
+            self.error(self,"Invalid provided in config file for logging['file'].",self._check_logging_state)
+            return False
+        if not self._is_int(logging_state.max_file_kb) or logging_state.max_file_kb < 1:
+            self.error(self,"Invalid provided in config file for logging['max file kb'].",self._check_logging_state)
+            return False
+        if not self._is_int(logging_state.backup_files) or logging_state.backup_files < 0:
+            self.error(self,"Invalid provided in config file for logging['backup files'].",self._check_logging_state)
+            return False
+        if not isinstance(logging_state.repeat_window_seconds,(int,float)) or isinstance(logging_state.repeat_window_seconds,bool) or logging_state.repeat_window_seconds < 0:
+            self.error(self,"Invalid provided in config file for logging['repeat window seconds'].",self._check_logging_state)
+            return False
+        return True
+
+    def _check_cadence_state(self,cadence_state:CadenceState) -> bool:
+        """Returns True if the update cadence state object is valid."""
+        if not cadence_state: return False
+        if not isinstance(cadence_state.adaptive,bool):
+            self.error(self,"Invalid provided in config file for cadence['adaptive'], must be true or false.",self._check_cadence_state)
+            return False
+        for key,value in (("min update minutes",cadence_state.min_update_minutes),("max update minutes",cadence_state.max_update_minutes),
+                          ("finish window hours",cadence_state.finish_window_hours)):
+            if not isinstance(value,(int,float)) or isinstance(value,bool) or value <= 0:
+                self.error(self,f"Invalid provided in config file for cadence['{key}'], must be a number above 0.",self._check_cadence_state)
+                return False
+        if cadence_state.min_update_minutes > cadence_state.max_update_minutes:
+            self.error(self,"Invalid provided in config file for cadence['min update minutes'], must not be above cadence['max update minutes'].",self._check_cadence_state)
+            return False
+        if not isinstance(cadence_state.idle_backoff,(int,float)) or isinstance(cadence_state.idle_backoff,bool) or cadence_state.idle_backoff < 1:
+            self.error(self,"Invalid provided in config file for cadence['idle backoff'], must be 1 or more.",self._check_cadence_state)
+            return False
+        if cadence_state.max_requests_per_hour is not None and (not self._is_int(cadence_state.max_requests_per_hour) or cadence_state.max_requests_per_hour < 1):
+            self.error(self,"Invalid provided in config file for cadence['max requests per hour'].",self._check_cadence_state)
+            return False
+        return True
+
     def _is_str(self,value:str) -> bool:
         """Returns True if the value is a string."""
         return isinstance(value,str)
@@ -0,0 +1,103 @@
+from base.logging import Logger
+from modules.logic.paginator import paginate_lines, MESSAGE_LIMIT
+from collections import deque
+import asyncio
+import itertools
+
+class ConsoleSink(Logger):
+    """Buffers console channel messages and packs them into as few messages as possible.  Queued messages are flushed every
+    flush_interval_seconds, or immediately when an error is posted.  If more than max_queued_lines lines are waiting, the oldest are dropped.
+    Lines posted with a header keep it: every packed message holding some of those lines has the header above them."""
+    def __init__(self,send_func,flush_interval_seconds:float = 2.0,max_queued_lines:int = 1000,limit:int = MESSAGE_LIMIT):
+        """send_func is an async function that takes a single string and sends it to the console channel, returning None if the message was dropped."""
+        super().__init__()
+        self.send_func = send_func
+        self.flush_interval_seconds:float = flush_interval_seconds
+        self.max_queued_lines:int = max_queued_lines
+        self.limit:int = limit
+        # (header, line) pairs, the header is "" for lines posted without one
+        self.__queue:deque[tuple[str,str]] = deque()
+        self.__flush_now:asyncio.Event = None
+        self.__task:asyncio.Task = None
+        self.__flush_lock:asyncio.Lock = asyncio.Lock()
+        # statistics
+        self.posted:int = 0
+        self.sent_messages:int = 0
+        self.merged_lines:int = 0
+        self.dropped_lines:int = 0
+        self.__unreported_drops:int = 0
+
+    def start(self):
+        """Starts the background flush loop.  Must be called from within the running event loop.  Does nothing if already running."""
+        if self.__task and not self.__task.done():
+            return
+        self.__flush_now = asyncio.Event()
+        self.__task = asyncio.create_task(self.__run())
+        self.log(self,f"Console sink started, flushing every {self.flush_interval_seconds} seconds",self.start)
+
+    def stop(self):
+        """Stops the background flush loop.  Queued messages are kept until the next start or flush."""
+        if self.__task:
+            self.__task.cancel()
+            self.__task = None
+
+    def post(self,message:str,error:bool = False,header:str = ""):
+        """Queues a message for the console channel.  Errors trigger an immediate flush.
+        header is repeated above the lines of the message in every packed message they end up in."""
+        self.posted += 1
+        lines:list[str] = message.split("\n") if message else [""]
+        # strip the trailing newline most callers add
+        if len(lines) > 1 and lines[-1] == "":
+            lines.pop()
+        self.__queue.extend((header,line) for line in lines)
+        overflow:int = len(self.__queue) - self.max_queued_lines
+        for _ in range(max(0,overflow)):
+            self.__queue.popleft()
+        if overflow > 0:
+            self.dropped_lines += overflow
+            self.__unreported_drops += overflow
+        if error and self.__flush_now:
+            self.__flush_now.set()
+
+    async def flush(self):
+        """Sends every queued line now, packed into as few messages as possible."""
+        async with self.__flush_lock:
+            await self.__flush()
+
+    async def __flush(self):
+        if not self.__queue and not self.__unreported_drops:
+            return
+        queued:list[tuple[str,str]] = list(self.__queue)
+        self.__queue.clear()
+        if self.__unreported_drops:
+            queued.insert(0,("",f"[console] {self.__unreported_drops} lines were dropped while the console was backed up"))
+            self.__unreported_drops = 0
+        # each run of lines with the same header is paged with its header, then the pages are packed together
+        chunks:list[str] = []
+        for header,run in itertools.groupby(queued,key=lambda entry: entry[0]):
+            chunks.extend(paginate_lines([line for _,line in run],self.limit,header))
+        pages:list[str] = list(paginate_lines(chunks,self.limit))
+        self.merged_lines += max(0,len(queued) - len(pages))
+        for page in pages:
+            try:
+                if await self.send_func(page) is None:
+                    # the outbound queue dropped the message under load
+                    self.dropped_lines += page.count("\n") + 1
+                    continue
+                self.sent_messages += 1
+            except Exception as e:
+                self.dropped_lines += page.count("\n") + 1
+                self.error(self,f"Error sending console message: {e}",self.flush)
+
+    async def __run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.__flush_now.wait(),timeout=self.flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self.__flush_now.clear()
+            await self.flush()
+
+    def get_stats(self) -> str:
+        """Returns a one line summary of the sink statistics."""
+        return f"posted: {self.posted} | sent messages: {self.sent_messages} | merged lines: {self.merged_lines} | dropped lines: {self.dropped_lines} | queued lines: {len(self.__queue)}"
@@ -2,23 +2,45 @@ import discord
 from discord.ext import commands
 import discord.context_managers
 import os
-from base.logging import Logger
+import io
+import asyncio
+from base.logging import Logger, configure_logging, log_sink
+from base.startup_profiler import startup_profiler
 from services.config_handler import ConfigHandler
 from services.boss_handler import BossHandler
 from services.player_handler import PlayerHandler
 from services.session_handler import StateHandler
 from services.vote_handler import VoteHandler
+from modules.repositories.filesystem import VoteJournalRepository
 from modules.objects.boss import LocalBoss, Boss
 from modules.dtos.boss_emoji_data import BossEmoji
-from modules.logic.image_gen import combine_images
+from modules.logic.image_gen import LeaderboardImageRenderer, ImageEncoder, image_extension
 from modules.objects.player import Player
 from modules.state.session import Session
+from modules.state.image_state import ImageState
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from modules.state.event_state import EventState
 from services.async_timer import AsyncTimer
+from modules.logic.ranking_matrix import KillMatrix
+from services.console_sink import ConsoleSink
+from services.throttled_updater import ThrottledUpdater
+from services.file_watcher import FileWatcher
+from modules.logic.pool_sampler import PoolSampler
+from modules.state.pool_state import PoolState
+from modules.state.logging_state import LoggingState
+from modules.state.api_state import ApiState
+from modules.state.cadence_state import CadenceState
+from modules.logic.update_cadence import UpdateCadence, CadencePlan
+from datetime import datetime
+from services.reaction_batcher import ReactionBatcher, collapse_reactions
+from modules.dtos.reaction_event import ReactionEvent
+from services.image_service import ImageService
+from modules.dtos.rendered_image import RenderedImage
+from services.outbound_scheduler import OutboundScheduler, PRIORITY_USER, PRIORITY_NORMAL, PRIORITY_CONSOLE, PRIORITY_PURGE
+from modules.logic.paginator import paginate_lines, select_rows, MESSAGE_LIMIT, EMBED_DESCRIPTION_LIMIT
 
 class DiscordHandler(Logger):
-    def __init__(self,config_handler:ConfigHandler,state_hanlder:StateHandler):
+    def __init__(self,config_handler:ConfigHandler,state_hanlder:StateHandler,boss_handler:BossHandler = None):
         super().__init__()
         # Create Bot
         intents = discord.Intents.default()
@@ -28,81 +50,101 @@ class DiscordHandler(Logger):
         self.bot:commands.Bot = commands.Bot(command_prefix="!", intents=intents)
         # initialize handlers ---------------------------------
         self.__config_handler:ConfigHandler = config_handler
-        self.__boss_handler:BossHandler = BossHandler(config_handler.paths.filepath_boss_data)
-        self.__player_handler:PlayerHandler = PlayerHandler(config_handler.paths.filepath_player_data,self.__config_handler.api_state)
+        self.__boss_handler:BossHandler = boss_handler or BossHandler(config_handler.paths.filepath_boss_data)
+        startup_profiler.mark("discord client setup")
+        with startup_profiler.phase("player data"):
+            self.__player_handler:PlayerHandler = PlayerHandler(config_handler.paths.filepath_player_data,self.__config_handler.api_state)
         self.__session_handler:StateHandler = state_hanlder
         self.__vote_handler:VoteHandler = None #vote handler will be created when needed, and deleted when not in use
         self.__valid_emojis:list[str] = ['🇦', '🇧', '🇨', '🇩']
+        self.leaderboard_header:str = "Leaderboard:\nKills | Discord Name | OSRS Name"
+        image_state:ImageState = config_handler.get_image_state()
+        upload_encoder:ImageEncoder = ImageEncoder(image_state.formats,image_state.quality,image_state.max_upload_kb * 1024 if image_state.max_upload_kb else None)
+        self.__leaderboard_renderer:LeaderboardImageRenderer = LeaderboardImageRenderer(encoder=upload_encoder)
+        self.__image_service:ImageService = ImageService(
+            config_handler.paths.filepath_image_folder,
+            config_handler.paths.folder_path_image_cache,
+            worker_pool=image_state.worker_pool,
+            workers=image_state.workers,
+            render_timeout_seconds=image_state.render_timeout_seconds,
+            atlas_heights=image_state.atlas_heights,
+            encoder=upload_encoder,
+            # the vote image prepared when tracking closes is stored in the session by path, and reused if the bot restarts before voting opens
+            persist_composites=True
+        )
+        self.__outbound:OutboundScheduler = OutboundScheduler()
+        self.__console_sink:ConsoleSink = ConsoleSink(self.__send_console_message,self.__config_handler.get_discord_state().console_flush_seconds)
+        # the open voting message, edited with live vote counts at most once per interval
+        self.__voting_message:discord.Message = None
+        self.__vote_journal:VoteJournalRepository = VoteJournalRepository(config_handler.paths.filepath_vote_journal)
+        self.__reaction_batcher:ReactionBatcher = ReactionBatcher(self.process_reactions)
+        self.__vote_display:ThrottledUpdater = ThrottledUpdater(self.__edit_voting_message,self.__config_handler.get_discord_state().vote_update_seconds)
         # scheduled events -------------------------------------
         self.grace_seconds:int = 60
-        event_schedule:EventState = self.__config_handler.get_event_state()
-        self.scheduler:AsyncIOScheduler = AsyncIOScheduler()
-        self.scheduler.add_job(self.open_voting_logic, 'cron', day_of_week=event_schedule.vote_open_day, hour=event_schedule.vote_open_hour, minute=event_schedule.vote_open_minute,misfire_grace_time=self.grace_seconds)
-        self.scheduler.add_job(self.close_voting_logic, 'cron', day_of_week=event_schedule.vote_close_day, hour=event_schedule.vote_close_hour, minute=event_schedule.vote_close_minute,misfire_grace_time=self.grace_seconds)
-        self.scheduler.add_job(self.open_tracking_logic, 'cron', day_of_week=event_schedule.tracking_start_day, hour=event_schedule.tracking_start_hour, minute=event_schedule.tracking_start_minute,misfire_grace_time=self.grace_seconds)
-        self.scheduler.add_job(self.close_tracking_logic, 'cron', day_of_week=event_schedule.tracking_stop_day, hour=event_schedule.tracking_stop_hour, minute=event_schedule.tracking_stop_minute,misfire_grace_time=self.grace_seconds)
+        startup_profiler.mark("image and vote services")
+        with startup_profiler.phase("scheduler setup"):
+            self.scheduler:AsyncIOScheduler = AsyncIOScheduler()
+            # job id -> (day, hour, minute) the job is scheduled at, so a config reload only reschedules the jobs that changed
+            self.__scheduled_events:dict[str,tuple] = {}
+            self.schedule_events()
+        # admin names, lower case, swapped as a whole when the config is reloaded
+        self.__admins:set[str] = self.__admin_set()
+        # config.json and local_bosses.json are reloaded when they change
+        self.__file_watcher:FileWatcher = FileWatcher(self.__config_handler.get_discord_state().reload_poll_seconds)
+        self.__file_watcher.watch(self.__config_handler.filepath_config,self.reload_config)
+        self.__file_watcher.watch(self.__config_handler.paths.filepath_boss_data,self.reload_bosses)
         # scheduled updates for active tracking handler
         self.update_timer:AsyncTimer = None
+        # (matrix, time, (tracking active, current boss)) of the last !clan_summary, to report the kills gained since
+        self.__last_clan_summary:tuple = None
+        # picks the interval between scheduled updates from the activity and the time left in tracking
+        self.__update_cadence:UpdateCadence = UpdateCadence(*self.__update_cadence_settings())
+        startup_profiler.mark("command and event setup")
         # events
         @self.bot.event
         async def on_ready():
+            first_ready:bool = not startup_profiler.finished
+            if first_ready:
+                startup_lines:list[str] = startup_profiler.finish("gateway connect")
+                for line in startup_lines: self.log(self,f"Startup: {line}",on_ready)
+            self.__console_sink.start()
+            self.__reaction_batcher.start()
+            self.__file_watcher.start()
             await self.dlog(f"Bot is ready.  Logged in as {self.bot.user.name}")
+            if first_ready:
+                await self.dlog_lines(startup_lines,"Startup time:")
             #if tracking is active, start the periodic updates
             if self.__session_handler.get_current_session().tracking_active:
                 await self.dlog("Bot was (re)started during tracking active phase. Starting periodic updates...")
                 await self.start_periodic_updates()
             #if voting is active, restart the voting phase
             if self.__session_handler.get_current_session().voting_active:
-                await self.dlog("Bot was (re)started during voting active phase. Restarting voting phase...")
-                await self.open_voting_logic()
+                await self.dlog("Bot was (re)started during voting active phase. Resuming voting phase...")
+                await self.resume_voting_logic()
+            # the thumbnail atlas is checked (and rebuilt if needed) once the bot is online, off the event loop
+            if first_ready:
+                await asyncio.to_thread(self.__image_service.load_atlas,self.__boss_handler.get_bosses())
 
+        # raw reaction events are used because on_reaction_add/remove only fire for messages in the client's message cache,
+        # and a voting message fetched again after a restart is never cached
         @self.bot.event
-        async def on_reaction_add(reaction:discord.Reaction,user:discord.User):
-            #ignore bot and check channel
-            # if not in a voting session, ignore
-            if user.bot: return
-            if not self.check_channel(self.__config_handler.get_discord_state().voting_channel_id,reaction.message.channel.id): return
-            if not self.__session_handler.get_current_session().voting_active: return
-            if not self.__vote_handler:
-                await self.dlog(f"Error: vote handler not set but voting is open.  Ignoring reaction.")
-                return
-            if not self.reaction_valid(reaction.emoji):
-                #remove it
-                await reaction.remove(user)
-                return
-            #check if user has already been linked to an osrs name
-            if not self.__player_handler.discord_name_exists(user.name):
-                #remove it
-                await reaction.remove(user)
-                await self.dlog(f"Could not add vote for {user.name}: user has not been linked to an OSRS name.")
-                return
-            previous_reaction:str = self.__vote_handler.get_previous_reaction(user.name)
-            if previous_reaction:
-                #remove previous reaction
-                await reaction.message.remove_reaction(previous_reaction,user)
-            #add the vote
-            if not self.__vote_handler.add_vote(user.name,reaction.emoji):
-                await self.dlog(f"Error adding vote for {user.name} with emoji {reaction.emoji}")
-                return
-        
+        async def on_raw_reaction_add(payload:discord.RawReactionActionEvent):
+            # if not a reaction to the voting message during a voting session, ignore
+            if not self.__is_voting_reaction(payload): return
+            user:discord.abc.User = payload.member or await self.__reaction_user(payload)
+            if not user or user.bot: return
+            # votes are processed in batches, see process_reactions
+            self.__reaction_batcher.post(self.__reaction_message(payload),self.__reaction_emoji(payload),user,True)
+
         @self.bot.event
-        async def on_reaction_remove(reaction:discord.Reaction,user:discord.User):
-            #ignore bot and check channel
-            # if not in a voting session, ignore
-            if user.bot: return
-            if not self.check_channel(self.__config_handler.get_discord_state().voting_channel_id,reaction.message.channel.id): return
-            if not self.__session_handler.get_current_session().voting_active: return
-            if not self.__vote_handler:
-                await self.dlog(f"Error: vote handler not set but voting is open.  Ignoring reaction.")
-                return
-            if not self.reaction_valid(reaction.emoji):
-                return
-            if not self.__player_handler.discord_name_exists(user.name):
-                return
-            #remove the vote
-            if not self.__vote_handler.remove_vote(user.name,reaction.emoji):
-                await self.dlog(f"Error removing vote for {user.name} with emoji {reaction.emoji}.  The vote did not exist.")
-                return
+        async def on_raw_reaction_remove(payload:discord.RawReactionActionEvent):
+            if not self.__is_voting_reaction(payload): return
+            emoji = self.__reaction_emoji(payload)
+            # removals the bot made itself are dropped before the user is looked up
+            if self.__reaction_batcher.is_expected_removal(payload.message_id,emoji,payload.user_id): return
+            user:discord.abc.User = await self.__reaction_user(payload)
+            if not user or user.bot: return
+            self.__reaction_batcher.post(self.__reaction_message(payload),emoji,user,False,check_expected=False)
 
         @self.bot.event
         async def on_message(message:discord.Message):
@@ -122,25 +164,46 @@ class DiscordHandler(Logger):
             #see if the discord author is already linked
             existing_osrs_name:str = self.__player_handler.get_osrs_name(ctx.author.name)
             if existing_osrs_name:
-                await self.send_message(ctx.channel.id,f"Discord name '{ctx.author.name}' is already linked to {existing_osrs_name}")
+                await self.send_message(ctx.channel.id,f"Discord name '{ctx.author.name}' is already linked to {existing_osrs_name}",PRIORITY_USER)
                 return
             #set the name
             desired_name = " ".join(name).strip().lower()
             response:int = await self.__player_handler.add(ctx.author.name,desired_name,self.__boss_handler.get_bosses())
             if response == -2: #save error occurred
-                await self.send_message(ctx.channel.id,f"Error saving player to disc: {ctx.author.name} | {desired_name}")
+                await self.send_message(ctx.channel.id,f"Error saving player to disc: {ctx.author.name} | {desired_name}",PRIORITY_USER)
             elif response == -1: #no response from api check (likely invalid username)
-                await self.send_message(ctx.channel.id,f"No response from API check for {desired_name}.  Either the service is down, or the username is invalid.  Player not added")
+                await self.send_message(ctx.channel.id,f"No response from API check for {desired_name}.  Either the service is down, or the username is invalid.  Player not added",PRIORITY_USER)
             elif response == 0: #player already exists
                 discord_linked_osrs_name:str = self.__player_handler.get_osrs_name(ctx.author.name)
                 osrs_linked_discord_name:str = self.__player_handler.get_discord_name(desired_name)
                 if discord_linked_osrs_name:
-                    await self.send_message(ctx.channel.id,f"Discord name '{ctx.author.name}' is linked to {discord_linked_osrs_name}")
+                    await self.send_message(ctx.channel.id,f"Discord name '{ctx.author.name}' is linked to {discord_linked_osrs_name}",PRIORITY_USER)
                 if osrs_linked_discord_name:
-                    await self.send_message(ctx.channel.id,f"OSRS name '{desired_name}' is linked to {osrs_linked_discord_name}")
+                    await self.send_message(ctx.channel.id,f"OSRS name '{desired_name}' is linked to {osrs_linked_discord_name}",PRIORITY_USER)
             elif response == 1: #player added
-                await self.send_message(ctx.channel.id,f"Added player: '{ctx.author.name}' linked to '{desired_name}'")
+                await self.send_message(ctx.channel.id,f"Added player: '{ctx.author.name}' linked to '{desired_name}'",PRIORITY_USER)
         
+        @self.bot.command(help="!leaderboard <count:int> - view the top players for the current boss, and your own rank.")
+        async def leaderboard(ctx:commands.Context, count:str = "10"):
+            #ignore bot and check channel
+            if ctx.author.bot: return
+            if not self.check_channel(self.__config_handler.get_discord_state().set_name_channel_id,ctx.channel.id): return
+            session:Session = self.__session_handler.get_current_session()
+            boss:LocalBoss = session.current_boss or session.last_boss
+            if not boss:
+                await self.send_message(ctx.channel.id,"Leaderboard:\nNo current or previous boss data",PRIORITY_USER)
+                return
+            top:int = int(count) if count.strip().isdigit() else 10
+            rows:list[dict] = self.get_leaderboard_rows(boss)
+            own_index:int = next((i for i,row in enumerate(rows) if row["discord_name"] == ctx.author.name),-1)
+            message_lines:list[str] = []
+            for position,row in select_rows(rows,top,own_index):
+                if position >= top: message_lines.append("...")
+                message_lines.append(f"#{position + 1} {self.format_leaderboard_row(row)}")
+            if not message_lines: message_lines.append("No data to display")
+            for page in paginate_lines(message_lines,MESSAGE_LIMIT,f"{boss.name} {self.leaderboard_header}"):
+                await self.send_message(ctx.channel.id,page,PRIORITY_USER)
+
         @self.bot.command(help="!clear_name <osrs name> - remove osrs name link.")
         async def clear_name(ctx:commands.Context, *name:str):
             # ignore bot and check channel and check for admin
@@ -293,37 +356,48 @@ class DiscordHandler(Logger):
             if not self.__is_admin(ctx.author.name): return
             if not self.check_channel(self.__config_handler.get_discord_state().console_channel_id,ctx.channel.id): return
             session:Session = self.__session_handler.get_current_session()
-            message:str = f"Session Details:\n"
-            message += f"Tracking Active: {session.tracking_active}\n"
-            message += f"Voting Active: {session.voting_active}\n"
-            message += f"Current Boss: {session.current_boss.name} | {session.current_boss.level} | {session.current_boss.location}\n" if session.current_boss else "Current Boss: None\n"
-            message += f"Last Boss: {session.last_boss.name} | {session.last_boss.level} | {session.last_boss.location}\n" if session.last_boss else "Last Boss: None\n"
-            message += f"Boss Pool:\n"
+            message_lines:list[str] = ["Session Details:"]
+            message_lines.append(f"Tracking Active: {session.tracking_active}")
+            message_lines.append(f"Voting Active: {session.voting_active}")
+            message_lines.append(f"Current Boss: {session.current_boss.name} | {session.current_boss.level} | {session.current_boss.location}" if session.current_boss else "Current Boss: None")
+            message_lines.append(f"Last Boss: {session.last_boss.name} | {session.last_boss.level} | {session.last_boss.location}" if session.last_boss else "Last Boss: None")
+            message_lines.append("Boss Pool:")
             if len(session.boss_pool) == 0:
-                message += "\tNone\n"
+                message_lines.append("\tNone")
             else:
-                for boss in session.boss_pool: message += f"\t{boss.name} | {boss.level} | {boss.location}\n"
-            message += f"Start Time: {session.start_time}\n"
-            message += f"Used Bosses:\n"
-            if len(session.used_boss_list) == 0:
-                message += "\tNone\n"
+                for boss in session.boss_pool: message_lines.append(f"\t{boss.name} | {boss.level} | {boss.location}")
+            message_lines.append(f"Start Time: {session.start_time}")
+            message_lines.append("Used Bosses:")
+            if len(session.used_boss_ids) == 0:
+                message_lines.append("\tNone")
             else:
-                for boss in session.used_boss_list: message += f"\t{boss.name}\n"
-            await self.dlog(message)
+                for boss in session.used_bosses: message_lines.append(f"\t{boss.name}")
+            await self.dlog_lines(message_lines)
 
         @self.bot.command(help="!set_boss <boss_name:str> - Force-set current boss.")
         async def set_boss(ctx:commands.Context, *boss:str):
             if ctx.author.bot: return
             if not self.__is_admin(ctx.author.name): return
             if not self.check_channel(self.__config_handler.get_discord_state().console_channel_id,ctx.channel.id): return
-            user_selected_boss:str = " ".join(boss).lower()
-            local_bosses:list[LocalBoss] = self.__boss_handler.get_bosses()
-            for lb in local_bosses:
-                if lb.name.lower() == user_selected_boss:
-                    self.__session_handler.set_current_boss(lb)
-                    await self.dlog(f"Set current boss to {lb.name}")
-                    return
-            await self.dlog(f"Error setting current boss: boss '{user_selected_boss}' could not be found.  Check that it exists in local_bosses.json and is spelled correctly. Boss name is not case-sensitive.")
+            user_selected_boss:str = " ".join(boss)
+            selected:LocalBoss = self.__boss_handler.find_boss(user_selected_boss)
+            if selected:
+                self.__session_handler.set_current_boss(selected)
+                await self.dlog(f"Set current boss to {selected.name}")
+                return
+            await self.dlog(f"Error setting current boss: boss '{user_selected_boss}' could not be found.  {self.format_boss_suggestions(user_selected_boss)}")
+
+        @self.bot.command(help="!find_boss <boss_name:str> - Look up a boss by name, api name, alias or the start of one.")
+        async def find_boss(ctx:commands.Context, *boss:str):
+            if ctx.author.bot: return
+            if not self.__is_admin(ctx.author.name): return
+            if not self.check_channel(self.__config_handler.get_discord_state().console_channel_id,ctx.channel.id): return
+            user_selected_boss:str = " ".join(boss)
+            matches:list[LocalBoss] = self.__boss_handler.suggest_bosses(user_selected_boss,10)
+            if not matches:
+                await self.dlog(f"No boss matches '{user_selected_boss}'")
+                return
+            await self.dlog_lines([f"\t{lb.name} | {lb.api_name} | {', '.join(lb.aliases) or 'no aliases'}" for lb in matches],f"Bosses matching '{user_selected_boss}' (Name | API Name | Aliases):")
 
         @self.bot.command(help="!stats <osrs name:str> or !stats <discord name:str> - view player stats.")
         async def stats(ctx:commands.Context, *username:str):
@@ -346,17 +420,7 @@ class DiscordHandler(Logger):
             message_lines.append(f"Player: {player.osrs_name} | {player.discord_name}")
             for boss in player.boss_list:
                 message_lines.append(f"{boss.name} | {boss.kills} | {boss.tracked_kills}")
-            messages:list[str] = []
-            #split the message into 2000 character chunks
-            message:str = ""
-            for line in message_lines:
-                if len(message + line) > 2000:
-                    messages.append(message)
-                    message = ""
-                message += line + "\n"
-            messages.append(message)
-            for message in messages:
-                await self.dlog(message)
+            await self.dlog_lines(message_lines)
 
         @self.bot.command(help="!update <osrs name:str> or !update <discord name:str> - update player API data.")
         async def update(ctx:commands.Context, *username:str):
@@ -389,25 +453,169 @@ class DiscordHandler(Logger):
             if ctx.author.bot: return
             if not self.__is_admin(ctx.author.name): return
             if not self.check_channel(self.__config_handler.get_discord_state().console_channel_id,ctx.channel.id): return
-            message:str = "Bosses:\n"
-            if not self.__boss_handler.get_bosses():
-                message += "\tNone"
-            else:
-                for boss in self.__boss_handler.get_bosses():
-                    message += f"\t{boss.name} | {boss.level} | {boss.location}\n"
+            message_lines:list[str] = [f"\t{boss.name} | {boss.level} | {boss.location}" + (f" | aka {', '.join(boss.aliases)}" if boss.aliases else "") for boss in self.__boss_handler.get_bosses()] or ["\tNone"]
+            await self.dlog_lines(message_lines,"Bosses:")
 
         @self.bot.command(help="List all player associations.")
         async def list_users(ctx:commands.Context):
             if ctx.author.bot: return
             if not self.__is_admin(ctx.author.name): return
             if not self.check_channel(self.__config_handler.get_discord_state().console_channel_id,ctx.channel.id): return
-            message:str = "User Associations (Discord | OSRS):\n"
-            if not self.__player_handler.get_players():
-                message += "\tNone"
-            else:
-                for player in self.__player_handler.get_players():
-                    message += f"\t{player.discord_name} | {player.osrs_name}\n"
-            await self.dlog(message)
+            message_lines:list[str] = [f"\t{player.discord_name} | {player.osrs_name}" for player in self.__player_handler.get_players()] or ["\tNone"]
+            await self.dlog_lines(message_lines,"User Associations (Discord | OSRS):")
+
+        @self.bot.command(help="!clan_top <count:int> - view the top players at every boss.")
+        async def clan_top(ctx:commands.Context, count:str = "3"):
+            if ctx.author.bot: return
+            if not self.__is_admin(ctx.author.name): return
+            if not self.check_channel(self.__config_handler.get_discord_state().console_channel_id,ctx.channel.id): return
+            if not count.strip().isdigit():
+                await self.dlog(f"Error viewing clan top: '{count}' is not a number")
+                return
+            matrix:KillMatrix = KillMatrix.build(self.__player_handler.get_players(),self.__boss_handler.get_bosses())
+            if not matrix:
+                await self.dlog("Error viewing clan top: numpy is not installed")
+                return
+            message_lines:list[str] = [f"Top {int(count)} at each boss (Kills | OSRS Name):"]
+            top:dict[str,list[tuple[str,int]]] = matrix.top(int(count))
+            for boss_name,display_name in zip(matrix.boss_names,matrix.boss_display_names):
+                message_lines.append(f"{display_name}:")
+                if not top[boss_name]:
+                    message_lines.append("\tNone")
+                for osrs_name,kills in top[boss_name]:
+                    message_lines.append(f"\t{kills} | {osrs_name}")
+            await self.dlog_lines(message_lines)
+
+        @self.bot.command(help="!clan_ranks <osrs name:str> or !clan_ranks <discord name:str> - view a player's clan rank at every boss.")
+        async def clan_ranks(ctx:commands.Context, *username:str):
+            if ctx.author.bot: return
+            if not self.__is_admin(ctx.author.name): return
+            if not self.check_channel(self.__config_handler.get_discord_state().console_channel_id,ctx.channel.id): return
+            check_name_str:str = " ".join(username)
+            osrs_name:str = self.__player_handler.get_osrs_name(check_name_str) or check_name_str.lower().strip()
+            if not self.__player_handler.osrs_name_exists(osrs_name):
+                await self.dlog(f"Error viewing clan ranks: player {check_name_str} does not exist")
+                return
+            matrix:KillMatrix = KillMatrix.build(self.__player_handler.get_players(),self.__boss_handler.get_bosses())
+            if not matrix:
+                await self.dlog("Error viewing clan ranks: numpy is not installed")
+                return
+            message_lines:list[str] = [f"Clan ranks for {osrs_name} of {matrix.player_count} players (Boss | Kills | Rank | Percentile):"]
+            for boss_name,kills,rank,percentile in matrix.player_summary(osrs_name):
+                message_lines.append(f"{boss_name} | {kills} | #{rank} | {percentile:.0f}%")
+            await self.dlog_lines(message_lines)
+
+        @self.bot.command(help="View clan-wide kill totals at every boss, and the tracked kills gained since the last summary.")
+        async def clan_summary(ctx:commands.Context):
+            if ctx.author.bot: return
+            if not self.__is_admin(ctx.author.name): return
+            if not self.check_channel(self.__config_handler.get_discord_state().console_channel_id,ctx.channel.id): return
+            matrix:KillMatrix = KillMatrix.build(self.__player_handler.get_players(),self.__boss_handler.get_bosses())
+            if not matrix:
+                await self.dlog("Error viewing clan summary: numpy is not installed")
+                return
+            session:Session = self.__session_handler.get_current_session()
+            tracked:bool = session.tracking_active
+            totals:dict[str,tuple[int,int]] = matrix.boss_totals(tracked)
+            leaders:dict[str,list[tuple[str,int]]] = matrix.top(1,tracked)
+            # tracked kills gained since the previous summary, only while the same tracking session is running (the baseline is reset between sessions)
+            tracking_key:tuple = (tracked,session.current_boss.api_name if session.current_boss else None)
+            previous:tuple = self.__last_clan_summary
+            gains:dict[str,tuple[int,str,int]] = matrix.boss_gains(previous[0]) if previous and tracked and previous[2] == tracking_key else None
+            self.__last_clan_summary = (matrix,datetime.now(),tracking_key)
+            message_lines:list[str] = [f"Clan {'tracked ' if tracked else ''}kill summary for {matrix.player_count} players (Boss | Total Kills | Players | Leader"
+                                       + (f" | Gained since {previous[1].strftime('%a %H:%M')} | Top Gainer):" if gains else "):")]
+            for boss_name,display_name in zip(matrix.boss_names,matrix.boss_display_names):
+                total,participants = totals[boss_name]
+                leader:str = f"{leaders[boss_name][0][0]} ({leaders[boss_name][0][1]})" if leaders[boss_name] else "None"
+                line:str = f"{display_name} | {total} | {participants} | {leader}"
+                if gains:
+                    gained,gainer,gainer_kills = gains[boss_name]
+                    line += f" | +{gained} | {f'{gainer} (+{gainer_kills})' if gainer else 'None'}"
+                message_lines.append(line)
+            await self.dlog_lines(message_lines)
+
+        @self.bot.command(help="View console channel and bot log statistics.")
+        async def console_stats(ctx:commands.Context):
+            if ctx.author.bot: return
+            if not self.__is_admin(ctx.author.name): return
+            if not self.check_channel(self.__config_handler.get_discord_state().console_channel_id,ctx.channel.id): return
+            await self.dlog(f"Console sink: {self.__console_sink.get_stats()}\nLog sink: {log_sink.get_stats()}")
+
+        @self.bot.command(help="View outbound Discord request queue statistics.")
+        async def queue_stats(ctx:commands.Context):
+            if ctx.author.bot: return
+            if not self.__is_admin(ctx.author.name): return
+            if not self.check_channel(self.__config_handler.get_discord_state().console_channel_id,ctx.channel.id): return
+            await self.dlog_lines(self.__outbound.get_stats(),"Outbound queue:")
+
+        @self.bot.command(help="View the live vote counts and how many voting message edits were saved.")
+        async def vote_stats(ctx:commands.Context):
+            if ctx.author.bot: return
+            if not self.__is_admin(ctx.author.name): return
+            if not self.check_channel(self.__config_handler.get_discord_state().console_channel_id,ctx.channel.id): return
+            if not self.__vote_handler:
+                await self.dlog("Voting is not open")
+                return
+            await self.dlog_lines([self.format_vote_message(),f"Voting message edits: {self.__vote_display.get_stats()}"],"Vote stats:")
+
+        @self.bot.command(help="View reaction batching throughput statistics.")
+        async def reaction_stats(ctx:commands.Context):
+            if ctx.author.bot: return
+            if not self.__is_admin(ctx.author.name): return
+            if not self.check_channel(self.__config_handler.get_discord_state().console_channel_id,ctx.channel.id): return
+            await self.dlog(f"Reactions: {self.__reaction_batcher.get_stats()}")
+
+        @self.bot.command(help="View image cache statistics.")
+        async def image_stats(ctx:commands.Context):
+            if ctx.author.bot: return
+            if not self.__is_admin(ctx.author.name): return
+            if not self.check_channel(self.__config_handler.get_discord_state().console_channel_id,ctx.channel.id): return
+            await self.dlog(f"Image cache: {self.__image_service.get_stats()}")
+
+        @self.bot.command(help="View session file write statistics.")
+        async def session_stats(ctx:commands.Context):
+            if ctx.author.bot: return
+            if not self.__is_admin(ctx.author.name): return
+            if not self.check_channel(self.__config_handler.get_discord_state().console_channel_id,ctx.channel.id): return
+            await self.dlog(f"Session store: {self.__session_handler.get_store_stats()}")
+
+        @self.bot.command(help="View periodic leaderboard update statistics.")
+        async def update_stats(ctx:commands.Context):
+            if ctx.author.bot: return
+            if not self.__is_admin(ctx.author.name): return
+            if not self.check_channel(self.__config_handler.get_discord_state().console_channel_id,ctx.channel.id): return
+            await self.dlog(f"Periodic updates: {self.update_timer.get_stats() if self.update_timer else 'not running'}")
+
+        @self.bot.command(help="View the periodic leaderboard update schedule, and why the current interval was chosen.")
+        async def update_schedule(ctx:commands.Context):
+            if ctx.author.bot: return
+            if not self.__is_admin(ctx.author.name): return
+            if not self.check_channel(self.__config_handler.get_discord_state().console_channel_id,ctx.channel.id): return
+            cadence_state:CadenceState = self.__config_handler.get_cadence_state()
+            plan:CadencePlan = self.__update_cadence.last_plan or self.__plan_update_cadence()
+            seconds_to_stop:float = self.__seconds_to_tracking_stop()
+            next_run:float = self.update_timer.next_run_in() if self.update_timer else None
+            lines:list[str] = [
+                f"Adaptive cadence: {'on' if cadence_state.adaptive else 'off'} ({cadence_state.min_update_minutes:g} to {cadence_state.max_update_minutes:g} min, "
+                f"base {self.__config_handler.get_api_state().bulk_update_frequency_minutes} min)",
+                f"Interval: {plan.interval_seconds / 60:.1f} min | next update: {'not running' if next_run is None else f'in {next_run / 60:.1f} min'}",
+                f"Tracking ends: {'unknown' if seconds_to_stop is None else f'in {seconds_to_stop / 3600:.1f} hours'}"
+            ]
+            lines += [f"\tbecause {reason}" for reason in plan.reasons]
+            lines += [f"\t{line}" for line in self.__update_cadence.history_lines()] or ["\tNo updates measured yet"]
+            if self.update_timer:
+                lines.append(f"Timer: {self.update_timer.get_stats()}")
+            await self.dlog_lines(lines,"Update schedule:")
+
+        @self.bot.command(help="Reload config.json and local_bosses.json now, if they changed.")
+        async def reload(ctx:commands.Context):
+            if ctx.author.bot: return
+            if not self.__is_admin(ctx.author.name): return
+            if not self.check_channel(self.__config_handler.get_discord_state().console_channel_id,ctx.channel.id): return
+            if not await self.__file_watcher.check(force=True):
+                await self.dlog("config.json and local_bosses.json have not changed")
+            await self.dlog(f"File watcher: {self.__file_watcher.get_stats()}")
 
         @self.bot.command(help="Clear previously used bosses (allow them to be used again).")
         async def clear_used_bosses(ctx:commands.Context):
@@ -420,8 +628,123 @@ class DiscordHandler(Logger):
                 await self.dlog("Error clearing used bosses")
 
     async def run(self):
-        self.scheduler.start()
-        await self.bot.start(self.__config_handler.get_discord_state().bot_token)
+        with startup_profiler.phase("scheduler start"):
+            self.scheduler.start()
+        try:
+            await self.bot.start(self.__config_handler.get_discord_state().bot_token)
+        finally:
+            await self.shutdown()
+
+    async def flush_session(self,timeout:float = 10.0) -> bool:
+        """Waits (off the event loop) for queued session writes to finish.  Returns True if the session on disk is current."""
+        if await asyncio.to_thread(self.__session_handler.flush,timeout):
+            return True
+        await self.dlog("Error saving the session: the write did not finish, see the bot log")
+        return False
+
+    async def shutdown(self,timeout:float = 10.0):
+        """Stops the background work when the bot exits, waits for the last queued session write so it is not lost,
+        and sends the console lines still buffered before the connection to discord is closed."""
+        if self.update_timer:
+            self.update_timer.stop()
+        self.__file_watcher.stop()
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+        if not await asyncio.to_thread(self.__session_handler.flush,timeout):
+            self.error(self,"The last session write did not finish before shutdown",self.shutdown)
+            self.__console_sink.post("Error saving the session before shutdown: the write did not finish, see the bot log",True)
+        self.__console_sink.stop()
+        if not self.bot.is_closed():
+            try:
+                await asyncio.wait_for(self.__console_sink.flush(),timeout)
+            except Exception as e:
+                self.warn(self,f"Could not send the last console messages before shutdown: {e or 'timed out'}",self.shutdown)
+            await self.bot.close()
+        self.__image_service.shutdown()
+
+    # scheduling and reloading config and boss data: ----------------
+    def schedule_events(self) -> list[str]:
+        """Schedules the open/close voting and tracking jobs from the event config.  Jobs already scheduled are only rescheduled if their time changed.
+        Returns the ids of the jobs that were (re)scheduled."""
+        event_schedule:EventState = self.__config_handler.get_event_state()
+        events:dict[str,tuple] = {
+            "open_voting":(self.open_voting_logic,event_schedule.vote_open_day,event_schedule.vote_open_hour,event_schedule.vote_open_minute),
+            "close_voting":(self.close_voting_logic,event_schedule.vote_close_day,event_schedule.vote_close_hour,event_schedule.vote_close_minute),
+            "open_tracking":(self.open_tracking_logic,event_schedule.tracking_start_day,event_schedule.tracking_start_hour,event_schedule.tracking_start_minute),
+            "close_tracking":(self.close_tracking_logic,event_schedule.tracking_stop_day,event_schedule.tracking_stop_hour,event_schedule.tracking_stop_minute)
+        }
+        scheduled:list[str] = []
+        for job_id,(func,day,hour,minute) in events.items():
+            if self.__scheduled_events.get(job_id) == (day,hour,minute):
+                continue
+            if job_id in self.__scheduled_events:
+                self.scheduler.reschedule_job(job_id,trigger="cron",day_of_week=day,hour=hour,minute=minute)
+            else:
+                self.scheduler.add_job(func,'cron',id=job_id,day_of_week=day,hour=hour,minute=minute,misfire_grace_time=self.grace_seconds)
+            self.__scheduled_events[job_id] = (day,hour,minute)
+            scheduled.append(job_id)
+        return scheduled
+
+    async def reload_config(self) -> bool:
+        """Reloads config.json and applies the changed sections.  An invalid config is rejected and the current config kept.  Returns True if the config is current."""
+        changed:list[str] = self.__config_handler.reload()
+        if changed is None:
+            await self.dlog("Error reloading config.json: the file is invalid, keeping the current config.  See the bot log for details.")
+            return False
+        if not changed:
+            return True
+        applied:list[str] = []
+        if "discord" in changed:
+            discord_state = self.__config_handler.get_discord_state()
+            self.__admins = self.__admin_set()
+            self.__console_sink.flush_interval_seconds = discord_state.console_flush_seconds
+            self.__vote_display.interval_seconds = discord_state.vote_update_seconds
+            if discord_state.reload_poll_seconds:
+                self.__file_watcher.interval_seconds = discord_state.reload_poll_seconds
+            applied.append(f"{len(self.__admins)} admins, channels and intervals updated (a new bot token needs a restart)")
+        if "event" in changed:
+            rescheduled:list[str] = self.schedule_events()
+            applied.append(f"rescheduled {', '.join(rescheduled)}" if rescheduled else "schedule unchanged")
+        if "pool" in changed:
+            pool_state:PoolState = self.__config_handler.get_pool_state()
+            self.__session_handler.set_pool_sampler(PoolSampler(pool_state.cooldown_weeks,pool_state.level_band_size,pool_state.level_band_weights,pool_state.location_weights,pool_state.seed))
+            applied.append("vote pool weights updated")
+        if "logging" in changed:
+            logging_state:LoggingState = self.__config_handler.get_logging_state()
+            configure_logging(logging_state.level,logging_state.max_queued_lines,self.__config_handler.get_log_filepath(),logging_state.max_file_kb,logging_state.backup_files,
+                              logging_state.repeat_window_seconds)
+            applied.append(f"log level set to {logging_state.level}, log file {self.__config_handler.get_log_filepath() or 'off'}")
+        if "api" in changed or "cadence" in changed:
+            api_state:ApiState = self.__config_handler.get_api_state()
+            self.__update_cadence.configure(*self.__update_cadence_settings())
+            if self.update_timer:
+                self.update_timer.overlap,self.update_timer.jitter_seconds = api_state.update_overlap,api_state.update_jitter_seconds
+                self.update_timer.set_interval(self.__plan_update_cadence().interval_seconds)
+            applied.append("update schedule updated")
+        if "api" in changed:
+            applied.append("api rate limit updated (a new api url or contact name needs a restart)")
+        if "images" in changed:
+            applied.append("image settings need a restart")
+        await self.dlog_lines([f"\t{line}" for line in applied] or ["\tNothing to apply"],f"Reloaded config.json ({', '.join(changed)} changed):")
+        return True
+
+    async def reload_bosses(self) -> bool:
+        """Reloads local_bosses.json and applies the added, removed and changed bosses.  Bosses the current session refers to stay resolvable.
+        Invalid boss data is rejected and the current bosses kept.  Returns True if the boss data is current."""
+        session:Session = self.__session_handler.get_current_session()
+        keep_ids:set[str] = {session.current_boss_id,session.last_boss_id,*session.boss_pool_ids,*session.next_boss_pool_ids} - {None}
+        diff:tuple[list[str],list[str],list[str]] = self.__boss_handler.reload(keep_ids)
+        if diff is None:
+            await self.dlog("Error reloading local_bosses.json: the file is invalid, keeping the current bosses.  See the bot log for details.")
+            return False
+        added,removed,changed = diff
+        if not (added or removed or changed):
+            return True
+        if added or changed:
+            await asyncio.to_thread(self.__image_service.load_atlas,self.__boss_handler.get_bosses())
+        message_lines:list[str] = [f"\t{label}: {', '.join(api_names)}" for label,api_names in (("Added",added),("Removed",removed),("Changed",changed)) if api_names]
+        await self.dlog_lines(message_lines,f"Reloaded local_bosses.json ({len(self.__boss_handler.get_bosses())} bosses):")
+        return True
 
 
     # logic functions for open/close voting, and open/close tracking.  to be used with both commands and scheduler: ----------------
@@ -430,6 +753,10 @@ class DiscordHandler(Logger):
         if self.__session_handler.get_current_session().voting_active:
             await self.dlog("Error opening voting: voting is already open")
             return
+        # the pool (and its image) prepared when tracking closed, used if it is still valid
+        prepared_session:Session = self.__session_handler.get_current_session()
+        prepared_names:list[str] = [boss.api_name for boss in prepared_session.next_boss_pool]
+        prepared_image:str = prepared_session.next_pool_image
         # set session to open voting
         if self.__session_handler.open_voting(self.__boss_handler.get_bosses()):
             await self.dlog("Successfully set session to voting. generating message...")
@@ -444,33 +771,153 @@ class DiscordHandler(Logger):
         boss_emoji_list:list[BossEmoji] = []
         for int in range(4):
             boss_emoji_list.append(BossEmoji(boss_pool[int],self.__valid_emojis[int]))
-        self.__vote_handler = VoteHandler(boss_emoji_list)
-        # clear the voting channel
-        await self.clear_messages(self.__config_handler.get_discord_state().voting_channel_id)
-        # generate an image for the voting message
-        image_paths:list[str] = []
-        for boss_emoji in boss_emoji_list:
-            image_paths.append(os.path.join(self.__config_handler.paths.filepath_image_folder,boss_emoji.boss.image))
-        image_path:str = combine_images(image_paths,self.__config_handler.paths.folder_path_generated_image)
+        self.__vote_handler = VoteHandler(boss_emoji_list,self.__vote_journal)
+        # use the image rendered ahead of time if this is the prepared pool
+        use_prepared:bool = prepared_image and prepared_names == [boss.api_name for boss in boss_pool]
+        if not await self.post_voting_message(boss_emoji_list,prepared_image if use_prepared else None):
+            return
+        await self.dlog("Voting is now open! Vote for the next boss!")
+        await self.update_leaderboard()
+
+    async def post_voting_message(self,boss_emoji_list:list[BossEmoji],prepared_image:str = None) -> discord.Message:
+        """Posts the voting message for the boss pool with its reactions, records it in the session and starts the vote journal for it,
+        then clears the rest of the voting channel.  prepared_image is an optional pre-rendered vote image.  Returns the message, or None if it could not be sent."""
+        vote_image:RenderedImage = None
+        if prepared_image and os.path.isfile(prepared_image):
+            vote_image = await asyncio.to_thread(self.__image_service.read_composite,prepared_image)
+        # otherwise generate one (reused from the image cache if this pool was rendered before)
+        if not vote_image:
+            vote_image = await self.__image_service.render_vote_image([boss_emoji.boss for boss_emoji in boss_emoji_list])
+        if not vote_image:
+            await self.dlog("Error generating voting image, sending the voting message without it")
+        elif vote_image.fallback:
+            await self.dlog(f"Voting image could not be rendered in time, using {vote_image.filename} instead")
         # send a voting message
-        message:str = "Boss Pool:"
-        for boss_emoji in boss_emoji_list:
-            message += f"\n{boss_emoji.emoji} : {boss_emoji.boss.name} | {boss_emoji.boss.level} | {boss_emoji.boss.location}"
-        if message[:-1] == "\n": message = message[:-1]
         last_message:discord.Message = await self.send_embed(
             channel_id=self.__config_handler.get_discord_state().voting_channel_id,
             title="Voting is now Open! Vote for the next boss!",
-            message=message,
-            image_path=image_path
+            message=self.format_vote_message(),
+            image_path=None,
+            image_data=vote_image.data if vote_image else None,
+            filename=vote_image.filename if vote_image else None,
+            priority=PRIORITY_USER
         )
         if not last_message:
             await self.dlog("Error sending voting message")
-            return
+            return None
+        self.__voting_message = last_message
+        self.__session_handler.set_voting_message_id(last_message.id)
+        if self.__vote_handler:
+            self.__vote_handler.start_journal(last_message.id)
         # add reactions to the message
         for emoji in self.__valid_emojis:
-            await last_message.add_reaction(emoji)
-        await self.dlog("Voting is now open! Vote for the next boss!")
-        await self.update_leaderboard()
+            await self.add_reaction(last_message,emoji)
+        # clear the rest of the voting channel, after the new vote is already visible
+        await self.clear_messages(self.__config_handler.get_discord_state().voting_channel_id,keep_ids={last_message.id})
+        return last_message
+
+    async def resume_voting_logic(self):
+        """Resumes an open vote after a restart, without drawing a new pool.  Votes are replayed from the vote journal, then reconciled with the
+        reactions on the existing voting message (votes changed while the bot was offline are picked up).  The voting message is only posted
+        again if it no longer exists."""
+        session:Session = self.__session_handler.get_current_session()
+        if len(session.boss_pool) != 4 or len(self.__valid_emojis) != 4:
+            await self.dlog("Error resuming voting: boss pool or emojis not set correctly")
+            return
+        boss_emoji_list:list[BossEmoji] = [BossEmoji(boss,emoji) for boss,emoji in zip(session.boss_pool,self.__valid_emojis)]
+        self.__vote_handler = VoteHandler(boss_emoji_list,self.__vote_journal,session.voting_message_id)
+        replayed:int = self.__vote_handler.replay_journal()
+        message:discord.Message = await self.fetch_message(self.__config_handler.get_discord_state().voting_channel_id,session.voting_message_id)
+        if not message:
+            # the reactions went with the message, so the votes can not be kept
+            await self.dlog(f"Voting message not found, posting it again.  {self.__vote_handler.get_vote_total()} votes will need to be cast again.")
+            self.__vote_handler = VoteHandler(boss_emoji_list,self.__vote_journal)
+            await self.post_voting_message(boss_emoji_list)
+            return
+        # bulk read the reactions on the voting message
+        user_reactions:dict[str,list[str]] = {}
+        users:dict[str,discord.User] = {}
+        for reaction in message.reactions:
+            if not self.reaction_valid(reaction.emoji):
+                continue
+            async for user in reaction.users():
+                if user.bot: continue
+                if not self.__player_handler.discord_name_exists(user.name):
+                    self.queue_reaction_removal(message,reaction.emoji,user)
+                    continue
+                user_reactions.setdefault(user.name,[]).append(reaction.emoji)
+                users[user.name] = user
+        extra_reactions:dict[str,list[str]] = self.__vote_handler.reconcile(user_reactions)
+        for discord_name,emojis in extra_reactions.items():
+            for emoji in emojis:
+                self.queue_reaction_removal(message,emoji,users[discord_name])
+        # compact the journal to the reconciled votes
+        self.__vote_handler.start_journal(message.id)
+        self.__voting_message = message
+        self.__vote_display.request()
+        await self.dlog(f"Voting resumed: {replayed} journal entries replayed, {self.__vote_handler.get_vote_total()} votes after reconciling {len(user_reactions)} voters' reactions.")
+
+    async def process_reactions(self,user_events:dict[int,list[ReactionEvent]]):
+        """Applies a batch of voting reactions.  Each user's events are collapsed into a single vote change, the link check runs once per user,
+        and stray reactions (previous votes, invalid emojis, unlinked users) are removed without waiting for the removals to finish."""
+        if not self.__vote_handler:
+            await self.dlog(f"Error: vote handler not set but voting is open.  Ignoring {len(user_events)} users' reactions.")
+            return
+        changed:bool = False
+        for events in user_events.values():
+            user:discord.User = events[0].user
+            message:discord.Message = events[-1].message
+            valid_events:list[ReactionEvent] = [event for event in events if self.reaction_valid(event.emoji)]
+            for event in events:
+                if event.added and not self.reaction_valid(event.emoji):
+                    self.queue_reaction_removal(event.message,event.emoji,user)
+            if not valid_events:
+                continue
+            #check if user has already been linked to an osrs name
+            if not self.__player_handler.discord_name_exists(user.name):
+                added:list[ReactionEvent] = [event for event in valid_events if event.added]
+                for event in added:
+                    self.queue_reaction_removal(event.message,event.emoji,user)
+                if added:
+                    await self.dlog(f"Could not add vote for {user.name}: user has not been linked to an OSRS name.")
+                continue
+            previous_reaction:str = self.__vote_handler.get_previous_reaction(user.name)
+            vote,stray_reactions = collapse_reactions(previous_reaction,valid_events)
+            for emoji in stray_reactions:
+                self.queue_reaction_removal(message,emoji,user)
+            if vote == previous_reaction:
+                continue
+            if vote is None:
+                changed = self.__vote_handler.remove_vote(user.name,previous_reaction) or changed
+            elif not self.__vote_handler.add_vote(user.name,vote):
+                await self.dlog(f"Error adding vote for {user.name} with emoji {vote}")
+            else:
+                changed = True
+        if changed:
+            self.__vote_display.request()
+
+    def format_vote_message(self) -> str:
+        """Returns the voting message body: every boss in the pool with its live vote count."""
+        if not self.__vote_handler:
+            return "Boss Pool:"
+        lines:list[str] = ["Boss Pool:"]
+        for boss_emoji,votes in self.__vote_handler.get_counts():
+            lines.append(f"{boss_emoji.emoji} : {boss_emoji.boss.name} | {boss_emoji.boss.level} | {boss_emoji.boss.location} | **{votes}** vote{'' if votes == 1 else 's'}")
+        lines.append(f"Total votes: {self.__vote_handler.get_vote_total()}")
+        return "\n".join(lines)
+
+    async def __edit_voting_message(self):
+        """Edits the voting message to show the current vote counts.  Called by the vote display updater, at most once per interval."""
+        message:discord.Message = self.__voting_message
+        if not message or not message.embeds:
+            return
+        embed:discord.Embed = message.embeds[0].copy()
+        embed.description = self.format_vote_message()
+        if embed.description == message.embeds[0].description:
+            return
+        edited:discord.Message = await self.__outbound.run(message.channel.id,lambda: message.edit(embed=embed),PRIORITY_NORMAL,merge_key=("edit",message.id))
+        if edited and self.__voting_message is message:
+            self.__voting_message = edited
 
     async def close_voting_logic(self):
         # check if voting is open
@@ -478,7 +925,12 @@ class DiscordHandler(Logger):
             await self.dlog("Error closing voting: voting is not open")
             return
         # tally the votes
-        winning_boss:LocalBoss = self.__vote_handler.tally_votes() if self.__vote_handler and self.__vote_handler.tally_votes() else self.__session_handler.get_current_session().boss_pool[0]
+        winning_boss:LocalBoss = self.__vote_handler.tally_votes() if self.__vote_handler else None
+        if not winning_boss:
+            winning_boss = self.__session_handler.get_current_session().boss_pool[0]
+        # stop live vote count updates, the voting message is about to be removed
+        self.__vote_display.cancel()
+        self.__voting_message = None
         
         # clear the voting channel
         await self.clear_messages(self.__config_handler.get_discord_state().voting_channel_id)
@@ -486,6 +938,8 @@ class DiscordHandler(Logger):
             await self.dlog("Successfully closed voting.  Generating message...")
         else:
             await self.dlog("Error closing voting")
+        # the phase change is on disk before anything else happens, so a restart resumes tracking with the winning boss
+        await self.flush_session()
         # create an embed for the winning boss
         await self.send_embed(
             channel_id=self.__config_handler.get_discord_state().voting_channel_id,
@@ -535,31 +989,111 @@ class DiscordHandler(Logger):
             await self.dlog("Error stopping tracking")
         else:
             await self.dlog("Successfully stopped tracking")
+        await self.flush_session()
         # update leaderboard without resetting baseline data
         await self.update_leaderboard(False)
+        # draw and render the next vote pool now, so opening voting only has to post it
+        await self.prepare_next_vote()
+
+    async def prepare_next_vote(self):
+        """Draws the pool for the next vote and renders its image ahead of time, storing both in the session.
+        If the boss list or used boss list changes before voting opens, the pool is discarded and a new one is drawn then."""
+        boss_pool:list[LocalBoss] = self.__session_handler.prepare_next_pool(self.__boss_handler.get_bosses())
+        if not boss_pool:
+            await self.dlog("Error preparing the next vote pool, it will be drawn when voting opens")
+            return
+        vote_image:RenderedImage = await self.__image_service.render_vote_image(boss_pool)
+        image_path:str = self.__image_service.composite_path(boss_pool) if vote_image and not vote_image.fallback else None
+        self.__session_handler.set_next_pool_image(image_path)
+        await self.dlog(f"Prepared the next vote pool: {', '.join(boss.name for boss in boss_pool)}" + ("" if image_path else " (image will be rendered when voting opens)"))
 
     async def start_periodic_updates(self):
-        """This will be called by open_tracking_logic to start the periodic updates for the current boss."""
-        update_interval_seconds:int = self.__config_handler.api_state.bulk_update_frequency_minutes * 60
-        self.update_timer = AsyncTimer(update_interval_seconds,self.update_leaderboard)
-        await self.dlog(f"Periodic updates should now be running for the active tracking session every {str(self.__config_handler.api_state.bulk_update_frequency_minutes)} minutes.")
+        """This will be called by open_tracking_logic to start the periodic updates for the current boss.
+        Periodic updates that are already running (on_ready is called again after a reconnect) are replaced."""
+        if self.update_timer:
+            self.update_timer.stop()
+        api_state:ApiState = self.__config_handler.api_state
+        current_boss:LocalBoss = self.__session_handler.get_current_session().current_boss
+        self.__update_cadence.reset(self.__tracked_kills(current_boss) if current_boss else None)
+        plan:CadencePlan = self.__plan_update_cadence()
+        self.update_timer = AsyncTimer(plan.interval_seconds,self.periodic_update,api_state.update_overlap,api_state.update_jitter_seconds)
+        self.update_timer.start()
+        await self.dlog(f"Periodic updates should now be running for the active tracking session, the next in {plan.interval_seconds / 60:.0f} minutes (see !update_schedule).")
+
+    async def periodic_update(self):
+        """Called by the update timer.  Updates the leaderboard, then picks the interval until the next update from the kills gained since the last one."""
+        await self.update_leaderboard()
+        current_boss:LocalBoss = self.__session_handler.get_current_session().current_boss
+        if current_boss:
+            self.__update_cadence.observe(self.__tracked_kills(current_boss))
+        plan:CadencePlan = self.__plan_update_cadence()
+        if self.update_timer and self.update_timer.interval != plan.interval_seconds:
+            self.log(self,f"Next leaderboard update in {plan.interval_seconds / 60:.1f} minutes: {'; '.join(plan.reasons)}",self.periodic_update)
+            self.update_timer.set_interval(plan.interval_seconds)
+
+    def __update_cadence_settings(self) -> tuple[float,float,float,float,float]:
+        """Returns the (base, min, max, finish window) seconds and idle backoff of the update cadence from the config."""
+        cadence_state:CadenceState = self.__config_handler.get_cadence_state()
+        return (self.__config_handler.get_api_state().bulk_update_frequency_minutes * 60,cadence_state.min_update_minutes * 60,
+                cadence_state.max_update_minutes * 60,cadence_state.finish_window_hours * 3600,cadence_state.idle_backoff)
+
+    def __plan_update_cadence(self) -> CadencePlan:
+        """Returns the interval until the next periodic update, or the fixed bulk update frequency if the adaptive cadence is off."""
+        api_state:ApiState = self.__config_handler.get_api_state()
+        cadence_state:CadenceState = self.__config_handler.get_cadence_state()
+        if not cadence_state.adaptive:
+            self.__update_cadence.last_plan = CadencePlan(api_state.bulk_update_frequency_minutes * 60,["the adaptive cadence is off: fixed bulk update frequency"])
+            return self.__update_cadence.last_plan
+        return self.__update_cadence.plan(self.__seconds_to_tracking_stop(),len(self.__player_handler.get_players()),
+                                           api_state.update_ratelimit_seconds,cadence_state.max_requests_per_hour)
+
+    def __seconds_to_tracking_stop(self) -> float:
+        """Returns the seconds until the close tracking job runs next, or None if it is not scheduled."""
+        job = self.scheduler.get_job("close_tracking")
+        if not job or not job.next_run_time:
+            return None
+        return (job.next_run_time - datetime.now(job.next_run_time.tzinfo)).total_seconds()
+
+    def __tracked_kills(self,boss:LocalBoss) -> dict[str,int]:
+        """Returns osrs name -> tracked kills at the boss, for every player that has the boss."""
+        kills:dict[str,int] = {}
+        for player in self.__player_handler.get_players():
+            for player_boss in player.boss_list:
+                if player_boss and player_boss.name == boss.api_name:
+                    kills[player.osrs_name] = player_boss.tracked_kills
+                    break
+        return kills
 
     async def stop_periodic_updates(self):
-        """This will be called by close_tracking_logic to stop the periodic updates for the current boss."""
-        self.update_timer.stop()
+        """This will be called by close_tracking_logic to stop the periodic updates for the current boss.
+        Waits for an update that is running to end, so it does not overlap the final update."""
+        if not self.update_timer:
+            await self.dlog("Periodic updates are not running.")
+            return
+        timer:AsyncTimer = self.update_timer
         self.update_timer = None
+        timer.stop()
+        await timer.join()
         await self.dlog("Periodic updates have been stopped.")
     # end logic functions -----------------------------------------
 
     # discord functions -----------------------------------------
-    async def send_message(self,channel_id:int,message:str) -> discord.Message:
-        """Send a message to a channel.  channel_id is the id of the channel to send the message to.  message is the text to send."""
+    async def send_message(self,channel_id:int,message:str,priority:int = PRIORITY_NORMAL,droppable:bool = False) -> discord.Message:
+        """Send a message to a channel.  channel_id is the id of the channel to send the message to.  message is the text to send.
+        The message is queued on the outbound scheduler with the given priority.  Returns None if a droppable message was dropped."""
         channel:discord.TextChannel = self.bot.get_channel(channel_id)
-        return await channel.send(message)
+        return await self.__outbound.run(channel_id,lambda: channel.send(message),priority,droppable=droppable)
 
-    async def send_embed(self,channel_id:int, title:str, message:str, image_path:str) -> discord.Message:
+    async def send_embed(self,channel_id:int, title:str, message:str, image_path:str, image_data:bytes = None, filename:str = None, priority:int = PRIORITY_NORMAL) -> discord.Message:
         """Send an embed with an image to a channel.  title displayed at top.  message is text body.
-        image_path is the path to the image file"""
+        image_path is the path to the image file, or None to send the embed without an image.
+        image_data is an already encoded in-memory image to upload instead of reading image_path (filename is its upload name)"""
+        channel = self.bot.get_channel(channel_id)
+        embed = discord.Embed(title=title, description=message)
+        if image_data:
+            return await self.__outbound.run(channel_id,lambda: channel.send(embed=embed, file=discord.File(io.BytesIO(image_data), filename=filename or "image.png")),priority)
+        if image_path is None:
+            return await self.__outbound.run(channel_id,lambda: channel.send(embed=embed),priority)
         # check if image exists
         if not os.path.exists(image_path):
             self.warn(self,f"Image path does not exist: {image_path}",self.send_embed)
@@ -570,34 +1104,118 @@ class DiscordHandler(Logger):
         except Exception as e:
             self.error(self,f"Bot.send_embed() : Failed to create image file: {e}",self.send_embed)
             return None
-        # get channel
-        channel = self.bot.get_channel(channel_id)
-        # create embed
-        embed = discord.Embed(title=title, description=message)
-        return await channel.send(embed=embed, file=image)
+        return await self.__outbound.run(channel_id,lambda: channel.send(embed=embed, file=image),priority)
     
+    async def fetch_message(self,channel_id:int,message_id:int) -> discord.Message:
+        """Fetch a message from a channel.  Returns None if there is no message id, or the message no longer exists."""
+        if not message_id:
+            return None
+        channel:discord.TextChannel = self.bot.get_channel(channel_id)
+        try:
+            return await self.__outbound.run(channel_id,lambda: channel.fetch_message(message_id),PRIORITY_USER)
+        except (discord.NotFound,discord.Forbidden):
+            return None
+        except discord.HTTPException as e:
+            self.warn(self,f"Error fetching message {message_id}: {e}",self.fetch_message)
+            return None
+
     async def remove_message(self,channel_id:int,message_id:int):
         """Remove a message from a channel.  channel_id is the id of the channel to remove the message from.  message_id is the id of the message to remove."""
         channel:discord.TextChannel = self.bot.get_channel(channel_id)
         message:discord.Message = await channel.fetch_message(message_id)
-        await message.delete()
+        await self.__outbound.run(channel_id,message.delete,PRIORITY_PURGE,merge_key=("delete",message_id))
 
-    async def clear_messages(self,channel_id:int,limit:int=None):
-        """Clear all messages from a channel.  channel_id is the id of the channel to clear."""
+    async def clear_messages(self,channel_id:int,limit:int=None,keep_ids:set[int]=None):
+        """Clear all messages from a channel.  channel_id is the id of the channel to clear.  Messages with an id in keep_ids are not deleted.
+        Deletes are queued at purge priority, and a message already queued for deletion is only deleted once."""
         channel:discord.TextChannel = self.bot.get_channel(channel_id)
+        deletes:list = []
         async for message in channel.history(limit=limit):
-            await message.delete()
+            if keep_ids and message.id in keep_ids:
+                continue
+            deletes.append(self.__outbound.submit(channel_id,message.delete,PRIORITY_PURGE,merge_key=("delete",message.id)))
+        results:list = await asyncio.gather(*deletes,return_exceptions=True)
+        for result in results:
+            if isinstance(result,Exception):
+                self.warn(self,f"Error deleting message in channel {channel_id}: {result}",self.clear_messages)
+
+    async def add_reaction(self,message:discord.Message,emoji:str,priority:int = PRIORITY_USER):
+        """Add a reaction to a message through the outbound scheduler."""
+        await self.__outbound.run(message.channel.id,lambda: message.add_reaction(emoji),priority)
+
+    def __is_voting_reaction(self,payload:discord.RawReactionActionEvent) -> bool:
+        """Returns True if a raw reaction event is for the voting message while voting is open, and not made by the bot."""
+        session:Session = self.__session_handler.get_current_session()
+        if not session.voting_active or not session.voting_message_id or payload.message_id != session.voting_message_id:
+            return False
+        if not self.check_channel(self.__config_handler.get_discord_state().voting_channel_id,payload.channel_id):
+            return False
+        return not self.bot.user or payload.user_id != self.bot.user.id
+
+    def __reaction_emoji(self,payload:discord.RawReactionActionEvent):
+        """Returns the emoji of a raw reaction event as on_reaction_add gives it: a string for unicode emojis."""
+        return str(payload.emoji) if payload.emoji.is_unicode_emoji() else payload.emoji
+
+    def __reaction_message(self,payload:discord.RawReactionActionEvent) -> discord.Message | discord.PartialMessage:
+        """Returns the voting message a raw reaction event is for, or a partial message (enough to remove reactions) if it is not loaded."""
+        if self.__voting_message and self.__voting_message.id == payload.message_id:
+            return self.__voting_message
+        return self.bot.get_channel(payload.channel_id).get_partial_message(payload.message_id)
+
+    async def __reaction_user(self,payload:discord.RawReactionActionEvent) -> discord.abc.User:
+        """Returns the user of a raw reaction event: from the member cache, or fetched from discord.  Returns None if the user cannot be found."""
+        guild:discord.Guild = self.bot.get_guild(payload.guild_id) if payload.guild_id else None
+        user:discord.abc.User = (guild.get_member(payload.user_id) if guild else None) or self.bot.get_user(payload.user_id)
+        if user:
+            return user
+        try:
+            return await self.__outbound.run(payload.channel_id,lambda: self.bot.fetch_user(payload.user_id),PRIORITY_USER)
+        except discord.HTTPException as e:
+            self.warn(self,f"Error fetching user {payload.user_id} for a voting reaction: {e}",self.__reaction_user)
+            return None
+
+    def queue_reaction_removal(self,message:discord.Message,emoji:str,user:discord.User,priority:int = PRIORITY_NORMAL) -> asyncio.Future:
+        """Queue the removal of a user's voting reaction without waiting for it.  The remove event it triggers is ignored by the reaction batcher."""
+        self.__reaction_batcher.expect_removal(message,emoji,user)
+        async def remove() -> bool:
+            await message.remove_reaction(emoji,user)
+            return True
+        future:asyncio.Future = self.__outbound.submit(message.channel.id,remove,priority,merge_key=("remove_reaction",message.id,str(emoji),user.id))
+        def removal_done(done:asyncio.Future):
+            if done.cancelled() or done.exception() or done.result() is None:
+                # not removed (or merged into an identical queued removal, which keeps its own expectation)
+                self.__reaction_batcher.removal_failed(message,emoji,user)
+                if not done.cancelled() and done.exception():
+                    self.warn(self,f"Error removing reaction {emoji} from {user.name}: {done.exception()}",self.queue_reaction_removal)
+        future.add_done_callback(removal_done)
+        return future
+
+    async def remove_reaction(self,message:discord.Message,emoji:str,user:discord.User,priority:int = PRIORITY_NORMAL):
+        """Remove a user's reaction from a message through the outbound scheduler.  Duplicate queued removals are merged."""
+        await self.__outbound.run(message.channel.id,lambda: message.remove_reaction(emoji,user),priority,merge_key=("remove_reaction",message.id,str(emoji),user.id))
 
     def __is_admin(self,discord_name:str):
         """Check if a discord user is an admin.  discord_name is the name of the user to check."""
-        for admin in self.__config_handler.get_discord_state().discord_admin_list:
-            if discord_name.lower() == admin.lower():
-                return True
-        return False
+        return discord_name.lower() in self.__admins
+
+    def __admin_set(self) -> set[str]:
+        """Returns the admin names from the config, lower case."""
+        return {admin.lower() for admin in self.__config_handler.get_discord_state().discord_admin_list}
     
-    async def dlog(self,message:str):
-        """Log a message to the console channel.  message is the message to log."""
-        await self.send_message(self.__config_handler.get_discord_state().console_channel_id,message)
+    async def dlog(self,message:str,error:bool = False):
+        """Log a message to the console channel.  message is the message to log.  Messages are queued and packed together by the console sink,
+        errors (flagged, or messages starting with 'Error') are flushed immediately."""
+        self.__console_sink.post(message,error or message.lower().startswith(("error","eror")))
+
+    async def __send_console_message(self,message:str) -> discord.Message:
+        """Sends a packed console sink message to the console channel.  Returns None if the message was dropped under load."""
+        return await self.send_message(self.__config_handler.get_discord_state().console_channel_id,message,PRIORITY_CONSOLE,droppable=True)
+
+    async def dlog_lines(self,lines:list[str],header:str = ""):
+        """Log a list of lines to the console channel, packed into as few messages as possible.  header is repeated above the lines in every message."""
+        if not lines:
+            return
+        self.__console_sink.post("\n".join(lines),(header or lines[0]).lower().startswith(("error","eror")),header)
 
     def check_channel(self,desired_channel_id:int,channel_id:int) -> bool:
         """Checks to see if the desired channel id is set (from discord state ideally) and if so, if it matches the channel id provided (from ctx channel ideally)
@@ -687,23 +1305,60 @@ class DiscordHandler(Logger):
                         await self.dlog(f"Error updating leaderboard: player {player.osrs_name} does not have boss {boss_to_show.api_name} even after attempting to force update boss list from api.")
                 else:
                     await self.dlog(f"Error updating leaderboard: player {player.osrs_name} does not have boss {boss_to_show.api_name} and force_update_bosses returned a malformed response.  Contact the developer.")
-        #sort data lines and create messsage
-        message:str = "Leaderboard:\nKills | Discord Name | OSRS Name\n"
-        if data_lines:
-            data_lines.sort(key=lambda x: x["tracked_kills"],reverse=True)
-            for data in data_lines:
-                kills:str = str(data["tracked_kills"])
-                while len(kills) < 2:
-                    kills = "0" + kills
-                message += f"[{kills}]  |  {data['discord_name']}  |  {data['osrs_name']}\n"
-        else:
-            message += "No data to display"
+        #sort data lines and split them into embed sized pages
+        data_lines.sort(key=lambda x: x["tracked_kills"],reverse=True)
+        pages:list[str] = list(paginate_lines([self.format_leaderboard_row(data) for data in data_lines],EMBED_DESCRIPTION_LIMIT,self.leaderboard_header))
+        if not pages:
+            pages = [f"{self.leaderboard_header}\nNo data to display"]
+        #render the leaderboard image (reused from memory if the rankings did not change)
+        boss_image_path:str = os.path.join(self.__config_handler.paths.filepath_image_folder,boss_to_show.image)
+        boss_art = self.__image_service.boss_tile(boss_to_show,self.__leaderboard_renderer.header_height - 10)
+        image_data:bytes = await asyncio.to_thread(self.__leaderboard_renderer.render,boss_image_path,title,self.__ranked_rows(data_lines),boss_art)
         #clear channel
         await self.clear_messages(channel_id)
-        #send message
+        #send the first page with the leaderboard image (or the boss image if rendering failed), and any further pages as continuation embeds
         await self.send_embed(
             channel_id=channel_id,
             title=title,
-            message=message,
-            image_path=os.path.join(self.__config_handler.paths.filepath_image_folder,boss_to_show.image)
-        )
\ No newline at end of file
+            message=pages[0],
+            image_path=boss_image_path,
+            image_data=image_data,
+            filename=f"leaderboard.{image_extension(image_data)}" if image_data else None
+        )
+        for page_number,page in enumerate(pages[1:],start=2):
+            await self.send_embed(channel_id=channel_id,title=f"Leaderboard (page {page_number}/{len(pages)})",message=page,image_path=None)
+
+    def __ranked_rows(self,data_lines:list[dict]) -> list[tuple[int,str,int]]:
+        """Converts sorted leaderboard data lines into (rank, osrs name, tracked kills) rows.  Tied kills share a rank."""
+        rows:list[tuple[int,str,int]] = []
+        for position,data in enumerate(data_lines):
+            rank:int = rows[-1][0] if rows and rows[-1][2] == data["tracked_kills"] else position + 1
+            rows.append((rank,data["osrs_name"],data["tracked_kills"]))
+        return rows
+
+    def format_boss_suggestions(self,boss_name:str) -> str:
+        """Returns a message listing the bosses a mistyped boss name may refer to, for command errors."""
+        suggestions:list[LocalBoss] = self.__boss_handler.suggest_bosses(boss_name)
+        if not suggestions:
+            return "Check that it exists in local_bosses.json and is spelled correctly. Boss name is not case-sensitive."
+        return f"Did you mean: {', '.join(boss.name for boss in suggestions)}?"
+
+    def format_leaderboard_row(self,data:dict) -> str:
+        """Formats a single leaderboard row.  data is a dictionary with tracked_kills, discord_name and osrs_name keys."""
+        return f"[{data['tracked_kills']:02d}]  |  {data['discord_name']}  |  {data['osrs_name']}"
+
+    def get_leaderboard_rows(self,boss:LocalBoss) -> list[dict]:
+        """Returns the leaderboard rows for a boss from the stored player data (no api update), sorted by tracked kills."""
+        data_lines:list[dict] = []
+        for player in self.__player_handler.get_players():
+            for player_boss in player.boss_list:
+                if player_boss.name == boss.api_name:
+                    data_lines.append({
+                        "discord_name":player.discord_name,
+                        "osrs_name":player.osrs_name,
+                        "tracked_kills":player_boss.tracked_kills,
+                        "kills":player_boss.kills
+                    })
+                    break
+        data_lines.sort(key=lambda x: x["tracked_kills"],reverse=True)
+        return data_lines
\ No newline at end of file
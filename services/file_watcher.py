@@ -0,0 +1,78 @@
+from base.logging import Logger
+import asyncio
+import os
+
+class FileWatcher(Logger):
+    """Polls files for changes (modification time, inode and size) and calls an async callback when a file changed.
+    A change is only reported once the file has looked the same for two polls in a row, so a file is not read while an editor is still writing it."""
+    def __init__(self,interval_seconds:float = 5.0):
+        super().__init__()
+        self.interval_seconds:float = interval_seconds
+        # path -> async function without arguments, called when the file changed
+        self.__callbacks:dict[str,object] = {}
+        # path -> signature of the file when it was last handled, and when it was last polled
+        self.__handled:dict[str,tuple] = {}
+        self.__polled:dict[str,tuple] = {}
+        self.__task:asyncio.Task = None
+        self.__check_lock:asyncio.Lock = asyncio.Lock()
+        # statistics
+        self.polls:int = 0
+        self.changes:int = 0
+        self.failed_callbacks:int = 0
+
+    def watch(self,filepath:str,callback):
+        """Watches a file.  The file as it is now counts as handled, so only later changes call callback."""
+        self.__callbacks[filepath] = callback
+        self.__handled[filepath] = self.__polled[filepath] = self.signature(filepath)
+
+    def signature(self,filepath:str) -> tuple:
+        """Returns the (modification time, inode, size) of a file, or None if it does not exist."""
+        try:
+            stat:os.stat_result = os.stat(filepath)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns,stat.st_ino,stat.st_size)
+
+    def start(self):
+        """Starts the background poll loop.  Must be called from within the running event loop.  Does nothing if already running, or if the interval is 0."""
+        if (self.__task and not self.__task.done()) or not self.interval_seconds or self.interval_seconds <= 0:
+            return
+        self.__task = asyncio.create_task(self.__run())
+        self.log(self,f"Watching {len(self.__callbacks)} files for changes every {self.interval_seconds} seconds",self.start)
+
+    def stop(self):
+        """Stops the background poll loop."""
+        if self.__task:
+            self.__task.cancel()
+            self.__task = None
+
+    async def check(self,force:bool = False) -> list[str]:
+        """Polls every watched file and calls the callbacks of the files that changed.  force skips waiting for the file to settle.
+        Returns the paths whose callbacks were called."""
+        async with self.__check_lock:
+            self.polls += 1
+            changed:list[str] = []
+            for filepath,callback in self.__callbacks.items():
+                signature:tuple = self.signature(filepath)
+                settled:bool = force or signature == self.__polled.get(filepath)
+                self.__polled[filepath] = signature
+                if signature is None or signature == self.__handled.get(filepath) or not settled:
+                    continue
+                self.__handled[filepath] = signature
+                self.changes += 1
+                changed.append(filepath)
+                try:
+                    await callback()
+                except Exception as e:
+                    self.failed_callbacks += 1
+                    self.error(self,f"Error handling change to {filepath}: {e}",self.check)
+            return changed
+
+    async def __run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await self.check()
+
+    def get_stats(self) -> str:
+        """Returns a one line summary of the watcher statistics."""
+        return f"watching: {len(self.__callbacks)} files every {self.interval_seconds} s | polls: {self.polls} | changes: {self.changes} | failed reloads: {self.failed_callbacks}"
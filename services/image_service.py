@@ -0,0 +1,305 @@
+from __future__ import annotations
+from base.logging import Logger
+from modules.objects.boss import LocalBoss
+from modules.dtos.rendered_image import RenderedImage
+from modules.logic.image_gen import load_tile, combine_images, compose_tiles, encode_image, save_bytes, image_extension, ImageEncoder
+from modules.logic.atlas import ThumbnailAtlas, build_atlas, combine_atlas_tiles
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from base.lazy_import import lazy_import
+import asyncio
+import hashlib
+import os
+import threading
+import time
+
+Image = lazy_import("PIL.Image")
+
+class ImageService(Logger):
+    def __init__(self,image_folder:str,cache_folder:str,max_tiles:int = 64,max_composites:int = 16,scale:float = 1.0,persist_composites:bool = False,
+                worker_pool:str = "thread",workers:int = 2,render_timeout_seconds:float = 10,atlas_heights:list[int] = None,encoder:ImageEncoder = None):
+        """image_folder is the folder containing the boss images, cache_folder is where finished vote composites are kept between restarts
+        (only if persist_composites is set, off by default).  max_tiles is the number of decoded tiles kept in memory, max_composites the number of composites kept.
+        Renders run on a 'thread' or 'process' worker_pool of 'workers' workers, and fall back to a single boss image after render_timeout_seconds.
+        atlas_heights are the thumbnail heights packed into the atlas (see load_atlas), the first is used for vote images.
+        encoder chooses the upload format of vote images (plain PNG if not set)."""
+        super().__init__()
+        self.image_folder:str = image_folder
+        self.cache_folder:str = cache_folder
+        self.max_tiles:int = max_tiles
+        self.max_composites:int = max_composites
+        self.scale:float = scale
+        self.persist_composites:bool = persist_composites
+        self.encoder:ImageEncoder = encoder
+        # (path, mtime, scale) -> decoded and scaled RGBA tile, least recently used first
+        self.__tiles:OrderedDict[tuple,Image.Image] = OrderedDict()
+        # boss tuple -> (source image fingerprint, encoded composite), least recently used first
+        self.__composites:OrderedDict[tuple,tuple[str,bytes]] = OrderedDict()
+        self.tile_hits:int = 0
+        self.tile_misses:int = 0
+        self.composite_hits:int = 0
+        self.composite_misses:int = 0
+        self.__cache_lock:threading.Lock = threading.Lock()
+        # worker pool, created on first render
+        self.worker_pool:str = worker_pool
+        self.workers:int = workers
+        self.render_timeout_seconds:float = render_timeout_seconds
+        self.__executor:Executor = None
+        # render timing, in seconds
+        self.renders:int = 0
+        self.render_seconds_total:float = 0.0
+        self.render_seconds_max:float = 0.0
+        self.render_seconds_last:float = 0.0
+        self.render_timeouts:int = 0
+        self.render_fallbacks:int = 0
+        # thumbnail atlas, loaded with load_atlas
+        self.atlas_heights:list[int] = atlas_heights or [150]
+        self.atlas_path:str = os.path.join(self.cache_folder,"thumbnails.atlas")
+        self.__atlas:ThumbnailAtlas = None
+        if self.persist_composites:
+            os.makedirs(self.cache_folder,exist_ok=True)
+
+    def get_tile(self,path:str,scale:float = 1.0) -> Image.Image:
+        """Returns the decoded, scaled tile for an image path from the LRU cache, decoding it on a miss.  Returns None if the image can not be loaded.
+        The returned tile is shared, callers must not modify it."""
+        try:
+            mtime:float = os.path.getmtime(path)
+        except OSError:
+            self.warn(self,f"Image path does not exist: {path}",self.get_tile)
+            return None
+        key:tuple = (path,mtime,scale)
+        with self.__cache_lock:
+            tile:Image.Image = self.__tiles.get(key)
+            if tile is not None:
+                self.__tiles.move_to_end(key)
+                self.tile_hits += 1
+                return tile
+            self.tile_misses += 1
+        tile = load_tile(path,scale)
+        if tile is None:
+            return None
+        with self.__cache_lock:
+            self.__tiles[key] = tile
+            while len(self.__tiles) > self.max_tiles:
+                self.__tiles.popitem(last=False)
+        return tile
+
+    def load_atlas(self,bosses:list[LocalBoss]) -> bool:
+        """Loads the thumbnail atlas once, (re)building it first if it is missing, or any boss image or atlas height changed.
+        Returns True if an atlas is loaded, otherwise images are decoded from the image folder as needed."""
+        atlas:ThumbnailAtlas = ThumbnailAtlas.load(self.atlas_path)
+        if not atlas or not atlas.is_current(bosses,self.image_folder,self.atlas_heights):
+            self.log(self,f"Building thumbnail atlas for {len(bosses)} bosses at heights {self.atlas_heights}",self.load_atlas)
+            if not build_atlas(bosses,self.image_folder,self.atlas_path,self.atlas_heights):
+                self.warn(self,"Could not build the thumbnail atlas, images will be decoded as needed",self.load_atlas)
+                self.__atlas = None
+                return False
+            atlas = ThumbnailAtlas.load(self.atlas_path)
+        self.__atlas = atlas
+        if atlas: self.log(self,f"Loaded thumbnail atlas {self.atlas_path}",self.load_atlas)
+        return atlas is not None
+
+    def __atlas_images(self,bosses:list[LocalBoss],height:int) -> list[str]:
+        """Returns the image names of the bosses if the atlas holds all of them at the height, else None."""
+        if not self.__atlas:
+            return None
+        images:list[str] = [boss.image for boss in bosses]
+        return images if all(self.__atlas.has_tile(image,height) for image in images) else None
+
+    def boss_tile(self,boss:LocalBoss,height:int) -> Image.Image:
+        """Returns a ready-made tile for the boss at the height from the atlas, or None if the atlas does not hold one.
+        The returned tile is shared, callers must not modify it."""
+        return self.__atlas.get_tile(boss.image,height) if self.__atlas else None
+
+    def boss_image_path(self,boss:LocalBoss) -> str:
+        """Returns the full path to a boss image."""
+        return os.path.join(self.image_folder,boss.image)
+
+    def composite_path(self,bosses:list[LocalBoss]) -> str:
+        """Returns the path of the persisted composite for the bosses if one exists for their current images, otherwise None."""
+        if not self.persist_composites:
+            return None
+        fingerprint:str = self.__fingerprint([self.boss_image_path(boss) for boss in bosses],self.scale)
+        path:str = os.path.join(self.cache_folder,f"vote_{fingerprint}.img")
+        return path if os.path.isfile(path) else None
+
+    def read_composite(self,path:str) -> RenderedImage:
+        """Reads a persisted composite (as returned by composite_path) without decoding it.  Returns None if it can not be read."""
+        start:float = time.perf_counter()
+        try:
+            with open(path,"rb") as file:
+                data:bytes = file.read()
+            return RenderedImage(data,f"vote.{image_extension(data)}",False,time.perf_counter() - start)
+        except OSError as e:
+            self.warn(self,f"Error reading prepared vote image: {e}",self.read_composite)
+            return None
+
+    def __fingerprint(self,paths:list[str],scale:float) -> str:
+        """Hashes the image paths, their modification times and the scale (or atlas height), so a composite is rebuilt if any source image changes."""
+        digest = hashlib.sha1(repr(scale).encode())
+        if self.encoder:
+            digest.update(self.encoder.key().encode())
+        if self.__atlas:
+            digest.update(f"atlas|{self.atlas_heights[0]}".encode())
+        for path in paths:
+            mtime:float = os.path.getmtime(path) if os.path.isfile(path) else 0.0
+            digest.update(f"{path}|{mtime}".encode())
+        return digest.hexdigest()
+
+    def __cached_composite(self,key:tuple,fingerprint:str) -> bytes:
+        """Returns the in memory composite for the boss tuple if its source images are unchanged, else None."""
+        with self.__cache_lock:
+            cached:tuple[str,bytes] = self.__composites.get(key)
+            if cached and cached[0] == fingerprint:
+                self.__composites.move_to_end(key)
+                self.composite_hits += 1
+                return cached[1]
+        return None
+
+    def __store_composite(self,key:tuple,fingerprint:str,data:bytes):
+        with self.__cache_lock:
+            self.__composites[key] = (fingerprint,data)
+            while len(self.__composites) > self.max_composites:
+                self.__composites.popitem(last=False)
+
+    def __read_persisted(self,key:tuple,cached_path:str) -> bytes:
+        """Returns the persisted composite if it exists, without decoding it.  Returns None if it does not exist."""
+        if not cached_path or not os.path.isfile(cached_path):
+            return None
+        try:
+            with open(cached_path,"rb") as file:
+                data:bytes = file.read()
+            self.log(self,f"Reusing cached vote image for {', '.join(key)}",self.vote_image)
+            return data
+        except OSError as e:
+            self.warn(self,f"Error reading cached vote image: {e}",self.vote_image)
+            return None
+
+    def vote_image(self,bosses:list[LocalBoss]) -> bytes:
+        """Returns the encoded PNG vote composite for the bosses, in order.  Composites are cached in memory by their boss tuple, and if
+        persist_composites is set a copy is kept on disk, so the same pool (for example when voting is reopened after a restart) is never decoded again.
+        This blocks while rendering, use render_vote_image from the event loop.  Returns None if an error occurs."""
+        paths:list[str] = [self.boss_image_path(boss) for boss in bosses]
+        key:tuple = tuple(boss.api_name for boss in bosses)
+        fingerprint:str = self.__fingerprint(paths,self.scale)
+        data:bytes = self.__cached_composite(key,fingerprint)
+        if data:
+            return data
+        cached_path:str = os.path.join(self.cache_folder,f"vote_{fingerprint}.img") if self.persist_composites else None
+        data = self.__read_persisted(key,cached_path)
+        if data:
+            self.composite_hits += 1
+        else:
+            self.composite_misses += 1
+            data = self.__compose(bosses,paths,cached_path)
+            if not data:
+                return None
+            if cached_path:
+                self.__prune_composites()
+        self.__store_composite(key,fingerprint,data)
+        return data
+
+    def __compose(self,bosses:list[LocalBoss],paths:list[str],save_path:str) -> bytes:
+        """Composes the vote image from ready-made atlas tiles if the atlas holds every boss, otherwise from decoded tiles."""
+        height:int = self.atlas_heights[0]
+        images:list[str] = self.__atlas_images(bosses,height)
+        if images is None:
+            return combine_images(paths,self.scale,self.get_tile,save_path,self.encoder)
+        composite:Image.Image = compose_tiles([self.__atlas.get_tile(image,height) for image in images])
+        data:bytes = self.encoder.encode(composite) if self.encoder else encode_image(composite)
+        composite.close()
+        if save_path:
+            save_bytes(data,save_path)
+        return data
+
+    def __get_executor(self) -> Executor:
+        if self.__executor is None:
+            if self.worker_pool == "process":
+                self.__executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self.__executor = ThreadPoolExecutor(max_workers=self.workers,thread_name_prefix="image_render")
+        return self.__executor
+
+    def __fallback_image(self,bosses:list[LocalBoss]) -> RenderedImage:
+        """Returns the first boss image file as-is (no decoding), or None if it can not be read."""
+        for boss in bosses:
+            try:
+                with open(self.boss_image_path(boss),"rb") as file:
+                    return RenderedImage(file.read(),boss.image,True,0.0)
+            except OSError:
+                continue
+        return None
+
+    async def render_vote_image(self,bosses:list[LocalBoss]) -> RenderedImage:
+        """Renders the vote composite on the worker pool without blocking the event loop.  Cached composites are returned immediately.
+        If rendering fails or takes longer than render_timeout_seconds, the first boss image is returned instead (fallback is set).
+        Returns None if not even the fallback image is available."""
+        start:float = time.perf_counter()
+        paths:list[str] = [self.boss_image_path(boss) for boss in bosses]
+        key:tuple = tuple(boss.api_name for boss in bosses)
+        fingerprint:str = self.__fingerprint(paths,self.scale)
+        data:bytes = self.__cached_composite(key,fingerprint)
+        if data:
+            return RenderedImage(data,f"vote.{image_extension(data)}",False,time.perf_counter() - start)
+        loop:asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        try:
+            if self.worker_pool == "process":
+                # the tile cache can not be shared with another process, so the worker maps the atlas itself (or decodes) and only composes and encodes
+                cached_path:str = os.path.join(self.cache_folder,f"vote_{fingerprint}.img") if self.persist_composites else None
+                data = self.__read_persisted(key,cached_path)
+                if data:
+                    self.composite_hits += 1
+                else:
+                    self.composite_misses += 1
+                    images:list[str] = self.__atlas_images(bosses,self.atlas_heights[0])
+                    if images is not None:
+                        render = loop.run_in_executor(self.__get_executor(),combine_atlas_tiles,self.atlas_path,images,self.atlas_heights[0],cached_path,self.encoder)
+                    else:
+                        render = loop.run_in_executor(self.__get_executor(),combine_images,paths,self.scale,None,cached_path,self.encoder)
+                    data = await asyncio.wait_for(render,self.render_timeout_seconds)
+                    if data and cached_path: self.__prune_composites()
+                if data: self.__store_composite(key,fingerprint,data)
+            else:
+                data = await asyncio.wait_for(loop.run_in_executor(self.__get_executor(),self.vote_image,bosses),self.render_timeout_seconds)
+        except asyncio.TimeoutError:
+            self.render_timeouts += 1
+            self.warn(self,f"Rendering vote image for {', '.join(key)} timed out after {self.render_timeout_seconds} seconds",self.render_vote_image)
+            data = None
+        except Exception as e:
+            self.error(self,f"Error rendering vote image for {', '.join(key)}: {e}",self.render_vote_image)
+            data = None
+        seconds:float = time.perf_counter() - start
+        self.renders += 1
+        self.render_seconds_total += seconds
+        self.render_seconds_max = max(self.render_seconds_max,seconds)
+        self.render_seconds_last = seconds
+        if data:
+            return RenderedImage(data,f"vote.{image_extension(data)}",False,seconds)
+        self.render_fallbacks += 1
+        fallback:RenderedImage = self.__fallback_image(bosses)
+        if fallback: fallback.seconds = seconds
+        return fallback
+
+    def shutdown(self):
+        """Shuts down the worker pool without waiting for queued renders."""
+        if self.__executor:
+            self.__executor.shutdown(wait=False,cancel_futures=True)
+            self.__executor = None
+
+    def __prune_composites(self):
+        """Removes the oldest cached composites from disk, keeping max_composites."""
+        try:
+            files:list[str] = [os.path.join(self.cache_folder,name) for name in os.listdir(self.cache_folder) if name.startswith("vote_")]
+            files.sort(key=os.path.getmtime)
+            for path in files[:max(0,len(files) - self.max_composites)]:
+                os.remove(path)
+        except OSError as e:
+            self.warn(self,f"Error pruning cached vote images: {e}",self.__prune_composites)
+
+    def get_stats(self) -> str:
+        """Returns a one line summary of the cache statistics."""
+        average:float = self.render_seconds_total / self.renders if self.renders else 0.0
+        return (f"tiles cached: {len(self.__tiles)}/{self.max_tiles} | tile hits: {self.tile_hits} | tile misses: {self.tile_misses} | "
+                f"composite hits: {self.composite_hits} | composite misses: {self.composite_misses} | "
+                f"renders: {self.renders} ({self.worker_pool} pool) | last {self.render_seconds_last * 1000:.0f} ms | avg {average * 1000:.0f} ms | max {self.render_seconds_max * 1000:.0f} ms | "
+                f"timeouts: {self.render_timeouts} | fallbacks: {self.render_fallbacks}")
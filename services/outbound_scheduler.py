@@ -0,0 +1,184 @@
+from base.logging import Logger
+from modules.dtos.outbound_request import OutboundRequest
+import asyncio
+import time
+
+# request priorities, lower runs first
+PRIORITY_USER:int = 0       # user facing messages (vote embed and reactions, set_name replies)
+PRIORITY_NORMAL:int = 1     # leaderboard updates and everything else
+PRIORITY_CONSOLE:int = 2    # console channel logs
+PRIORITY_PURGE:int = 3      # channel clearing
+PRIORITY_NAMES:dict[int,str] = {PRIORITY_USER:"user",PRIORITY_NORMAL:"normal",PRIORITY_CONSOLE:"console",PRIORITY_PURGE:"purge"}
+
+class ChannelBudget:
+    """A token bucket limiting how many requests can be sent to a single channel per period."""
+    def __init__(self,capacity:int,period_seconds:float):
+        self.capacity:int = capacity
+        self.rate:float = capacity / period_seconds
+        self.tokens:float = capacity
+        self.updated:float = time.monotonic()
+
+    def __refill(self,now:float):
+        self.tokens = min(self.capacity,self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self,now:float) -> bool:
+        """Takes a token if one is available.  Returns True if the request may be sent now."""
+        self.__refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self,now:float) -> float:
+        """Returns the seconds until a token is available."""
+        self.__refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+class OutboundScheduler(Logger):
+    """Central queue for every outbound Discord request.  Requests are sent in priority order within a per-channel budget,
+    requests with the same merge key are collapsed into the newest one, and droppable (low value) requests are dropped when more than
+    max_pending requests are waiting.  Dropped and merged requests resolve to None."""
+    def __init__(self,channel_capacity:int = 5,channel_period_seconds:float = 5.0,max_pending:int = 200,max_in_flight:int = 8):
+        super().__init__()
+        self.channel_capacity:int = channel_capacity
+        self.channel_period_seconds:float = channel_period_seconds
+        self.max_pending:int = max_pending
+        self.__pending:list[OutboundRequest] = []
+        self.__merge_index:dict[tuple,OutboundRequest] = {}
+        self.__budgets:dict[int,ChannelBudget] = {}
+        self.__sequence:int = 0
+        self.__wakeup:asyncio.Event = None
+        self.__worker:asyncio.Task = None
+        self.__in_flight:asyncio.Semaphore = asyncio.Semaphore(max_in_flight)
+        # the event loop only keeps weak references to tasks, so sends in flight are held here until they finish
+        self.__send_tasks:set[asyncio.Task] = set()
+        # statistics, per priority: [count, total wait, max wait]
+        self.__latency:dict[int,list[float]] = {priority:[0,0.0,0.0] for priority in PRIORITY_NAMES}
+        self.sent:int = 0
+        self.failed:int = 0
+        self.dropped:int = 0
+        self.merged:int = 0
+
+    def submit(self,channel_id:int,request_func,priority:int = PRIORITY_NORMAL,merge_key:tuple = None,droppable:bool = False) -> asyncio.Future:
+        """Queues a request.  request_func is an async function with no arguments that performs the Discord call.
+        Returns a future that resolves to the request result, or None if the request was dropped or merged."""
+        loop:asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        self.__ensure_worker()
+        future:asyncio.Future = loop.create_future()
+        self.__sequence += 1
+        request:OutboundRequest = OutboundRequest(channel_id,request_func,priority,self.__sequence,merge_key,droppable,future,time.monotonic())
+        if merge_key is not None and merge_key in self.__merge_index:
+            # the queued request is replaced by the newer one, but keeps its place in the queue
+            previous:OutboundRequest = self.__merge_index[merge_key]
+            request.sequence = previous.sequence
+            request.queued_at = previous.queued_at
+            self.__pending[self.__pending.index(previous)] = request
+            self.__resolve(previous,None)
+            self.merged += 1
+        else:
+            self.__pending.append(request)
+        if merge_key is not None:
+            self.__merge_index[merge_key] = request
+        self.__shed_load()
+        self.__wakeup.set()
+        return future
+
+    async def run(self,channel_id:int,request_func,priority:int = PRIORITY_NORMAL,merge_key:tuple = None,droppable:bool = False):
+        """Queues a request and waits for its result.  Returns None if the request was dropped or merged."""
+        return await self.submit(channel_id,request_func,priority,merge_key,droppable)
+
+    def __ensure_worker(self):
+        if self.__worker and not self.__worker.done():
+            return
+        self.__wakeup = asyncio.Event()
+        self.__worker = asyncio.create_task(self.__run())
+
+    def __budget(self,channel_id:int) -> ChannelBudget:
+        if channel_id not in self.__budgets:
+            self.__budgets[channel_id] = ChannelBudget(self.channel_capacity,self.channel_period_seconds)
+        return self.__budgets[channel_id]
+
+    def __shed_load(self):
+        """Drops the lowest priority, oldest droppable requests while the queue is over max_pending."""
+        while len(self.__pending) > self.max_pending:
+            droppable:list[OutboundRequest] = [request for request in self.__pending if request.droppable]
+            if not droppable:
+                return
+            victim:OutboundRequest = max(droppable,key=lambda request: (request.priority,-request.sequence))
+            self.__remove(victim)
+            self.__resolve(victim,None)
+            self.dropped += 1
+
+    def __remove(self,request:OutboundRequest):
+        self.__pending.remove(request)
+        if request.merge_key is not None and self.__merge_index.get(request.merge_key) is request:
+            del self.__merge_index[request.merge_key]
+
+    def __resolve(self,request:OutboundRequest,result=None,exception:Exception = None):
+        if request.future.done():
+            return
+        if exception is not None:
+            request.future.set_exception(exception)
+        else:
+            request.future.set_result(result)
+
+    def __next_request(self,now:float) -> tuple[OutboundRequest,float]:
+        """Returns the highest priority request whose channel has budget, or None and the seconds until one will."""
+        wait:float = None
+        for request in sorted(self.__pending,key=lambda request: (request.priority,request.sequence)):
+            budget:ChannelBudget = self.__budget(request.channel_id)
+            if budget.try_take(now):
+                return request,0.0
+            channel_wait:float = budget.wait_time(now)
+            wait = channel_wait if wait is None else min(wait,channel_wait)
+        return None,wait
+
+    async def __run(self):
+        while True:
+            if not self.__pending:
+                self.__wakeup.clear()
+                await self.__wakeup.wait()
+                continue
+            await self.__in_flight.acquire()
+            request,wait = self.__next_request(time.monotonic())
+            if request is None:
+                self.__in_flight.release()
+                self.__wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.__wakeup.wait(),timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self.__remove(request)
+            self.__record_latency(request)
+            task:asyncio.Task = asyncio.create_task(self.__send(request))
+            self.__send_tasks.add(task)
+            task.add_done_callback(self.__send_tasks.discard)
+
+    async def __send(self,request:OutboundRequest):
+        try:
+            result = await request.request_func()
+            self.sent += 1
+            self.__resolve(request,result)
+        except Exception as e:
+            self.failed += 1
+            self.error(self,f"Outbound request to channel {request.channel_id} failed: {e}",self.__send)
+            self.__resolve(request,exception=e)
+        finally:
+            self.__in_flight.release()
+
+    def __record_latency(self,request:OutboundRequest):
+        waited:float = time.monotonic() - request.queued_at
+        stats:list[float] = self.__latency.setdefault(request.priority,[0,0.0,0.0])
+        stats[0] += 1
+        stats[1] += waited
+        stats[2] = max(stats[2],waited)
+
+    def get_stats(self) -> list[str]:
+        """Returns lines describing the queue state and the queue latency per priority."""
+        lines:list[str] = [f"pending: {len(self.__pending)} | sent: {self.sent} | failed: {self.failed} | dropped: {self.dropped} | merged: {self.merged}"]
+        for priority,(count,total,maximum) in sorted(self.__latency.items()):
+            average:float = total / count if count else 0.0
+            lines.append(f"\t{PRIORITY_NAMES.get(priority,str(priority))}: {int(count)} sent | avg wait {average * 1000:.0f} ms | max wait {maximum * 1000:.0f} ms")
+        return lines
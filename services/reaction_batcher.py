@@ -0,0 +1,137 @@
+from base.logging import Logger
+from modules.dtos.reaction_event import ReactionEvent
+import asyncio
+import time
+
+def collapse_reactions(current_vote:str,events:list[ReactionEvent]) -> tuple[str,list[str]]:
+    """Collapses a user's reaction events, in order, into their net effect.  current_vote is the emoji of the user's vote before the events (or None).
+    Returns the emoji the user should end up voting for (or None) and the reactions of theirs that should be removed, so flip-flops
+    (such as A, B, A) cost a single vote change and one removal per stray reaction."""
+    vote:str = current_vote
+    present:list[str] = [current_vote] if current_vote else []
+    for event in events:
+        if event.added:
+            vote = event.emoji
+            if event.emoji not in present:
+                present.append(event.emoji)
+        else:
+            if event.emoji in present:
+                present.remove(event.emoji)
+            if vote == event.emoji:
+                vote = None
+    return vote,[emoji for emoji in present if emoji != vote]
+
+class ReactionBatcher(Logger):
+    """Queues reaction events and hands them to process_func in micro-batches, grouped by user in arrival order.
+    A batch is collected for batch_seconds after its first event (or until max_batch events), so a storm of reactions is handled in a few passes.
+    Removals the bot makes itself are registered with expect_removal and dropped when their remove event arrives."""
+    def __init__(self,process_func,batch_seconds:float = 0.25,max_batch:int = 500):
+        """process_func is an async function that takes a dict of user id -> list of that user's ReactionEvents, in order."""
+        super().__init__()
+        self.process_func = process_func
+        self.batch_seconds:float = batch_seconds
+        self.max_batch:int = max_batch
+        self.__queue:asyncio.Queue = None
+        self.__task:asyncio.Task = None
+        # (message id, emoji, user id) -> removals the bot requested that have not been seen yet
+        self.__expected_removals:dict[tuple,int] = {}
+        # statistics
+        self.received:int = 0
+        self.suppressed:int = 0
+        self.processed:int = 0
+        self.batches:int = 0
+        self.users:int = 0
+        self.max_queue_depth:int = 0
+        self.max_latency_seconds:float = 0.0
+        self.busy_seconds:float = 0.0
+
+    def start(self):
+        """Starts the background batch loop.  Must be called from within the running event loop.  Does nothing if already running."""
+        if self.__task and not self.__task.done():
+            return
+        self.__queue = asyncio.Queue()
+        self.__task = asyncio.create_task(self.__run())
+
+    def stop(self):
+        """Stops the background batch loop and drops queued events and expected removals."""
+        if self.__task:
+            self.__task.cancel()
+            self.__task = None
+        self.__queue = None
+        self.__expected_removals.clear()
+
+    def post(self,message,emoji:str,user,added:bool,check_expected:bool = True):
+        """Queues a reaction event.  Remove events for removals the bot made itself are dropped,
+        unless check_expected is False (the caller already checked with is_expected_removal)."""
+        if not added and check_expected and self.is_expected_removal(message.id,emoji,user.id):
+            return
+        if self.__queue is None:
+            self.start()
+        self.received += 1
+        self.__queue.put_nowait(ReactionEvent(message,emoji,user,added,time.monotonic()))
+        self.max_queue_depth = max(self.max_queue_depth,self.__queue.qsize())
+
+    def is_expected_removal(self,message_id:int,emoji:str,user_id:int) -> bool:
+        """Returns True if a remove event is for a removal the bot made itself, and forgets that removal.
+        Takes ids, so raw remove events can be checked before their user is looked up."""
+        key:tuple = (message_id,str(emoji),user_id)
+        if not self.__expected_removals.get(key):
+            return False
+        self.__expected_removals[key] -= 1
+        if not self.__expected_removals[key]:
+            del self.__expected_removals[key]
+        self.suppressed += 1
+        return True
+
+    def expect_removal(self,message,emoji:str,user):
+        """Registers a reaction removal the bot is about to make, so its remove event is not treated as the user removing their vote."""
+        key:tuple = (message.id,str(emoji),user.id)
+        self.__expected_removals[key] = self.__expected_removals.get(key,0) + 1
+
+    def removal_failed(self,message,emoji:str,user):
+        """Forgets an expected removal that did not happen."""
+        key:tuple = (message.id,str(emoji),user.id)
+        if self.__expected_removals.get(key):
+            self.__expected_removals[key] -= 1
+            if not self.__expected_removals[key]:
+                del self.__expected_removals[key]
+
+    async def __collect(self) -> list[ReactionEvent]:
+        """Waits for an event, then collects events for batch_seconds or until max_batch are queued."""
+        batch:list[ReactionEvent] = [await self.__queue.get()]
+        deadline:float = time.monotonic() + self.batch_seconds
+        while len(batch) < self.max_batch:
+            remaining:float = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.__queue.get(),remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def __run(self):
+        while True:
+            batch:list[ReactionEvent] = await self.__collect()
+            start:float = time.monotonic()
+            by_user:dict[int,list[ReactionEvent]] = {}
+            for event in batch:
+                by_user.setdefault(event.user.id,[]).append(event)
+            try:
+                await self.process_func(by_user)
+            except Exception as e:
+                self.error(self,f"Error processing reaction batch: {e}",self.post)
+            end:float = time.monotonic()
+            self.busy_seconds += end - start
+            self.max_latency_seconds = max(self.max_latency_seconds,end - batch[0].received)
+            self.processed += len(batch)
+            self.batches += 1
+            self.users += len(by_user)
+
+    def get_stats(self) -> str:
+        """Returns a one line summary of the batcher statistics."""
+        throughput:float = self.processed / self.busy_seconds if self.busy_seconds else 0.0
+        average:float = self.processed / self.batches if self.batches else 0.0
+        return (f"received: {self.received} | processed: {self.processed} in {self.batches} batches (avg {average:.1f} events, {self.users} user groups) | "
+                f"suppressed bot removals: {self.suppressed} | queued: {self.__queue.qsize() if self.__queue else 0} (max {self.max_queue_depth}) | "
+                f"throughput: {throughput:.0f} events/s | max latency: {self.max_latency_seconds * 1000:.0f} ms")
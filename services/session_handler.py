@@ -5,31 +5,174 @@ from modules.logic.parser import SessionParser
 from modules.objects.boss import LocalBoss
 from services.boss_handler import BossHandler
 from modules.logic.session_changer import SessionChanger
+from modules.logic.boss_registry import BossRegistry
+from modules.logic.pool_sampler import PoolSampler
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+import threading
 
 class StateHandler(Logger):
-    def __init__(self,session_filepath:str):
+    def __init__(self,session_filepath:str,boss_registry:BossRegistry = None,pool_sampler:PoolSampler = None):
+        """boss_registry is the registry the session resolves its boss ids through (see BossHandler.get_registry).
+        pool_sampler draws the vote pools (uniform, without a cooldown, if not set)."""
         super().__init__()
         self.__repository = SessionRepository(session_filepath)
-        self.__parser:SessionParser = SessionParser()
-        self.__session_changer:SessionChanger = SessionChanger()
-        self.__current_session:Session = self.__parser.json_to_session(self.__repository.load()) or Session()
+        self.__registry:BossRegistry = boss_registry or BossRegistry()
+        self.__parser:SessionParser = SessionParser(self.__registry)
+        self.__session_changer:SessionChanger = SessionChanger(pool_sampler)
+        # session writes run in order on one background thread, so saving never blocks the event loop
+        self.__writer:ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1,thread_name_prefix="session_store")
+        self.__write_lock:threading.Lock = threading.Lock()
+        self.__write_future:Future = None
+        # the latest snapshot waiting to be written, and the last snapshot handed to the writer (None forces the next save)
+        self.__pending:dict = None
+        self.__saved:dict = None
+        # the last snapshot whose write failed, retried by the next write or flush until a write succeeds
+        self.__failed:dict = None
+        # statistics
+        self.writes:int = 0
+        self.skipped_writes:int = 0
+        self.failed_writes:int = 0
+        self.__current_session:Session = self.__load_session()
 
+    def __parse_session(self,session_data:dict) -> Session:
+        """Converts stored session data to a session object.  Returns None if the data is missing or unreadable."""
+        try:
+            return self.__parser.json_to_session(session_data)
+        except Exception as e:
+            self.error(self,f"Error reading session data: {e}",self.__load_session)
+            return None
+
+    def __load_session(self) -> Session:
+        """Loads the session file, or the backup of the previous session file if it is missing or corrupt (and then repairs the session file).
+        Returns a new session if neither can be read."""
+        session:Session = self.__parse_session(self.__repository.load())
+        if session:
+            self.__saved = self.__parser.session_to_json(session)
+            return session
+        self.__repository.mark_unreadable()
+        session = self.__parse_session(self.__repository.load_backup())
+        if session:
+            self.warn(self,"Session file is missing or unreadable, restored the session from the backup",self.__load_session)
+            self.__current_session = session
+            self.__save_current_session()
+            return session
+        return Session(self.__registry)
         
+    def set_pool_sampler(self,pool_sampler:PoolSampler):
+        """Replaces the pool sampler (after the pool config changed).  A prepared pool stays valid only if the bosses on cooldown did not change."""
+        self.__session_changer.sampler = pool_sampler
+
     def get_current_session(self) -> Session:
         """Returns the current session object."""
         return self.__current_session
     
     def __save_current_session(self) -> bool:
-        """Saves the current session object to the file system.  Returns True if the save was successful."""
-        self.log(self,"Saving current session")
-        return self.__repository.write(self.__parser.session_to_json(self.__current_session))
+        """Saves the current session object to the file system, in the background.  Skips the write if nothing changed since the last save.
+        Returns True if the session was serialized and queued (or unchanged).  Write errors are logged, and the next save retries."""
+        session_data:dict = self.__parser.session_to_json(self.__current_session)
+        if not session_data:
+            return False
+        with self.__write_lock:
+            saved:dict = self.__saved
+            dirty:list[str] = [key for key in session_data if saved is None or saved.get(key) != session_data[key]]
+            if not dirty:
+                self.skipped_writes += 1
+                return True
+            self.__saved = session_data
+            queued:bool = self.__pending is not None
+            self.__pending = session_data
+        self.log(self,f"Saving current session ({', '.join(dirty)} changed)",self.__save_current_session)
+        if not queued:
+            self.__write_future = self.__writer.submit(self.__write_pending)
+        return True
+
+    def __write_pending(self):
+        """Writes the latest pending snapshot.  Runs on the writer thread, snapshots queued while a write is waiting are merged into it."""
+        with self.__write_lock:
+            # a newer snapshot replaces a failed one, every snapshot holds the whole session
+            session_data:dict = self.__pending or self.__failed
+            self.__pending = None
+        if session_data is None:
+            return
+        if self.__repository.write(session_data):
+            self.writes += 1
+            with self.__write_lock:
+                self.__failed = None
+            return
+        self.failed_writes += 1
+        with self.__write_lock:
+            if self.__pending is None:
+                self.__failed = session_data
+            if self.__saved is session_data:
+                self.__saved = None
+
+    def flush(self,timeout:float = None) -> bool:
+        """Waits for queued session writes to finish, and retries the last failed write once.  Returns True if the session on disk is current."""
+        for _ in range(2):
+            future:Future = self.__write_future
+            if future:
+                try:
+                    future.result(timeout)
+                except Exception as e:
+                    self.error(self,f"Error waiting for session write: {e}",self.flush)
+                    return False
+            with self.__write_lock:
+                if self.__pending is None and self.__failed is None:
+                    return True
+                retry:bool = self.__failed is not None and self.__pending is None
+            if retry:
+                self.log(self,"Retrying the failed session write",self.flush)
+                self.__write_future = self.__writer.submit(self.__write_pending)
+        return self.__pending is None and self.__failed is None
+
+    def get_store_stats(self) -> str:
+        """Returns a one line summary of the session store statistics."""
+        return f"writes: {self.writes} | skipped (unchanged): {self.skipped_writes} | failed: {self.failed_writes}{' | last write failed, not saved yet' if self.__failed is not None else ''}"
     
     def open_voting(self,local_boss_list:list[LocalBoss]) -> bool:
-        """Opens voting for the current session.  Returns True if successful, False otherwise."""
-        if not self.__session_changer.open_voting(self.__current_session,local_boss_list):
+        """Opens voting for the current session.  Uses the pool prepared by prepare_next_pool if the boss list and used boss list have not changed since.
+        Returns True if successful, False otherwise."""
+        boss_pool:list[LocalBoss] = self.get_next_pool(local_boss_list)
+        if boss_pool:
+            self.log(self,"Using the vote pool prepared ahead of time",self.open_voting)
+        if not self.__session_changer.open_voting(self.__current_session,local_boss_list,boss_pool):
             return False
         return self.__save_current_session()
+
+    def prepare_next_pool(self,local_boss_list:list[LocalBoss]) -> list[LocalBoss]:
+        """Draws the pool for the next vote ahead of time and stores it in the session.  Returns the pool, or an empty list if one could not be drawn."""
+        boss_pool:list[LocalBoss] = self.__session_changer.draw_boss_pool(local_boss_list,self.__current_session.used_boss_times)
+        if not boss_pool:
+            return []
+        fingerprint:str = self.__session_changer.pool_fingerprint(local_boss_list,self.__current_session.used_boss_times)
+        if not self.__session_changer.set_next_pool(self.__current_session,boss_pool,fingerprint):
+            return []
+        self.__save_current_session()
+        return boss_pool
+
+    def set_next_pool_image(self,image_path:str) -> bool:
+        """Records the pre-rendered image for the prepared pool.  Returns True if successful, False otherwise."""
+        if not self.__current_session.next_boss_pool_ids:
+            return False
+        self.__current_session.next_pool_image = image_path or ""
+        return self.__save_current_session()
+
+    def get_next_pool(self,local_boss_list:list[LocalBoss]) -> list[LocalBoss]:
+        """Returns the prepared pool if it is still valid for the boss list and used boss list, otherwise an empty list."""
+        session:Session = self.__current_session
+        if not session.next_boss_pool_ids:
+            return []
+        if session.next_pool_fingerprint != self.__session_changer.pool_fingerprint(local_boss_list,session.used_boss_times):
+            self.log(self,"Discarding the prepared vote pool, the boss list or used boss list changed",self.get_next_pool)
+            return []
+        return session.next_boss_pool
     
+    def set_voting_message_id(self,message_id:int) -> bool:
+        """Records the id of the open voting message.  Returns True if successful, False otherwise."""
+        self.__current_session.voting_message_id = message_id
+        return self.__save_current_session()
+
     def close_voting(self,boss:LocalBoss) -> bool:
         """Closes voting for the current session.  A boss must be set.  Returns True if successful, False otherwise."""
         if not boss:
@@ -60,20 +203,20 @@ class StateHandler(Logger):
         
     def add_used_boss(self,boss:LocalBoss) -> bool:
         """Adds a boss to the used boss list.  Returns True if successful, False otherwise."""
-        self.__current_session.used_boss_list.append(boss)
+        self.__current_session.used_boss_times[boss.api_name] = datetime.now()
         return self.__save_current_session()
     
     def clear_used_bosses(self) -> bool:
         """Clears the used boss list.  Returns True if successful, False otherwise."""
-        self.__current_session.used_boss_list.clear()
+        self.__current_session.used_boss_times.clear()
         return self.__save_current_session()
     
     def set_current_boss(self, boss:LocalBoss) -> bool:
         """Sets the current boss.  Returns True if successful, False otherwise."""
         self.__current_session.current_boss = boss
-        #check used bosses and remove the current boss from the used boss list
-        if boss in self.__current_session.used_boss_list:
-            self.__current_session.used_boss_list.remove(boss)
+        #check used bosses and remove the current boss from the used bosses
+        if boss:
+            self.__current_session.used_boss_times.pop(boss.api_name,None)
         return self.__save_current_session()
 
 
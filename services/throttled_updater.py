@@ -0,0 +1,54 @@
+from base.logging import Logger
+import asyncio
+import time
+
+class ThrottledUpdater(Logger):
+    """Coalesces update requests into at most one call of update_func per interval_seconds.  Requests made while an update is
+    waiting or running are merged into the next one, and update_func builds its content when it runs, so it always shows the latest state."""
+    def __init__(self,update_func,interval_seconds:float = 5.0):
+        """update_func is an async function without arguments that performs the update (such as editing a message)."""
+        super().__init__()
+        self.update_func = update_func
+        self.interval_seconds:float = interval_seconds
+        self.__task:asyncio.Task = None
+        self.__pending:bool = False
+        self.__last_update:float = 0.0
+        # statistics
+        self.requests:int = 0
+        self.updates:int = 0
+        self.failed_updates:int = 0
+
+    def request(self):
+        """Asks for an update.  Must be called from within the running event loop.  Returns immediately, the update runs in the background."""
+        self.requests += 1
+        self.__pending = True
+        if self.__task is None or self.__task.done():
+            self.__task = asyncio.create_task(self.__run())
+
+    def cancel(self):
+        """Drops any pending update."""
+        self.__pending = False
+        if self.__task:
+            self.__task.cancel()
+            self.__task = None
+
+    async def __update(self):
+        self.__pending = False
+        self.__last_update = time.monotonic()
+        try:
+            await self.update_func()
+            self.updates += 1
+        except Exception as e:
+            self.failed_updates += 1
+            self.error(self,f"Error running throttled update: {e}",self.request)
+
+    async def __run(self):
+        while self.__pending:
+            wait:float = self.__last_update + self.interval_seconds - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await self.__update()
+
+    def get_stats(self) -> str:
+        """Returns a one line summary of the updater statistics."""
+        return f"requests: {self.requests} | updates: {self.updates} | coalesced: {max(0,self.requests - self.updates - self.failed_updates)} | failed: {self.failed_updates}"
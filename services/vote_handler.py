@@ -2,75 +2,135 @@ from base.logging import Logger
 from modules.dtos.vote_data import VoteData
 from modules.objects.boss import LocalBoss
 from modules.dtos.boss_emoji_data import BossEmoji
-class VoteHandler:
-    def __init__(self,boss_emojis:list[BossEmoji]):
+from modules.repositories.filesystem import VoteJournalRepository
+class VoteHandler(Logger):
+    def __init__(self,boss_emojis:list[BossEmoji],journal:VoteJournalRepository = None,message_id:int = None):
+        """journal is an optional vote journal every vote change is appended to, tagged with message_id (the voting message)."""
         super().__init__()
         self.boss_emojis:list[BossEmoji] = boss_emojis
-        self.votes:list[VoteData] = []
+        self.journal:VoteJournalRepository = journal
+        self.message_id:int = message_id
+        # emoji -> boss, built once so a vote never scans the pool
+        self.__emoji_bosses:dict[str,LocalBoss] = {boss_emoji.emoji:boss_emoji.boss for boss_emoji in boss_emojis}
+        # discord name -> that user's vote
+        self.__votes:dict[str,VoteData] = {}
+        # boss api name -> running vote count, in pool order
+        self.__counts:dict[str,int] = {boss_emoji.boss.api_name:0 for boss_emoji in boss_emojis}
         self.selected_boss:LocalBoss = None
 
-    def __voted(self,discord_name:str) -> VoteData:
-        """Check if a discord user already has a vote logged.  Returns the VoteData if found, else None"""
-        for vote in self.votes:
-            if vote.discord_name == discord_name:
-                return vote
-        return None
+    @property
+    def votes(self) -> list[VoteData]:
+        """Every logged vote, in the order they were cast."""
+        return list(self.__votes.values())
 
     def get_previous_reaction(self,discord_name:str) -> str:
         """Get the reaction the user previously used to vote.  Returns None if the user has not voted."""
-        vote = self.__voted(discord_name)
+        vote:VoteData = self.__votes.get(discord_name)
         if vote is None:
             return None
         return vote.emoji
-    
+
     def add_vote(self,discord_name:str,emoji:str,overwrite_previous:bool = True) -> bool:
         """Add a user vote.  Unless overwrite_previous is specifically flagged as False, it will overwrite previous votes if they exist.
         returns True, unless a previous vote exists and overwrite_previous is False"""
-        boss:LocalBoss = None
-        for boss_emoji in self.boss_emojis:
-            if boss_emoji.emoji == emoji:
-                boss = boss_emoji.boss
-                break
+        boss:LocalBoss = self.__emoji_bosses.get(emoji)
         if boss is None:
-            Logger.error(f"Could not find boss for emoji {emoji}")
+            self.error(self,f"Could not find boss for emoji {emoji}",self.add_vote)
             return False
-        if self.__voted(discord_name):
+        previous:VoteData = self.__votes.get(discord_name)
+        if previous:
             if not overwrite_previous:
-                    return False
-            else:
-                self.votes.remove(self.__voted(discord_name))
-        self.votes.append(VoteData(discord_name,boss,emoji))
+                return False
+            self.__counts[previous.boss.api_name] -= 1
+            # re-inserted below, so the vote order follows the latest vote
+            del self.__votes[discord_name]
+        self.__votes[discord_name] = VoteData(discord_name,boss,emoji)
+        self.__counts[boss.api_name] += 1
+        self.__journal("add",discord_name,emoji)
         return True
-    
+
     def remove_vote(self,discord_name:str,emoji:str) -> bool:
         """Remove a user vote if it exists. Returns True if the vote was removed, False if it did not exist."""
-        for vote in self.votes:
-            if vote.discord_name == discord_name and vote.emoji == emoji:
-                self.votes.remove(vote)
-                return True
-        return False
+        vote:VoteData = self.__votes.get(discord_name)
+        if vote is None or vote.emoji != emoji:
+            return False
+        del self.__votes[discord_name]
+        self.__counts[vote.boss.api_name] -= 1
+        self.__journal("remove",discord_name,emoji)
+        return True
+
+    def __journal(self,action:str,discord_name:str,emoji:str):
+        if self.journal and self.message_id is not None:
+            self.journal.append({"message":self.message_id,"action":action,"user":discord_name,"emoji":emoji})
+
+    def start_journal(self,message_id:int) -> bool:
+        """Starts journaling votes for a voting message, replacing the journal with the current votes.  Returns True if successful."""
+        self.message_id = message_id
+        if not self.journal:
+            return False
+        return self.journal.write([{"message":message_id,"action":"add","user":vote.discord_name,"emoji":vote.emoji} for vote in self.__votes.values()])
+
+    def replay_journal(self) -> int:
+        """Rebuilds the votes from the journal entries for this voting message, without journaling them again.  Returns the number of entries replayed."""
+        if not self.journal or self.message_id is None:
+            return 0
+        journal:VoteJournalRepository = self.journal
+        self.journal = None
+        replayed:int = 0
+        try:
+            for entry in journal.load():
+                if entry.get("message") != self.message_id:
+                    continue
+                if entry.get("action") == "add":
+                    self.add_vote(entry.get("user"),entry.get("emoji"))
+                elif entry.get("action") == "remove":
+                    self.remove_vote(entry.get("user"),entry.get("emoji"))
+                replayed += 1
+        finally:
+            self.journal = journal
+        return replayed
+
+    def reconcile(self,user_reactions:dict[str,list[str]]) -> dict[str,list[str]]:
+        """Brings the votes in line with the reactions on the voting message.  user_reactions maps every (linked) user to the valid emojis they reacted with.
+        Votes without a matching reaction are removed.  A user with several reactions keeps one added since their known vote (they changed their vote
+        while the bot was offline), or their known vote otherwise.  Returns the extra reactions to remove, per user."""
+        extra_reactions:dict[str,list[str]] = {}
+        for discord_name in [name for name in self.__votes if not user_reactions.get(name)]:
+            self.remove_vote(discord_name,self.__votes[discord_name].emoji)
+        for discord_name,emojis in user_reactions.items():
+            if not emojis:
+                continue
+            previous:str = self.get_previous_reaction(discord_name)
+            newer:list[str] = [emoji for emoji in emojis if emoji != previous]
+            chosen:str = newer[0] if newer else previous
+            if chosen != previous and not self.add_vote(discord_name,chosen):
+                continue
+            extras:list[str] = [emoji for emoji in emojis if emoji != chosen]
+            if extras:
+                extra_reactions[discord_name] = extras
+        return extra_reactions
+
+    def get_counts(self) -> list[tuple[BossEmoji,int]]:
+        """Returns the live vote count for every boss in the pool, in pool order.  Can be read at any time while voting is open."""
+        return [(boss_emoji,self.__counts[boss_emoji.boss.api_name]) for boss_emoji in self.boss_emojis]
+
+    def get_vote_total(self) -> int:
+        """Returns the number of users that have voted."""
+        return len(self.__votes)
 
     def tally_votes(self) -> LocalBoss:
         """Tally the votes, and return the boss with the most votes.
-        If there is a tie, the first boss will be returned.
+        If there is a tie, the first of the tied bosses in the pool will be returned.
         If there are no votes, will return None"""
         #if no votes
-        if len(self.votes) == 0:
+        if not self.__votes:
             return None
-        #tally votes
-        vote_counts = {}
-        for vote in self.votes:
-            if vote.boss in vote_counts:
-                vote_counts[vote.boss] += 1
-            else:
-                vote_counts[vote.boss] = 1
-        #get the boss with the most votes
-        max_votes = 0
+        #get the boss with the most votes from the running counts
+        max_votes:int = 0
         top_boss:LocalBoss = None
-        for boss,votes in vote_counts.items():
+        for boss_emoji,votes in self.get_counts():
             if votes > max_votes:
                 max_votes = votes
-                top_boss = boss
+                top_boss = boss_emoji.boss
         self.selected_boss = top_boss
         return top_boss
-    
\ No newline at end of file
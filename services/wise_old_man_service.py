@@ -36,7 +36,7 @@ class WiseOldManService(Logger):
             self.last_query = datetime.now()
             player_data:WiseOldManPlayerData = self.parser.json_to_object(self.repository.fetch_player(username))
             if player_data is None:
-                self.warn(self,f"Could not fetch player data for {username}",self.update_player)
+                self.warn(self,"Could not fetch player data for %s",self.update_player,username)
                 return None
             return player_data
         